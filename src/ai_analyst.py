@@ -1,23 +1,92 @@
-from google import genai
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from src.ai_scheduler import AIScheduler
+from src.llm_cache import LIVE, LLMCache, prompt_key
+from src.prompt_codec import CHARS_PER_TOKEN, encode_candles
+from src.startup_profiler import STARTUP
 
 load_dotenv()
 
+MODEL = "gemini-flash-latest"
+TOKENS_PER_VERDICT = 250 # Output reserved per asset in a batch (JSON verdict)
+
+INSTRUCTIONS = """Instructions:
+1. Evaluate Multi-Temporal Trends (MTF) and Technical Indicators (RSI, MACD, BB).
+2. Whale Activity & Order Book: Incorporate volume spikes and walls.
+3. Visual Patterns: If an image is provided, describe the structure you see.
+4. Final Judgment: The user's goal is a **1% daily profit**. Be extremely conservative.
+   Only give a GREEN/RED signal if there is high convergence of at least 3 indicators. Otherwise, stay YELLOW."""
+
+# One verdict per symbol (google-genai structured output)
+BATCH_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "verdicts": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "symbol": {"type": "STRING"},
+                    "signal": {"type": "STRING", "enum": ["GREEN", "YELLOW", "RED"]},
+                    "confidence": {"type": "INTEGER"},
+                    "reasoning": {"type": "STRING"},
+                    "levels": {"type": "STRING"}
+                },
+                "required": ["symbol", "signal", "confidence", "reasoning", "levels"]
+            }
+        }
+    },
+    "required": ["verdicts"]
+}
+
 class AIAnalyst:
-    def __init__(self):
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
+    def __init__(self, cache=None, scheduler=None, base_url=None, api_key=None, compact=None, request_timeout=40):
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        self.base_url = base_url or os.getenv("GEMINI_BASE_URL") # e.g. a FakeGeminiServer for offline tests
+        self.request_timeout = request_timeout # Seconds per HTTP request, so a hung call really ends (stage timeouts only stop waiting)
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.cache = cache if cache is not None else LLMCache() # Parsed responses by prompt hash (SQLite)
+        self.scheduler = scheduler or AIScheduler() # Concurrency limit, shared backoff and retries for every request
+        # Compact numeric candle encoding (prompt_codec) instead of DataFrame.to_string(); AI_COMPACT_PROMPT=0 turns it off
+        self.compact = compact if compact is not None else os.getenv("AI_COMPACT_PROMPT", "1") != "0"
+        # Batch limits: assets per request, estimated prompt tokens and output tokens per request
+        self.max_batch_assets = 8
+        self.max_batch_prompt_tokens = 24000
+        self.max_batch_output_tokens = 8192
+        if not self.api_key:
             print("Warning: GOOGLE_API_KEY not found in environment variables. Functionality limited.")
-            self.client = None
-        else:
-            self.client = genai.Client(api_key=api_key)
 
-    def analyze_asset(self, symbol, price_data, context="Neutral", image_bytes=None, feedback=""):
+    @property
+    def client(self):
+        """Gemini client; the google-genai SDK is imported on the first analysis."""
+        if self._client is None and self.api_key:
+            # One client for all worker threads (a discarded duplicate closes its connections)
+            with self._client_lock:
+                if self._client is None:
+                    with STARTUP.timed("import google.genai"):
+                        from google import genai
+                    with STARTUP.timed("genai Client()"):
+                        http_options = genai.types.HttpOptions(base_url=self.base_url, timeout=int(self.request_timeout * 1000) if self.request_timeout else None)
+                        self._client = genai.Client(api_key=self.api_key, http_options=http_options)
+        return self._client
+
+    def analyze_asset(self, symbol, price_data, context="Neutral", image_bytes=None, feedback="", cache_mode=LIVE):
         """
         Analyzes an asset using Gemini based on price action, news sentiment, and optional chart image.
         Returns a structured response: Signal (Green/Yellow/Red), Reasoning, and Key Levels.
+        An identical earlier prompt is answered from the response cache (`cached` True, original usage);
+        cache_mode "backtest" keeps the entry forever, "live" for the cache TTL.
         """
+        prompt = self.build_prompt(symbol, price_data, context, feedback, image_bytes)
+
+        key = prompt_key(MODEL, prompt, image_bytes)
+        cached = self._cached(key)
+        if cached: return cached
+
         if not self.client:
             return {
                 "signal": "Gray",
@@ -25,9 +94,37 @@ class AIAnalyst:
                 "levels": "N/A"
             }
 
-        # Construct Prompt
+        try:
+            contents = [prompt]
+            if image_bytes:
+                # The google-genai SDK 1.0+ handles bytes directly in contents list if wrapped or as a Part
+                from google.genai import types
+                contents.append(types.Part.from_bytes(data=image_bytes, mime_type="image/png"))
+
+            response = self.scheduler.call(lambda: self.client.models.generate_content(
+                model=MODEL,
+                contents=contents
+            ))
+            parsed = self._parse_response(response.text)
+            
+            # Add token usage metadata
+            parsed["usage"] = self._usage(response)
+            self.cache.put(key, parsed, mode=cache_mode)
+            return parsed
+        except Exception as e:
+            print(f"Error analyzing asset {symbol}: {e}")
+            return self._error_result(e)
+
+    def _candles(self, price_data, compact=None):
+        compact = self.compact if compact is None else compact
+        return encode_candles(price_data, 10) if compact else price_data.tail(10).to_string()
+
+    def build_prompt(self, symbol, price_data, context="Neutral", feedback="", image_bytes=None, compact=None):
+        """Single-asset prompt; the compact encoding also drops the template's indentation."""
+        compact = self.compact if compact is None else compact
         vision_instruction = "IMPORTANT: An image of the chart is provided. Use it to identify visual patterns (triangles, channels, support zones) and combine it with the numerical data." if image_bytes else ""
-        
+        candles = self._candles(price_data, compact)
+
         prompt = f"""
         You are a seasoned financial analyst for the "Monstruo Bursátil" ecosystem. 
         Your task is to analyze the following asset based on provided data and optional visual chart.
@@ -37,18 +134,13 @@ class AIAnalyst:
         {context}
 
         Recent Price Data (OHLCV last candles):
-        {price_data.tail(10).to_string()}
+        {candles}
 
         {feedback}
 
         {vision_instruction}
 
-        Instructions:
-        1. Evaluate Multi-Temporal Trends (MTF) and Technical Indicators (RSI, MACD, BB).
-        2. Whale Activity & Order Book: Incorporate volume spikes and walls.
-        3. Visual Patterns: If an image is provided, describe the structure you see.
-        4. Final Judgment: The user's goal is a **1% daily profit**. Be extremely conservative. 
-           Only give a GREEN/RED signal if there is high convergence of at least 3 indicators. Otherwise, stay YELLOW.
+        {INSTRUCTIONS}
 
         Output Style:
         Signal: [GREEN/YELLOW/RED]
@@ -56,43 +148,187 @@ class AIAnalyst:
         Reasoning: [TEXT - Concise max 3 sentences. Mention specific patterns or data points used.]
         Levels: [TEXT - Define support and resistance]
         """.strip()
-        
+        if compact:
+            prompt = "\n".join(line.strip() for line in prompt.splitlines() if line.strip())
+        return prompt
+
+
+    def _cached(self, key):
+        """Cached parsed response for a prompt key, flagged so callers do not count its tokens again."""
+        hit = self.cache.get(key) if self.cache else None
+        if hit is None: return None
+        hit["cached"] = True
+        return hit
+
+    @staticmethod
+    def _usage(response):
+        usage = response.usage_metadata
+        return {
+            "prompt_tokens": usage.prompt_token_count or 0,
+            "candidates_tokens": usage.candidates_token_count or 0,
+            "total_tokens": usage.total_token_count or 0
+        }
+
+    @staticmethod
+    def _error_result(error):
+        """Gray verdict explaining why the model gave no answer."""
+        error_msg = str(error)
+        # Identify specific errors for the user
+        reason = "Error en generación IA."
+        if "quota" in error_msg.lower():
+            reason = "Límite de cuota API excedido."
+        elif "api key" in error_msg.lower():
+            reason = "Error de API Key. Revisa .env"
+
+        return {
+            "signal": "Gray",
+            "reasoning": f"{reason} ({error_msg[:50]}...)",
+            "levels": "N/A"
+        }
+
+    def _asset_section(self, item):
+        """Per-asset part of a batch prompt."""
+        return (f"### {item['symbol']}\n"
+                f"Analysis Data Context (MTF Trends, Indicators, Sentiment, Walls): {item.get('context', 'Neutral')}\n"
+                f"Recent Price Data (OHLCV last candles):\n{self._candles(item['price_data'])}\n")
+
+    def _batch_preamble(self, feedback="", image_bytes=None):
+        """Instruction block shared by every asset of a batch (sent once per request)."""
+        vision = ("IMPORTANT: An image of a chart is provided. Use it for the asset it depicts to identify visual patterns "
+                  "(triangles, channels, support zones) and combine it with the numerical data.") if image_bytes else ""
+        return f"""You are a seasoned financial analyst for the "Monstruo Bursátil" ecosystem.
+Your task is to analyze EACH of the following assets independently based on the provided data.
+
+{feedback}
+
+{vision}
+
+{INSTRUCTIONS}
+
+Output: JSON with one entry in "verdicts" per asset section below, using the section symbol exactly.
+signal is GREEN/YELLOW/RED, confidence 0-10 (10 is absolute certainty), reasoning concise max 3 sentences
+mentioning specific patterns or data points used, levels defines support and resistance.
+
+Assets:
+"""
+
+    def plan_batches(self, items, feedback="", image_bytes=None):
+        """
+        Splits items into batches that fit the per-request limits: asset count, estimated
+        prompt tokens (shared preamble + sections) and output tokens (one verdict per asset).
+        """
+        base = len(self._batch_preamble(feedback, image_bytes)) // CHARS_PER_TOKEN
+        max_assets = max(1, min(self.max_batch_assets, self.max_batch_output_tokens // TOKENS_PER_VERDICT))
+        batches, current, tokens = [], [], base
+        for item in items:
+            size = len(self._asset_section(item)) // CHARS_PER_TOKEN
+            if current and (len(current) >= max_assets or tokens + size > self.max_batch_prompt_tokens):
+                batches.append(current)
+                current, tokens = [], base
+            current.append(item)
+            tokens += size
+        if current: batches.append(current)
+        return batches
+
+    def analyze_batch(self, items, feedback="", image_bytes=None, cache_mode=LIVE):
+        """
+        Analyzes several assets per request: [{symbol, price_data, context}] -> {symbol: verdict}.
+        The instructions and feedback are sent once per batch and the model answers with a JSON
+        verdict per symbol. Verdicts have the analyze_asset shape; usage is the batch usage split
+        across its assets. Symbols missing from a failed or partial batch fall back to analyze_asset.
+        """
+        if not items: return {}
+        batches = self.plan_batches(items, feedback, image_bytes)
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(4, len(batches)), thread_name_prefix="ai-batch") as pool:
+            for verdicts in pool.map(lambda batch: self._analyze_chunk(batch, feedback, image_bytes, cache_mode), batches):
+                results.update(verdicts)
+        return results
+
+    def _analyze_chunk(self, batch, feedback, image_bytes, cache_mode=LIVE):
+        def single(item):
+            return self.analyze_asset(item['symbol'], item['price_data'], item.get('context', 'Neutral'),
+                                      image_bytes=image_bytes, feedback=feedback, cache_mode=cache_mode)
+
+        if len(batch) == 1:
+            return {batch[0]['symbol']: single(batch[0])}
+
+        symbols = [item['symbol'] for item in batch]
+        prompt = self._batch_preamble(feedback, image_bytes) + "\n".join(self._asset_section(item) for item in batch)
+        key = prompt_key(MODEL, prompt, image_bytes)
+        cached = self._cached(key)
+        if cached:
+            return {s: dict(v, cached=True) for s, v in cached["verdicts"].items()}
+        if not self.client:
+            return {item['symbol']: single(item) for item in batch}
+
+        results = {}
         try:
+            from google.genai import types
             contents = [prompt]
             if image_bytes:
-                # The google-genai SDK 1.0+ handles bytes directly in contents list if wrapped or as a Part
-                from google.genai import types
                 contents.append(types.Part.from_bytes(data=image_bytes, mime_type="image/png"))
-
-            response = self.client.models.generate_content(
-                model="gemini-flash-latest",
-                contents=contents
+            config = types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=BATCH_SCHEMA,
+                max_output_tokens=min(self.max_batch_output_tokens, TOKENS_PER_VERDICT * len(batch) * 2)
             )
-            parsed = self._parse_response(response.text)
-            
-            # Add token usage metadata
-            usage = response.usage_metadata
-            parsed["usage"] = {
-                "prompt_tokens": usage.prompt_token_count,
-                "candidates_tokens": usage.candidates_token_count,
-                "total_tokens": usage.total_token_count
-            }
-            return parsed
+            response = self.scheduler.call(lambda: self.client.models.generate_content(
+                model=MODEL,
+                contents=contents,
+                config=config
+            ))
+            results = self._parse_batch(response.text, symbols)
+            shares = self._split_usage(self._usage(response), len(results))
+            for verdict, usage in zip(results.values(), shares):
+                verdict["usage"] = usage
+                verdict["batch_size"] = len(batch)
+            if len(results) == len(batch):
+                self.cache.put(key, {"verdicts": results}, mode=cache_mode)
         except Exception as e:
-            error_msg = str(e)
-            print(f"Error analyzing asset {symbol}: {error_msg}")
-            # Identify specific errors for the user
-            reason = "Error en generación IA."
-            if "quota" in error_msg.lower():
-                reason = "Límite de cuota API excedido."
-            elif "api key" in error_msg.lower():
-                reason = "Error de API Key. Revisa .env"
-                
-            return {
-                "signal": "Gray",
-                "reasoning": f"{reason} ({error_msg[:50]}...)",
-                "levels": "N/A"
+            print(f"Error analyzing batch {symbols}: {e}")
+            if "quota" in str(e).lower():
+                # Per-asset retries would hit the same quota
+                return {s: self._error_result(e) for s in symbols}
+
+        missing = [item for item in batch if item['symbol'] not in results]
+        if missing:
+            print(f"DEBUG: Batch fallback to per-asset calls for {[item['symbol'] for item in missing]}")
+        for item in missing:
+            results[item['symbol']] = single(item)
+        return results
+
+    @staticmethod
+    def _parse_batch(text, symbols):
+        """JSON batch answer -> {symbol: verdict} for the requested symbols only."""
+        data = json.loads(text)
+        verdicts = data.get("verdicts", []) if isinstance(data, dict) else data
+        wanted = {s.upper(): s for s in symbols}
+        result = {}
+        for v in verdicts:
+            symbol = wanted.get(str(v.get("symbol", "")).strip().upper())
+            if not symbol or symbol in result: continue
+            signal = str(v.get("signal", "")).upper()
+            try:
+                confidence = max(0, min(10, int(v.get("confidence", 5))))
+            except (TypeError, ValueError):
+                confidence = 5
+            result[symbol] = {
+                "signal": "Green" if "GREEN" in signal else "Red" if "RED" in signal else "Yellow",
+                "confidence": confidence,
+                "reasoning": str(v.get("reasoning") or "Análisis pendiente"),
+                "levels": str(v.get("levels") or "N/A")
             }
+        return result
+
+    @staticmethod
+    def _split_usage(usage, n):
+        """Splits a batch's token usage into n integer shares that add up to the batch total."""
+        shares = [{} for _ in range(n)]
+        for key, total in usage.items():
+            for i in range(n):
+                shares[i][key] = total // n + (1 if i < total % n else 0)
+        return shares
 
     def _parse_response(self, text):
         """Simple parser to extract signal, confidence and reasoning/levels from AI response."""
@@ -129,3 +365,6 @@ if __name__ == "__main__":
     })
     analyst = AIAnalyst()
     print(analyst.analyze_asset("BTCUSDT", mock_data))
+    batch = [{"symbol": s, "price_data": mock_data, "context": "Neutral"} for s in ["BTCUSDT", "ETHUSDT", "SOLUSDT"]]
+    print("Batches:", [[i["symbol"] for i in b] for b in analyst.plan_batches(batch)])
+    print(analyst.analyze_batch(batch))
@@ -0,0 +1,179 @@
+import random
+import re
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+SERVER_ERRORS = {500, 502, 503, 504}
+
+
+class QuotaExhausted(Exception):
+    """Raised without calling the model while the API quota is known to be exhausted."""
+
+
+def classify_error(error):
+    """
+    (kind, retry_after, daily) for a model API error. kind is "quota" (429 / RESOURCE_EXHAUSTED),
+    "server" (5xx / UNAVAILABLE) or None (not retryable). retry_after is the server's RetryInfo hint
+    in seconds; daily is True when the exhausted quota is a per-day one (retrying is pointless).
+    """
+    text = str(error)
+    code = getattr(error, "code", None)
+    if code == 429 or "RESOURCE_EXHAUSTED" in text or "quota" in text.lower():
+        kind = "quota"
+    elif code in SERVER_ERRORS or any(s in text for s in ("UNAVAILABLE", "INTERNAL", "DEADLINE_EXCEEDED")):
+        kind = "server"
+    else:
+        return None, None, False
+    match = re.search(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s", text) or re.search(r"retry in (\d+(?:\.\d+)?)\s*s", text, re.I)
+    retry_after = float(match.group(1)) if match else None
+    return kind, retry_after, kind == "quota" and "PerDay" in text
+
+
+class AIScheduler:
+    """
+    Gate for every model request of the process:
+    - at most `max_concurrency` requests in flight (the rest queue),
+    - quota (429) and 5xx errors retried with exponential backoff and jitter; the backoff is
+      shared, so one rate-limited call pauses every other call instead of each one failing,
+    - once the quota is exhausted (per-day quota, or retries used up on 429s) calls fail fast
+      with QuotaExhausted for `quota_cooldown` seconds, without paying a request.
+    """
+    def __init__(self, max_concurrency=4, max_retries=3, base_delay=1.0, max_delay=30.0, quota_cooldown=300.0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.quota_cooldown = quota_cooldown
+        self.backoff_until = 0.0
+        self.exhausted_until = 0.0
+        self.queued = 0
+        self.in_flight = 0
+        self.counts = {"calls": 0, "completed": 0, "failed": 0, "retries": 0, "skipped": 0}
+        self.latencies = deque(maxlen=200) # Seconds per successful request
+        self.waits = deque(maxlen=200) # Seconds spent queued for a slot
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _check_quota(self):
+        remaining = self.exhausted_until - time.monotonic()
+        if remaining > 0:
+            self._count("skipped")
+            raise QuotaExhausted(f"API quota exhausted, skipping request (retry in {remaining:.0f}s)")
+
+    def _wait_backoff(self):
+        while True:
+            remaining = self.backoff_until - time.monotonic()
+            if remaining <= 0: return
+            time.sleep(min(remaining, 1.0))
+            self._check_quota()
+
+    def _delay(self, attempt, retry_after):
+        """Server hint if given, else exponential backoff; both with jitter so callers do not retry in lockstep."""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_delay)
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def exhaust(self, seconds=None):
+        """Marks the quota as exhausted: calls fail fast for `seconds` (default quota_cooldown)."""
+        with self._lock:
+            self.exhausted_until = max(self.exhausted_until, time.monotonic() + (seconds or self.quota_cooldown))
+        print(f"DEBUG: AI quota exhausted. Skipping model calls for {seconds or self.quota_cooldown:.0f}s.")
+
+    def reset(self):
+        with self._lock:
+            self.backoff_until = self.exhausted_until = 0.0
+
+    def call(self, fn):
+        """Runs fn() under the concurrency limit with shared backoff and retries; re-raises the last error."""
+        self._count("calls")
+        self._check_quota()
+        queued_at = time.monotonic()
+        with self._lock: self.queued += 1
+        self._slots.acquire()
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+            self.waits.append(time.monotonic() - queued_at)
+        try:
+            for attempt in range(self.max_retries + 1):
+                self._check_quota()
+                self._wait_backoff()
+                start = time.monotonic()
+                try:
+                    result = fn()
+                except Exception as e:
+                    kind, retry_after, daily = classify_error(e)
+                    last = attempt == self.max_retries
+                    if kind == "quota" and (daily or last):
+                        self.exhaust(retry_after) # Server hint when given (per-day quotas say when they reset)
+                    if kind is None or daily or last:
+                        self._count("failed")
+                        raise
+                    delay = self._delay(attempt, retry_after)
+                    with self._lock:
+                        self.backoff_until = max(self.backoff_until, time.monotonic() + delay)
+                        self.counts["retries"] += 1
+                    print(f"DEBUG: AI {kind} error, retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                    continue
+                with self._lock:
+                    self.latencies.append(time.monotonic() - start)
+                    self.counts["completed"] += 1
+                return result
+        finally:
+            with self._lock: self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        """Queue depth, in-flight requests, outcome counts, latency percentiles and backoff state."""
+        with self._lock:
+            now = time.monotonic()
+            latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+            return {
+                "queue_depth": self.queued,
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                **self.counts,
+                "latency_p50_s": round(float(np.percentile(latencies, 50)), 3),
+                "latency_p95_s": round(float(np.percentile(latencies, 95)), 3),
+                "queue_wait_avg_s": round(float(np.mean(self.waits)), 3) if self.waits else 0.0,
+                "backoff_s": max(0.0, round(self.backoff_until - now, 1)),
+                "quota_exhausted_s": max(0.0, round(self.exhausted_until - now, 1))
+            }
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import pandas as pd
+    from src.ai_analyst import AIAnalyst
+    from tests.fake_gemini import FakeGeminiServer
+    from src.llm_cache import LLMCache
+
+    candles = pd.DataFrame({"open": [1.0] * 10, "close": [1.0] * 10, "volume": [1.0] * 10})
+    symbols = [f"SYM{i}USDT" for i in range(12)]
+
+    # Transient 503/429 errors are retried; never more than 3 requests in flight
+    with FakeGeminiServer(latency=0.2, script=[503, 429]) as server:
+        analyst = AIAnalyst(cache=LLMCache(":memory:"), base_url=server.url, api_key="fake",
+                            scheduler=AIScheduler(max_concurrency=3, base_delay=0.2))
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda s: analyst.analyze_asset(s, candles), symbols))
+        print("Signals:", {r["signal"] for r in results}, "| max in flight:", server.max_in_flight)
+        print(analyst.scheduler.stats())
+
+    # Daily quota runs out after 3 requests: the rest fail fast without reaching the server
+    with FakeGeminiServer(quota_after=3) as server:
+        analyst = AIAnalyst(cache=LLMCache(":memory:"), base_url=server.url, api_key="fake", scheduler=AIScheduler(max_concurrency=2))
+        results = [analyst.analyze_asset(s, candles) for s in symbols]
+        print("Gray:", sum(r["signal"] == "Gray" for r in results), "| requests served:", len(server.requests))
+        print(analyst.scheduler.stats())
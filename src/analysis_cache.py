@@ -0,0 +1,80 @@
+import hashlib
+import math
+import threading
+import time
+
+
+def _sig(value, digits=3):
+    """Rounds to `digits` significant figures so tick-level noise does not change the fingerprint."""
+    if value is None: return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if not math.isfinite(value) or value == 0: return 0.0
+    return round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+def input_fingerprint(mtf_data, kpis, news_items, walls, extra=""):
+    """
+    Hash of everything the AI verdict depends on:
+    last closed candle per timeframe, rounded KPIs, news ids and wall levels.
+    `extra` covers the rest of the prompt inputs (learning feedback, chart image...).
+    """
+    parts = []
+    for tf in sorted(mtf_data):
+        df = mtf_data[tf]
+        # The last row is the candle still forming; the one before it is the last closed candle
+        closed = str(df['timestamp'].iloc[-2]) if df is not None and len(df) > 1 else ""
+        parts.append(f"{tf}={closed}")
+    rsi = (kpis or {}).get("RSI")
+    parts.append(f"RSI={round(rsi) if rsi is not None else None}")
+    parts += [f"{k}={_sig(v)}" for k, v in sorted((kpis or {}).items()) if k != "RSI"]
+    parts.append("news=" + ",".join(sorted(str(n.get('id') or n.get('title')) for n in news_items or [])))
+    if walls:
+        parts.append(f"walls={_sig(walls.get('buy_wall'))}/{_sig(walls.get('sell_wall'))}")
+    parts.append(hashlib.sha1(str(extra).encode()).hexdigest())
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+class VerdictCache:
+    """
+    Last AI verdict per symbol, reused while its input fingerprint is unchanged.
+    Entries older than `max_age` seconds are refreshed anyway; error verdicts (Gray) are never stored.
+    """
+    def __init__(self, max_age=4 * 3600):
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._entries = {} # symbol -> (fingerprint, stored_at, result)
+        self._lock = threading.Lock()
+
+    def get(self, symbol, fingerprint):
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry and entry[0] == fingerprint and time.time() - entry[1] < self.max_age:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def put(self, symbol, fingerprint, result):
+        if not result or result.get("signal") == "Gray": return
+        with self._lock:
+            self._entries[symbol] = (fingerprint, time.time(), result)
+
+    def last(self, symbol):
+        """Latest stored verdict of a symbol whatever its inputs or age (None if there is none)."""
+        with self._lock:
+            entry = self._entries.get(symbol)
+            return entry[2] if entry else None
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol: self._entries.pop(symbol, None)
+            else: self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": (self.hits / total) if total else 0.0, "entries": len(self._entries)}
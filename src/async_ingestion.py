@@ -0,0 +1,119 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+from src.data_ingestion import BinanceDataIngestor
+
+
+class AsyncBinanceIngestor:
+    """
+    Asyncio front-end for the Binance REST calls used in a scan cycle (klines, tickers, depth).
+    Requests run on a bounded worker pool over the shared keep-alive PooledTransport, each with
+    its own timeout, so a whole fetch phase costs about as much as its slowest request.
+    Only the REST path is concurrent: unlike BinanceDataIngestor.get_historical_data there is no
+    SDK or yfinance fallback here. Failed items come back empty and the caller decides whether to
+    retry them serially (BusinessLogic._load_frames does; the screener just skips them).
+    """
+    def __init__(self, ingestor=None, transport=None, max_concurrency=16, timeout=8):
+        self.ingestor = ingestor
+        self.transport = transport or (ingestor.transport if ingestor else None)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="async-ingest")
+
+    async def _get(self, endpoint, params, semaphore, parse=None):
+        """GET on the worker pool; `parse` also runs there so the event loop never parses a frame."""
+        def fetch():
+            data = self.transport.get(endpoint, params=params, timeout=self.timeout)
+            return parse(data) if parse else data
+
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            return await asyncio.wait_for(loop.run_in_executor(self._executor, fetch), timeout=self.timeout + 1)
+
+    async def get_historical_data(self, symbol, interval="1h", limit=200, semaphore=None):
+        stream = getattr(self.ingestor, 'stream', None)
+        if stream and stream.is_warm(symbol, interval, limit):
+            return stream.get_frame(symbol, interval, limit)
+        return await self._get("/api/v3/klines", {"symbol": symbol, "interval": interval, "limit": limit},
+                               semaphore or asyncio.Semaphore(1),
+                               lambda data: BinanceDataIngestor.klines_to_frame(data) if data else pd.DataFrame())
+
+    async def get_order_book(self, symbol, limit=100, semaphore=None):
+        return await self._get("/api/v3/depth", {"symbol": symbol, "limit": limit}, semaphore or asyncio.Semaphore(1))
+
+    async def get_ticker_24hr(self, semaphore=None):
+        data = await self._get("/api/v3/ticker/24hr", None, semaphore or asyncio.Semaphore(1))
+        return pd.DataFrame(data) if data else pd.DataFrame()
+
+    async def fetch_market_snapshot(self, symbols, timeframes, limits=None, depth=True):
+        """
+        Fetches every (symbol, timeframe) kline series and depth snapshot concurrently.
+        Returns {symbol: {"mtf": {tf: DataFrame}, "depth": dict|None}}; failed or timed-out
+        requests come back empty (no SDK / yfinance retry) so callers can fall back per item.
+        """
+        limits = limits or {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        jobs = []
+        for symbol in symbols:
+            for tf in timeframes:
+                jobs.append((symbol, tf, self.get_historical_data(symbol, tf, limits.get(tf, 200), semaphore)))
+            if depth:
+                books = getattr(self.ingestor, 'order_books', None)
+                if not (books and books.is_synced(symbol)):
+                    jobs.append((symbol, "depth", self.get_order_book(symbol, 100, semaphore)))
+
+        results = await asyncio.gather(*[j[2] for j in jobs], return_exceptions=True)
+
+        snapshot = {s: {"mtf": {}, "depth": None} for s in symbols}
+        for (symbol, key, _), result in zip(jobs, results):
+            if isinstance(result, BaseException):
+                print(f"DEBUG: Async fetch {symbol} {key} failed: {type(result).__name__}")
+                result = None
+            if key == "depth":
+                snapshot[symbol]["depth"] = result
+            else:
+                snapshot[symbol]["mtf"][key] = result if result is not None else pd.DataFrame()
+        return snapshot
+
+    def fetch_all(self, symbols, timeframes, limits=None, depth=True):
+        """Synchronous entry point for the fetch phase (runs its own event loop)."""
+        # Not asyncio.run(): on the main thread Python 3.11 repr()s the finished task (every frame) when restoring SIGINT
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self.fetch_market_snapshot(symbols, timeframes, limits, depth))
+        finally:
+            loop.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    from tests.fake_binance import FakeBinanceServer
+    from src.http_transport import PooledTransport
+
+    symbols = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT", "ADAUSDT",
+               "DOGEUSDT", "TRXUSDT", "LINKUSDT", "DOTUSDT", "LTCUSDT", "NEARUSDT"]
+    timeframes = ["15m", "1h", "4h"]
+
+    with FakeBinanceServer(latency=0.1) as server:
+        transport = PooledTransport([server.url], timeout=5)
+
+        t0 = time.perf_counter()
+        for s in symbols:
+            for tf in timeframes:
+                transport.get("/api/v3/klines", params={"symbol": s, "interval": tf, "limit": 200})
+            transport.get("/api/v3/depth", params={"symbol": s, "limit": 100})
+        serial = time.perf_counter() - t0
+
+        ingestor = AsyncBinanceIngestor(transport=transport, max_concurrency=32)
+        t0 = time.perf_counter()
+        snap = ingestor.fetch_all(symbols, timeframes)
+        concurrent = time.perf_counter() - t0
+        ingestor.close()
+
+        n = len(symbols) * (len(timeframes) + 1)
+        print(f"{n} requests @100ms injected latency: serial {serial:.2f}s | asyncio gather {concurrent:.2f}s ({serial / concurrent:.1f}x)")
+        print(f"BTCUSDT 1h rows: {len(snap['BTCUSDT']['mtf']['1h'])}, depth levels: {len(snap['BTCUSDT']['depth']['bids'])}")
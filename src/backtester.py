@@ -9,19 +9,25 @@ class Backtester:
         self.results = []
         self.equity_curve = []
 
-    def run_simulation(self, symbol, interval="1h", days=7, initial_capital=1000, step=4):
+    def run_simulation(self, symbol, interval="1h", days=7, initial_capital=1000, step=4, analyst=None):
         """
         Runs a backtesting simulation.
         Step: Analyze every N candles to save tokens.
+        Analyst: backend giving the signals (default: the AI analyst); see src.offline_analyst.
         """
+        analyst = analyst or self.ai
         df = self.ingestor.get_long_history(symbol, interval, days)
         if df.empty:
             return {"error": "No data available for the period."}
 
+        self.equity_curve = [] # Fresh curve per run (reruns used to append to the previous one)
         capital = initial_capital
         position = 0 # 0 for neutral, >0 for long
         entry_price = 0
         trades = []
+        usage = {"prompt_tokens": 0, "candidates_tokens": 0}
+        cached_steps = 0
+        steps = 0
         
         # We need at least 50 candles for indicators context
         start_idx = 50
@@ -34,8 +40,14 @@ class Backtester:
             
             # Get AI signal
             # Optimization: could pass simpler context for backtest
-            analysis = self.ai.analyze_asset(symbol, window, context="BACKTESTING MODE")
+            # Historical windows never change: cached verdicts are kept forever and cost nothing
+            analysis = analyst.analyze_asset(symbol, window, context="BACKTESTING MODE", cache_mode="backtest")
             signal = analysis['signal']
+            steps += 1
+            if analysis.get('cached'):
+                cached_steps += 1
+            else:
+                for k in usage: usage[k] += (analysis.get('usage') or {}).get(k, 0)
             
             # Logic for Long Only simulation (simplification)
             if signal == "Green" and position == 0:
@@ -95,5 +107,8 @@ class Backtester:
             "win_rate": win_rate,
             "total_trades": len(trades),
             "trades": trades,
-            "equity_curve": self.equity_curve
+            "equity_curve": self.equity_curve,
+            "usage": usage, # Tokens spent by this run (cache hits excluded)
+            "steps": steps,
+            "cached_steps": cached_steps
         }
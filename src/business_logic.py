@@ -1,38 +1,183 @@
-from src.data_ingestion import BinanceDataIngestor
-from src.ai_analyst import AIAnalyst
+from src.resampler import TimeframeResampler
+from src.kline_store import INTERVAL_MS
+from src.indicators import KPI_KEYS
+from src.incremental_indicators import KPITracker
+from src.analysis_cache import VerdictCache, input_fingerprint
+from src.token_budget import CHEAP, REUSE, TokenBudget
+from src.prompt_codec import PromptEvalSet, encode_candles, encode_context, join_context, prompt_report
+from src.correlation_engine import CorrelationEngine
+from src.compact_payload import compact_asset
+from src.report_exporter import ReportExporter
+from src.whale_detector import WhaleDetector
 from src.news_scraper import NewsScraper
-from src.notifier import TelegramNotifier
 from src.backtester import Backtester
 from src.trading_journal import TradingJournal
-from src.execution_engine import ExecutionEngine
 from src.strategy_manager import StrategyManager
 from src.intelligence_core import IntelligenceCore
+from src.startup_profiler import STARTUP
 import pandas as pd
+import os
 import time
-import io
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 
 class BusinessLogic:
+    """
+    Facade used by the dashboard and the agent.
+    Components (API clients, heavy SDK modules, JSON-backed state) are created on first
+    use; STARTUP records the import and init time of each one.
+    """
     def __init__(self):
-        self.ingestor = BinanceDataIngestor()
-        self.ai = AIAnalyst()
-        self.news = NewsScraper()
-        self.notifier = TelegramNotifier()
-        self.backtester = Backtester(self.ai, self.ingestor)
-        self.execution = ExecutionEngine(mode="simulation") # Default to simulation
+        self._components = {}
         self.cache = {}
         self.last_update = 0
         self.update_interval = 60
         self.timeframes = ["15m", "1h", "4h"]
+        self.base_timeframe = "15m" # 1h is resampled from it; 4h is downloaded natively (see native_timeframes)
+        self.base_limit = 1000 # 1000 x 15m -> 250 x 1h, but only 62 x 4h
+        self.candle_limits = {"15m": 100, "1h": 200, "4h": 200} # Candles per timeframe handed to the analysis
+        self.resampler = TimeframeResampler(self.base_timeframe)
+        self.kpi_tracker = KPITracker(length=200) # Incremental KPIs per symbol across cycles
+        self.verdict_cache = VerdictCache() # Reuses AI verdicts while the inputs have not moved
+        self.token_budget = TokenBudget() # Per-cycle / hourly / daily token budgets shared with the agent
+        self.budget_source = "dashboard" # Ledger label of this process ("agent" in monstruo_agent)
+        # PROMPT_EVAL_RECORD=1 runs the analyst with verbose prompts and stores its verdicts for PromptEvalSet.evaluate
+        self.prompt_eval = PromptEvalSet() if os.getenv("PROMPT_EVAL_RECORD") == "1" else None
+        self.correlation = CorrelationEngine(window=50) # Rolling 1h return correlations of the scanned universe
+        self._full_data = {} # Latest full-resolution MTF frames per symbol, shared by all sessions
+        self.reports = ReportExporter() # Report bytes cached per overview version
+        self.whale_detector = WhaleDetector(window=48, threshold=3.5) # Volume anomalies on every timeframe
+        self.overview_version = 0
         self.notified_signals = {} # Track last notified signal per symbol
-        self.journal = TradingJournal() 
-        self.strategy = StrategyManager() # Phase 17: Snowball
-        self.intelligence = IntelligenceCore(self.journal) # Phase 19: Self-Correction
+        self.max_workers = 8 # Symbols analyzed in parallel
+        self.batch_ai = True # Several symbols per AI request (AIAnalyst.analyze_batch)
+        # Per-stage timeouts (seconds); a stage that times out falls back to a partial result
+        self.stage_timeouts = {"fetch": 15, "news": 8, "walls": 5, "ai": 45, "ai_batch": 90, "notify": 10}
+        self._stage_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="stage")
+        self._components_lock = threading.RLock()
         self.debug_v = "17.0" # Hyper-Intelligence Ready
 
-    def run_backtest(self, symbol, interval="1h", days=7):
-        """Bridge to run backtest simulation."""
+    def _component(self, name, factory):
+        """Builds a component once, on first access."""
+        if name not in self._components:
+            with self._components_lock:
+                if name not in self._components:
+                    with STARTUP.timed(f"init {name}"):
+                        self._components[name] = factory()
+        return self._components[name]
+
+    def _run_stage(self, stage, symbol, fn, fallback, degraded, on_late=None):
+        """
+        Runs one pipeline stage with its own timeout. On timeout or error the fallback is
+        returned and the stage name recorded in `degraded`. The late call is left to finish
+        (calls carry their own request timeouts) and its result is passed to `on_late`.
+        """
+        future = self._stage_pool.submit(fn)
+        try:
+            return future.result(timeout=self.stage_timeouts.get(stage))
+        except FutureTimeout:
+            print(f"DEBUG: {stage} timed out for {symbol} after {self.stage_timeouts.get(stage)}s")
+            if on_late:
+                future.add_done_callback(lambda f: f.exception() is None and on_late(f.result()))
+        except Exception as e:
+            print(f"DEBUG: {stage} failed for {symbol}: {e}")
+        degraded.append(stage)
+        return fallback
+
+    def _warm_components(self):
+        """Creates the shared components before the worker threads use them."""
+        for name in ("ai", "news", "notifier"):
+            getattr(self, name)
+
+    @property
+    def ingestor(self):
+        return self._component("ingestor", lambda: STARTUP.import_module("src.data_ingestion").BinanceDataIngestor())
+
+    @property
+    def async_ingestor(self):
+        return self._component("async_ingestor", lambda: STARTUP.import_module("src.async_ingestion").AsyncBinanceIngestor(self.ingestor))
+
+    @property
+    def ai(self):
+        backend = os.getenv("ANALYST_BACKEND", "gemini") # rules / replay: offline analysts for load tests
+        if backend != "gemini":
+            return self._component("ai", lambda: STARTUP.import_module("src.offline_analyst").make_analyst(backend))
+        compact = False if self.prompt_eval else None # Recording needs the verbose encoding
+        return self._component("ai", lambda: STARTUP.import_module("src.ai_analyst").AIAnalyst(compact=compact))
+
+    @property
+    def news(self):
+        return self._component("news", NewsScraper)
+
+    @property
+    def notifier(self):
+        return self._component("notifier", lambda: STARTUP.import_module("src.notifier").TelegramNotifier())
+
+    @property
+    def screener(self):
+        return self._component("screener", lambda: STARTUP.import_module("src.market_screener").MarketScreener(self.ingestor, self.async_ingestor))
+
+    @property
+    def backtester(self):
+        return self._component("backtester", lambda: Backtester(self.ai, self.ingestor))
+
+    @property
+    def execution(self):
+        # Default to simulation
+        return self._component("execution", lambda: STARTUP.import_module("src.execution_engine").ExecutionEngine(mode="simulation"))
+
+    @property
+    def journal(self):
+        return self._component("journal", TradingJournal)
+
+    @property
+    def strategy(self):
+        return self._component("strategy", StrategyManager) # Phase 17: Snowball
+
+    @property
+    def intelligence(self):
+        return self._component("intelligence", lambda: IntelligenceCore(self.journal)) # Phase 19: Self-Correction
+
+    @intelligence.setter
+    def intelligence(self, value):
+        self._components["intelligence"] = value
+
+    def startup_report(self):
+        """Import/init timings of the components created so far."""
+        return STARTUP.report()
+
+    def ai_stats(self):
+        """AI request scheduler state (queue depth, latency, retries, quota); empty before the first analysis."""
+        ai = self._components.get("ai")
+        scheduler = getattr(ai, "scheduler", None)
+        return scheduler.stats() if scheduler else {}
+
+    def screen_market(self, limit=8):
+        """Whole-market pre-screen: ranked shortlist of USDT pairs worth an AI analysis."""
+        try:
+            return self.screener.shortlist(limit)
+        except Exception as e:
+            print(f"DEBUG: Screener failed: {e}")
+            return pd.DataFrame()
+
+    def run_backtest(self, symbol, interval="1h", days=7, step=4, backend=None):
+        """
+        Bridge to run backtest simulation.
+        backend: "gemini", "rules" (offline, no tokens) or "replay" (recorded verdicts; windows
+        not yet recorded are asked to Gemini when a key is set, else to the rules).
+        Defaults to gemini, or rules when there is no API key (every step would be Gray).
+        """
         self.backtester.ingestor = self.ingestor
-        return self.backtester.run_simulation(symbol, interval=interval, days=days)
+        has_key = bool(getattr(self.ai, "api_key", None))
+        backend = backend or ("gemini" if has_key else "rules")
+        if backend == "gemini":
+            analyst = self.ai
+        else:
+            offline = STARTUP.import_module("src.offline_analyst")
+            kwargs = {"record_from": self.ai} if backend == "replay" and has_key else {}
+            analyst = self._component(f"analyst_{backend}", lambda: offline.make_analyst(backend, **kwargs))
+        return self.backtester.run_simulation(symbol, interval=interval, days=days, step=step, analyst=analyst)
         
     def is_healthy(self):
         """Checks if any data connection (Binance or Fallback) is alive."""
@@ -54,12 +199,8 @@ class BusinessLogic:
         if specific_symbols:
             print(f"DEBUG: Processing specific symbols: {specific_symbols}")
             try:
-                # Use robust method instead of raw client
+                # Shared TTL cache: same parsed 24hr frame as the ticker bar
                 df_24h = self.ingestor.get_all_tickers()
-                if df_24h.empty:
-                    # Fallback to second robust method if first is too light
-                    tickers = self.ingestor._fetch_rest("/api/v3/ticker/24hr")
-                    if tickers: df_24h = pd.DataFrame(tickers)
                 
                 if df_24h.empty: return []
 
@@ -86,159 +227,102 @@ class BusinessLogic:
             if current_time - self.last_update < self.update_interval and "top_movers" in self.cache:
                 top_movers = self.cache["top_movers"]
             else:
-                top_movers = self.ingestor.get_top_movers(limit=4)
+                # Pre-screened shortlist of the whole exchange; plain top movers as fallback
+                top_movers = self.screen_market(limit=4)
+                if top_movers.empty:
+                    top_movers = self.ingestor.get_top_movers(limit=4)
                 self.cache["top_movers"] = top_movers
                 self.last_update = current_time
 
         analyzed_assets = []
+        limits = self.candle_limits
+        fetch_limits = self.fetch_limits()
 
-        for index, row in top_movers.iterrows():
-            symbol = row['symbol']
-            price_change = row['priceChangePercent']
-            vol_24h = row['quoteVolume']
-            print(f"DEBUG: Processing {symbol}...")
-            
-            # Fetch MTF Context
-            mtf_data = {}
-            for tf in self.timeframes:
+        # Concurrent fetch phase: the base interval and the native timeframes per symbol (+ depth) in one gather
+        try:
+            prefetched = self.async_ingestor.fetch_all(list(top_movers['symbol']), list(fetch_limits), fetch_limits)
+        except Exception as e:
+            print(f"DEBUG: Concurrent fetch failed, falling back to serial: {e}")
+            prefetched = {}
+
+        # MTF Context: the timeframes the base window covers are derived locally from the base series.
+        # Series the concurrent phase could not fetch fall back to the SDK / yfinance in parallel
+        symbols = list(top_movers['symbol'])
+        fetch_degraded = {symbol: [] for symbol in symbols}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="overview") as pool:
+            fetched = dict(zip(symbols, pool.map(
+                lambda symbol: self._load_frames(symbol, prefetched, fetch_limits, fetch_degraded[symbol]), symbols
+            )))
+        mtf_by_symbol = {}
+        native = self.native_timeframes()
+        derived = [tf for tf in self.timeframes if tf not in native]
+        for symbol, frames in fetched.items():
+            base = frames[self.base_timeframe]
+            mtf = self.resampler.derive_all(symbol, base, derived, limits) if not base.empty else {tf: pd.DataFrame() for tf in derived}
+            mtf.update({tf: frames[tf].tail(limits.get(tf, 200)).reset_index(drop=True) for tf in native})
+            mtf_by_symbol[symbol] = {tf: mtf[tf] for tf in self.timeframes}
+
+        self._full_data.update(mtf_by_symbol)
+
+        # Whale Watcher: robust volume z-scores for all symbols and timeframes in one pass
+        try:
+            whale_map = self.whale_detector.scan(mtf_by_symbol)
+        except Exception as e:
+            print(f"DEBUG: Whale scan failed: {e}")
+            whale_map = {}
+
+        try:
+            self.correlation.update({s: mtf.get("1h") for s, mtf in mtf_by_symbol.items()})
+        except Exception as e:
+            print(f"DEBUG: Correlation update failed: {e}")
+
+        # Technical Analysis (KPIs) - BEFORE AI to provide context. Only new candles are processed;
+        # symbols seen for the first time are seeded together in one vectorized pass
+        try:
+            kpi_map = self.kpi_tracker.update({s: mtf.get("1h") for s, mtf in mtf_by_symbol.items()})
+        except Exception as e:
+            print(f"DEBUG: Error calculating KPIs: {e}")
+            kpi_map = {}
+
+        # Same for every symbol: build it once before fanning out
+        try:
+            feedback_context = self.intelligence.get_context_for_ai() # Phase 19: dynamic learning context
+        except Exception as e:
+            print(f"DEBUG: Learning context failed: {e}")
+            feedback_context = ""
+        self._warm_components()
+
+        # Per-symbol pipeline, phase 1: news and walls -> AI context (independent jobs, time ~ slowest symbol)
+        jobs = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="overview") as pool:
+            futures = []
+            for index, row in top_movers.iterrows():
+                symbol = row['symbol']
+                futures.append((symbol, pool.submit(
+                    self._prepare_symbol, row, mtf_by_symbol[symbol], kpi_map.get(symbol) or {k: None for k in KPI_KEYS}, whale_map.get(symbol),
+                    prefetched.get(symbol, {}).get("depth"), image_bytes, feedback_context, fetch_degraded[symbol]
+                )))
+            for symbol, future in futures:
                 try:
-                    # Map common strings to binance intervals if needed
-                    interval = tf
-                    limit = 100 if tf == "15m" else 200
-                    history = self.ingestor.get_historical_data(symbol, interval=interval, limit=limit)
-                    mtf_data[tf] = history
+                    jobs.append(future.result())
                 except Exception as e:
-                    print(f"DEBUG: {tf} fetch failed for {symbol}: {e}")
-                    mtf_data[tf] = pd.DataFrame()
-
-            # Main history (1h default for back compatibility)
-            history = mtf_data.get("1h", pd.DataFrame())
-            
-            # Whale Watcher (Volume Anomaly Detection)
-            whale_alert = False
-            vol_anomaly_score = 0
-            if not mtf_data["1h"].empty:
-                avg_vol = mtf_data["1h"]['volume'].tail(24).mean()
-                last_vol = mtf_data["1h"]['volume'].iloc[-1]
-                if last_vol > avg_vol * 3: # 300% spike
-                    whale_alert = True
-                    vol_anomaly_score = (last_vol / avg_vol)
+                    print(f"DEBUG: Pipeline failed for {symbol}: {e}")
 
-            try:
-                news_items = self.news.get_news_for_asset(symbol)
-            except Exception as e:
-                print(f"DEBUG: News fetch failed for {symbol}: {e}")
-                news_items = []
-            
-            # MTF & Whale Context for AI
-            mtf_summary = []
-            for tf, df in mtf_data.items():
-                if not df.empty:
-                    last_c = df['close'].iloc[-1]
-                    prev_c = df['close'].iloc[-2] if len(df) > 1 else last_c
-                    tf_change = ((last_c - prev_c) / prev_c) * 100
-                    mtf_summary.append(f"{tf}: {tf_change:+.2f}%")
-            
-            news_context = f"Latest {len(news_items)} news headlines: " + "; ".join([n['title'] for n in news_items]) if news_items else "No recent news."
-            whale_context = f" | WHALE ALERT: Volume spike {vol_anomaly_score:.1f}x average!" if whale_alert else ""
-            
-            # Order Book Walls
-            walls = self.process_depth_walls(symbol)
-            wall_context = ""
-            if walls:
-                if walls['buy_wall']: wall_context += f" | BUY WALL found at {walls['buy_wall']}"
-                if walls['sell_wall']: wall_context += f" | SELL WALL found at {walls['sell_wall']}"
-            
-            full_context = f"MTF Trends ({', '.join(mtf_summary)}) | {news_context}{whale_context}{wall_context}"
+            # Phase 2: AI verdicts for the symbols whose inputs moved (batched requests)
+            self._run_ai(jobs, image_bytes, feedback_context, pool)
 
-            # Technical Analysis (KPIs) - Moved BEFORE AI to provide context
-            kpis = {"RSI": None, "SMA_20": None, "EMA_50": None, "MACD": None, "BB_Upper": None, "BB_Lower": None}
-            if not history.empty and len(history) > 50:
+            # Phase 3: asset dicts and notifications
+            for job, future in [(job, pool.submit(self._finish_symbol, job)) for job in jobs]:
                 try:
-                    history['SMA_20'] = history['close'].rolling(window=20).mean()
-                    history['EMA_50'] = history['close'].ewm(span=50, adjust=False).mean()
-                    
-                    # RSI
-                    delta = history['close'].diff()
-                    gain = (delta.where(delta > 0, 0)).ewm(alpha=1/14, adjust=False).mean()
-                    loss = (-delta.where(delta < 0, 0)).ewm(alpha=1/14, adjust=False).mean()
-                    rs = gain / loss
-                    history['RSI_14'] = 100 - (100 / (1 + rs))
-                    
-                    # MACD
-                    history['EMA_12'] = history['close'].ewm(span=12, adjust=False).mean()
-                    history['EMA_26'] = history['close'].ewm(span=26, adjust=False).mean()
-                    history['MACD'] = history['EMA_12'] - history['EMA_26']
-                    history['MACD_Signal'] = history['MACD'].ewm(span=9, adjust=False).mean()
-                    
-                    # Bollinger Bands
-                    history['STD_20'] = history['close'].rolling(window=20).std()
-                    history['BB_Upper'] = history['SMA_20'] + (history['STD_20'] * 2)
-                    history['BB_Lower'] = history['SMA_20'] - (history['STD_20'] * 2)
-                    
-                    kpis["RSI"] = history['RSI_14'].iloc[-1]
-                    kpis["SMA_20"] = history['SMA_20'].iloc[-1]
-                    kpis["EMA_50"] = history['EMA_50'].iloc[-1]
-                    kpis["MACD"] = history['MACD'].iloc[-1]
-                    kpis["BB_Upper"] = history['BB_Upper'].iloc[-1]
-                    kpis["BB_Lower"] = history['BB_Lower'].iloc[-1]
+                    analyzed_assets.append(future.result())
                 except Exception as e:
-                    print(f"DEBUG: Error calculating KPIs for {symbol}: {e}")
+                    print(f"DEBUG: Pipeline failed for {job['symbol']}: {e}")
+
+        # Version stamp for cached exports of this overview
+        self.overview_version += 1
+        for asset in analyzed_assets:
+            asset['overview_version'] = self.overview_version
 
-            # AI Analysis
-            print(f"DEBUG: Analyzing {symbol} with AI...")
-            kpi_context = f" | RSI: {kpis['RSI']:.1f} | MACD: {kpis['MACD']:.4f} | BB: [{kpis['BB_Lower']:.2f} - {kpis['BB_Upper']:.2f}]" if kpis['RSI'] else ""
-            
-            # Phase 19: Get dynamic learning context
-            feedback_context = self.intelligence.get_context_for_ai()
-            
-            ai_result = self.ai.analyze_asset(
-                symbol, 
-                history, 
-                full_context + kpi_context, 
-                image_bytes=image_bytes,
-                feedback=feedback_context
-            )
-            
-            asset_obj = {
-                "symbol": symbol,
-                "price": row['lastPrice'],
-                "change_24h": price_change,
-                "volume": vol_24h,
-                "whale_alert": whale_alert,
-                "vol_anomaly": vol_anomaly_score,
-                "mtf_summary": mtf_summary,
-                "signal": ai_result["signal"],
-                "confidence": ai_result.get("confidence", 5),
-                "reasoning": ai_result["reasoning"],
-                "levels": ai_result["levels"],
-                "usage": ai_result.get("usage", {}),
-                "history": history,
-                "mtf_data": mtf_data,
-                "kpis": kpis,
-                "news": news_items,
-                "walls": walls
-            }
-            analyzed_assets.append(asset_obj)
-            
-            # Send Notification if Signal is High Conviction and changed
-            if asset_obj['signal'] in ["Green", "Red"]:
-                last_sig = self.notified_signals.get(symbol)
-                confidence = asset_obj.get('confidence', 5)
-                
-                if last_sig != asset_obj['signal'] and confidence >= 8:
-                    print(f"DEBUG: High Confidence Signal ({confidence}/10) for {symbol}. Notifying...")
-                    self.notifier.send_signal(
-                        symbol=symbol,
-                        signal=asset_obj['signal'],
-                        price=asset_obj['price'],
-                        reasoning=asset_obj['reasoning']
-                    )
-                    self.notified_signals[symbol] = asset_obj['signal']
-            elif asset_obj['signal'] == "Yellow":
-                # Clear notified status if it goes back to neutral
-                self.notified_signals[symbol] = "Yellow"
-            
         # Sort by volume descending
         analyzed_assets.sort(key=lambda x: x.get('volume', 0), reverse=True)
 
@@ -253,6 +337,283 @@ class BusinessLogic:
         print(f"DEBUG: Returning {len(analyzed_assets)} analyzed assets.")
         return analyzed_assets
 
+    def native_timeframes(self):
+        """Timeframes whose candle_limits span more than the base window: downloaded, not resampled."""
+        span = self.base_limit * INTERVAL_MS[self.base_timeframe]
+        return [tf for tf in self.timeframes
+                if tf != self.base_timeframe and self.candle_limits.get(tf, 200) * INTERVAL_MS[tf] > span]
+
+    def fetch_limits(self):
+        """{interval: candles} downloaded per symbol and cycle: the base series plus the native timeframes."""
+        limits = {self.base_timeframe: self.base_limit}
+        limits.update({tf: self.candle_limits.get(tf, 200) for tf in self.native_timeframes()})
+        return limits
+
+    def _load_frames(self, symbol, prefetched, fetch_limits, degraded):
+        """{interval: candles} for one symbol: prefetched frames, else the serial fallback (fetch stage)."""
+        frames = {}
+        for interval, limit in fetch_limits.items():
+            df = prefetched.get(symbol, {}).get("mtf", {}).get(interval)
+            if df is None or df.empty:
+                # Serial fallback (SDK / yfinance)
+                df = self._run_stage(
+                    "fetch", symbol,
+                    lambda interval=interval, limit=limit: self.ingestor.get_historical_data(symbol, interval=interval, limit=limit),
+                    pd.DataFrame(), degraded
+                )
+            frames[interval] = df if df is not None else pd.DataFrame()
+        return frames
+
+    def _prepare_symbol(self, row, mtf_data, kpis, whale, depth, image_bytes, feedback_context, degraded):
+        """
+        First part of one symbol's pipeline: news and depth walls (each with its own timeout)
+        turned into the AI context. A failed stage only removes its part. The cached verdict is
+        attached when the inputs have not moved since it was produced.
+        """
+        symbol = row['symbol']
+        print(f"DEBUG: Processing {symbol}...")
+
+        # Main history (1h default for back compatibility)
+        history = mtf_data.get("1h", pd.DataFrame())
+
+        # Whale Watcher (Volume Anomaly Detection, computed for all symbols in get_market_overview)
+        whale = whale or {}
+        whale_alert = whale.get("whale_alert", False)
+        vol_anomaly_score = whale.get("vol_anomaly", 0)
+
+        news_items = self._run_stage("news", symbol, lambda: self.news.get_news_for_asset(symbol), [], degraded) or []
+
+        # MTF & Whale Context for AI
+        mtf_summary = []
+        for tf, df in mtf_data.items():
+            if not df.empty:
+                last_c = df['close'].iloc[-1]
+                prev_c = df['close'].iloc[-2] if len(df) > 1 else last_c
+                tf_change = ((last_c - prev_c) / prev_c) * 100
+                mtf_summary.append(f"{tf}: {tf_change:+.2f}%")
+
+        news_context = f"Latest {len(news_items)} news headlines: " + "; ".join([n['title'] for n in news_items]) if news_items else "No recent news."
+        whale_context = f" | WHALE ALERT: Volume spike {vol_anomaly_score:.1f}x median on {whale.get('timeframe')} (robust z {whale.get('z', 0):.1f})!" if whale_alert else ""
+
+        # Order Book Walls
+        walls = self._run_stage("walls", symbol, lambda: self.process_depth_walls(symbol, depth=depth), None, degraded)
+        wall_context = ""
+        if walls:
+            if walls['buy_wall']: wall_context += f" | BUY WALL found at {walls['buy_wall']}"
+            if walls['sell_wall']: wall_context += f" | SELL WALL found at {walls['sell_wall']}"
+
+        full_context = f"MTF Trends ({', '.join(mtf_summary)}) | {news_context}{whale_context}{wall_context}"
+        cheap_context = f"MTF Trends ({', '.join(mtf_summary)}){whale_context}{wall_context}" # Cheap tier: no headlines
+
+        kpi_context = f" | RSI: {kpis['RSI']:.1f} | MACD: {kpis['MACD']:.4f} | BB: [{kpis['BB_Lower']:.2f} - {kpis['BB_Upper']:.2f}]" if kpis['RSI'] else ""
+
+        # Compact encoding (relative deltas, fixed precision, short keys); the verbose strings are kept
+        # for the prompt-size report and the evaluation set
+        sections = encode_context(mtf_summary, kpis, row['lastPrice'], whale, walls, news_items)
+        compact_context = join_context(sections)
+        compact_cheap = join_context({k: v for k, v in sections.items() if k != "news"})
+
+        image_hash = hashlib.sha1(image_bytes).hexdigest() if image_bytes else ""
+        fingerprint = input_fingerprint(mtf_data, kpis, news_items, walls, extra=f"{feedback_context}|{image_hash}")
+        ai_result = self.verdict_cache.get(symbol, fingerprint)
+        if ai_result is not None:
+            print(f"DEBUG: Inputs unchanged for {symbol}, reusing AI verdict.")
+            ai_result = dict(ai_result, usage={}) # No tokens spent this cycle
+
+        return {
+            "row": row, "symbol": symbol, "history": history, "mtf_data": mtf_data, "mtf_summary": mtf_summary,
+            "kpis": kpis, "whale": whale, "news": news_items, "walls": walls, "degraded": degraded,
+            "verbose_context": full_context + kpi_context, "verbose_cheap_context": cheap_context + kpi_context,
+            "compact_context": compact_context, "compact_cheap_context": compact_cheap, "fingerprint": fingerprint,
+            "ai_result": ai_result, "verdict_reused": ai_result is not None
+        }
+
+    def _ai_fallback(self, stage):
+        return {
+            "signal": "Gray",
+            "reasoning": f"IA sin respuesta a tiempo ({self.stage_timeouts.get(stage)}s). KPIs y muros conservados.",
+            "levels": "N/A"
+        }
+
+    def _priority(self, job):
+        row, kpis, whale = job['row'], job['kpis'], job['whale']
+        price = row['lastPrice'] or 0
+        volatility = (kpis['BB_Upper'] - kpis['BB_Lower']) / price if kpis.get('BB_Upper') and price else 0.0
+        return self.token_budget.priority(
+            in_position=job['symbol'] in getattr(self.execution, "active_trades", {}),
+            whale_alert=whale.get("whale_alert", False), vol_anomaly=whale.get("vol_anomaly", 0),
+            change_24h=row['priceChangePercent'], volatility=volatility
+        )
+
+    def _run_ai(self, jobs, image_bytes, feedback_context, pool):
+        """
+        AI stage for every job without a reusable verdict. The token budget ranks them and
+        decides who gets a full analysis, a cheap one (short prompt) or keeps its last verdict.
+        Several symbols go out as batched requests (shared instructions, one JSON verdict per
+        symbol) under the ai_batch timeout; a single symbol, or batch_ai off, uses the
+        per-asset call under the ai timeout.
+        """
+        pending = [job for job in jobs if job['ai_result'] is None]
+        if not pending: return
+
+        tiers = self.token_budget.plan({job['symbol']: self._priority(job) for job in pending})
+        for job in pending:
+            job['ai_tier'] = tiers[job['symbol']]
+            if job['ai_tier'] == REUSE:
+                last = self.verdict_cache.last(job['symbol'])
+                job['ai_result'] = dict(last, usage={}) if last else {
+                    "signal": "Gray", "reasoning": "Presupuesto de tokens agotado y sin veredicto previo.", "levels": "N/A"
+                }
+                job['verdict_reused'] = last is not None
+                if not last: job['degraded'].append("budget")
+        requests = [job for job in pending if job['ai_tier'] != REUSE]
+        if not requests: return
+        print(f"DEBUG: Token budget plan: {self.token_budget.stats()['last_plan']}")
+
+        compact = getattr(self.ai, "compact", False)
+
+        def request(job):
+            cheap = job['ai_tier'] == CHEAP
+            price_data = job['history'].tail(3) if cheap else job['history']
+            verbose = job['verbose_cheap_context'] if cheap else job['verbose_context']
+            if not compact:
+                return price_data, verbose
+            context = job['compact_cheap_context'] if cheap else job['compact_context']
+            # Prompt-size report of the per-asset part (estimated tokens per section)
+            job['prompt_report'] = {
+                "verbose": prompt_report({"context": verbose, "candles": price_data.tail(10).to_string()}),
+                "compact": prompt_report({"context": context, "candles": encode_candles(price_data)})
+            }
+            return price_data, context
+
+        if self.batch_ai and len(requests) > 1:
+            print(f"DEBUG: Analyzing {len(requests)} symbols with AI (batched)...")
+            items = []
+            for job in requests:
+                price_data, context = request(job)
+                items.append({"symbol": job['symbol'], "price_data": price_data, "context": context})
+            verdicts = self._run_stage("ai_batch", f"{len(requests)} symbols", lambda: self.ai.analyze_batch(
+                items, feedback=feedback_context, image_bytes=image_bytes
+            ), {}, [], on_late=lambda late: self._record_late(late, tiers)) or {} # Symbols without a verdict are marked degraded below
+            for job in requests:
+                job['ai_result'] = verdicts.get(job['symbol'])
+                if job['ai_result'] is None:
+                    job['ai_result'] = self._ai_fallback("ai_batch")
+                    job['degraded'].append("ai")
+        else:
+            def analyze(job):
+                print(f"DEBUG: Analyzing {job['symbol']} with AI...")
+                price_data, context = request(job)
+                return self._run_stage(
+                    "ai", job['symbol'],
+                    lambda: self.ai.analyze_asset(job['symbol'], price_data, context, image_bytes=image_bytes, feedback=feedback_context),
+                    self._ai_fallback("ai"), job['degraded'],
+                    on_late=lambda late: self._record_late({job['symbol']: late}, tiers)
+                )
+            for job, result in zip(requests, pool.map(analyze, requests)):
+                job['ai_result'] = result
+
+        for job in requests:
+            self.verdict_cache.put(job['symbol'], job['fingerprint'], job['ai_result'])
+            if not job['ai_result'].get("cached"):
+                self.token_budget.record(job['symbol'], job['ai_result'].get("usage"), job['ai_tier'], self.budget_source)
+            if self.prompt_eval and not compact and job['ai_tier'] != CHEAP:
+                self.prompt_eval.record(job['symbol'], job['history'], job['verbose_context'], job['compact_context'], job['ai_result'])
+
+    def _record_late(self, verdicts, tiers):
+        """Token usage of AI calls that finished after their stage timed out (their responses are in the LLM cache)."""
+        for symbol, verdict in (verdicts or {}).items():
+            if verdict and not verdict.get("cached"):
+                self.token_budget.record(symbol, verdict.get("usage"), tiers.get(symbol), self.budget_source)
+                print(f"DEBUG: Late AI verdict for {symbol} recorded in the token ledger.")
+
+    @staticmethod
+    def _prompt_saved(job):
+        """Prompt tokens the compact encoding saved on this cycle's request (0 without a request)."""
+        report = job.get('prompt_report')
+        if not report or job['ai_result'].get("cached") or job['verdict_reused']: return 0
+        return max(0, report["verbose"]["total"] - report["compact"]["total"])
+
+    def _finish_symbol(self, job):
+        """Last part of one symbol's pipeline: the dashboard asset dict and the signal notification."""
+        row, symbol, ai_result, whale, degraded = job['row'], job['symbol'], job['ai_result'], job['whale'], job['degraded']
+
+        asset_obj = {
+            "symbol": symbol,
+            "price": row['lastPrice'],
+            "change_24h": row['priceChangePercent'],
+            "volume": row['quoteVolume'],
+            "whale_alert": whale.get("whale_alert", False),
+            "vol_anomaly": whale.get("vol_anomaly", 0),
+            "whale_events": whale.get("events", []),
+            "mtf_summary": job['mtf_summary'],
+            "signal": ai_result["signal"],
+            "confidence": ai_result.get("confidence", 5),
+            "reasoning": ai_result["reasoning"],
+            "levels": ai_result["levels"],
+            "usage": {} if ai_result.get("cached") else ai_result.get("usage", {}), # Response-cache hits cost nothing
+            "history": job['history'],
+            "mtf_data": job['mtf_data'],
+            "kpis": job['kpis'],
+            "news": job['news'],
+            "walls": job['walls'],
+            "degraded": degraded, # Stages that timed out / failed for this symbol
+            "verdict_reused": job['verdict_reused'],
+            "ai_tier": job.get('ai_tier'), # Token budget tier (None when the inputs had not moved)
+            "prompt_report": job.get('prompt_report'), # Estimated prompt tokens per section, verbose vs compact
+            "prompt_tokens_saved": self._prompt_saved(job),
+            "screen_score": row.get('score') # Pre-screener score (None for hand-picked symbols)
+        }
+
+        # Send Notification if Signal is High Conviction and changed
+        if asset_obj['signal'] in ["Green", "Red"]:
+            last_sig = self.notified_signals.get(symbol)
+            confidence = asset_obj.get('confidence', 5)
+
+            if last_sig != asset_obj['signal'] and confidence >= 8:
+                print(f"DEBUG: High Confidence Signal ({confidence}/10) for {symbol}. Notifying...")
+                self._run_stage("notify", symbol, lambda: self.notifier.send_signal(
+                    symbol=symbol,
+                    signal=asset_obj['signal'],
+                    price=asset_obj['price'],
+                    reasoning=asset_obj['reasoning']
+                ), None, degraded)
+                self.notified_signals[symbol] = asset_obj['signal']
+        elif asset_obj['signal'] == "Yellow":
+            # Clear notified status if it goes back to neutral
+            self.notified_signals[symbol] = "Yellow"
+
+        return asset_obj
+
+    def attach_whale_stream(self, listener=None):
+        """Feeds live kline messages to the whale detector (requires ingestor.start_stream first)."""
+        stream = getattr(self.ingestor, 'stream', None)
+        if stream is None: return False
+        if self.whale_detector.on_kline not in stream.kline_listeners:
+            stream.kline_listeners.append(self.whale_detector.on_kline)
+        if listener and listener not in self.whale_detector.listeners:
+            self.whale_detector.listeners.append(listener)
+        return True
+
+    def compact_assets(self, analyzed_assets, max_points=120):
+        """Light copies of the analyzed assets for session state (float32, chart resolution)."""
+        return [compact_asset(a, max_points) for a in analyzed_assets or []]
+
+    def load_full_data(self, symbol, timeframe="1h"):
+        """Full-resolution candles behind a compact payload (refetched if no longer held)."""
+        mtf = self._full_data.get(symbol)
+        if mtf is not None and timeframe in mtf:
+            return mtf[timeframe]
+        try:
+            limit = self.candle_limits.get(timeframe, 200)
+            if timeframe in self.native_timeframes():
+                return self.ingestor.get_historical_data(symbol, interval=timeframe, limit=limit)
+            base = self.ingestor.get_historical_data(symbol, interval=self.base_timeframe, limit=self.base_limit)
+            return self.resampler.derive(symbol, base, timeframe, limit)
+        except Exception as e:
+            print(f"DEBUG: Full data load failed for {symbol} {timeframe}: {e}")
+            return pd.DataFrame()
+
     def log_manual_trade(self, symbol, entry_price, exit_price, side, quantity, reason=""):
         """Bridge to log a trade into the persistent journal."""
         return self.journal.add_trade(symbol, entry_price, exit_price, side, quantity, reason)
@@ -301,12 +662,9 @@ class BusinessLogic:
         """Lightweight fetch for ticker prices (Binance only)."""
         try:
             df = self.ingestor.get_all_tickers()
-            if df.empty:
-                tickers = self.ingestor._fetch_rest("/api/v3/ticker/24hr")
-                if not tickers: return []
-                df = pd.DataFrame(tickers)
+            if df.empty: return []
             
-            df = df[df['symbol'].str.endswith('USDT')]
+            df = df[df['symbol'].str.endswith('USDT')].copy()
             price_col = 'price' if 'price' in df.columns else 'lastPrice'
             change_col = 'priceChangePercent' if 'priceChangePercent' in df.columns else None
             
@@ -330,67 +688,49 @@ class BusinessLogic:
 
     def generate_excel_report(self, analyzed_assets):
         """Genera un reporte en Excel basado en los activos analizados."""
-        if not analyzed_assets:
-            return None
-            
-        output = io.BytesIO()
-        
-        # Prepare data for Excel
-        report_data = []
-        for asset in analyzed_assets:
-            report_data.append({
-                "Activo": asset.get('symbol', 'N/A'),
-                "Precio Actual": asset.get('price', 0),
-                "Cambio 24h (%)": asset.get('change_24h', 0),
-                "Señal AI": asset.get('signal', 'N/A'),
-                "Razonamiento": asset.get('reasoning', 'N/A'),
-                "Soportes/Resistencias": asset.get('levels', 'N/A'),
-                "Whale Alert": "🚨 SÍ" if asset.get('whale_alert') else "No",
-                "MTF Summary": ", ".join(asset.get('mtf_summary', []))
-            })
-        
-        df = pd.DataFrame(report_data)
-        
-        # Write to Excel
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Señales Monstruo')
-            
-            # Simple formatting logic if needed
-            # Access workbook/worksheet if we want to bold headers etc.
-            
-        return output.getvalue()
-
-        return output.getvalue()
-
+        return self.export_report(analyzed_assets, "xlsx")
 
+    def export_report(self, analyzed_assets, fmt="xlsx"):
+        """
+        Multi-sheet report (signals, KPIs, walls, journal) as xlsx, or a zip of parquet/csv files.
+        Built on demand and cached by the overview's version stamp.
+        """
+        try:
+            return self.reports.export(analyzed_assets, fmt, journal_logs=self.journal.logs)
+        except Exception as e:
+            print(f"DEBUG: Report export ({fmt}) failed: {e}")
+            return None
 
     def get_market_correlation(self, analyzed_assets):
-        """Calculates correlation of assets vs prime asset (BTC or SPY)."""
+        """Average pairwise correlation (diagonal excluded) of the analyzed assets' 1h returns."""
         if len(analyzed_assets) < 2: return 0.0
         
         try:
-            # Create a dataframe with close prices
-            price_series = {}
-            for asset in analyzed_assets:
-                if not asset['history'].empty:
-                    # Use last 50 candles
-                    price_series[asset['symbol']] = asset['history']['close'].tail(50).values
-            
-            if not price_series: return 0.0
-            
-            df = pd.DataFrame(price_series)
-            corr_matrix = df.corr()
-            
-            # Simple average correlation coefficient
-            avg_corr = corr_matrix.mean().mean()
-            return avg_corr
+            # No-op when get_market_overview already fed these candles
+            # Compact session payloads are chart-resolution only: they never feed the engine
+            self.correlation.update({a['symbol']: a['history'] for a in analyzed_assets
+                                     if isinstance(a.get('history'), pd.DataFrame) and not a['history'].empty})
+            return self.correlation.average_correlation([a['symbol'] for a in analyzed_assets])
         except:
             return 0.0
 
-    def process_depth_walls(self, symbol):
-        """Analyzes order book for significant buy/sell walls."""
+    def get_correlation_leaders(self, symbol="BTCUSDT", n=3):
+        """Assets most correlated with `symbol` (BTC by default) in the rolling window."""
         try:
-            depth = self.ingestor.get_order_book(symbol)
+            return self.correlation.most_correlated(symbol, n)
+        except:
+            return []
+
+    def process_depth_walls(self, symbol, depth=None):
+        """Analyzes order book for significant buy/sell walls (depth may be a prefetched snapshot)."""
+        try:
+            # Locally maintained book (no network call) when the depth stream is synced
+            books = getattr(self.ingestor, 'order_books', None)
+            if books and books.is_synced(symbol):
+                return dict(books.get(symbol).walls())
+
+            if not depth:
+                depth = self.ingestor.get_order_book(symbol)
             if not depth: return None
             
             bids = pd.DataFrame(depth['bids'], columns=['price', 'qty'], dtype=float)
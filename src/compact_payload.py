@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+CHART_COLUMNS = ['open', 'high', 'low', 'close', 'volume'] # What the candle charts use
+NEWS_FIELDS = ['id', 'title', 'url', 'sentiment', 'published_at']
+
+
+class CompactFrame:
+    """
+    Read-only OHLCV series stored as int64 ms timestamps plus float32 column arrays
+    (about 1/4 of a float64 DataFrame with indicator columns). to_frame() rebuilds a DataFrame.
+    """
+    __slots__ = ("timestamps", "columns")
+
+    def __init__(self, timestamps, columns):
+        self.timestamps = timestamps
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, df, max_points=None):
+        if df is None or df.empty:
+            return cls(np.empty(0, dtype='int64'), {c: np.empty(0, dtype='float32') for c in CHART_COLUMNS})
+        stamps = df['timestamp'].to_numpy(dtype='datetime64[ms]').astype('int64')
+        cols = {c: df[c].to_numpy(dtype='float64') for c in CHART_COLUMNS if c in df.columns}
+        if max_points and len(stamps) > max_points:
+            stamps, cols = downsample_ohlcv(stamps, cols, max_points)
+        return cls(stamps, {c: v.astype('float32') for c, v in cols.items()})
+
+    @property
+    def empty(self):
+        return len(self.timestamps) == 0
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def nbytes(self):
+        return self.timestamps.nbytes + sum(v.nbytes for v in self.columns.values())
+
+    def to_frame(self):
+        data = {"timestamp": pd.to_datetime(self.timestamps, unit='ms')}
+        data.update({c: v.astype('float64') for c, v in self.columns.items()})
+        return pd.DataFrame(data)
+
+
+def downsample_ohlcv(stamps, cols, max_points):
+    """
+    Merges consecutive candles into at most `max_points` buckets (open=first, high=max,
+    low=min, close=last, volume=sum) so charts keep their shape. The newest candle stays last.
+    """
+    n = len(stamps)
+    size = -(-n // max_points) # Candles per bucket
+    # Align buckets to the end so the most recent bucket is complete
+    starts = np.arange(n - size * ((n - 1) // size + 1) + size, n, size)
+    starts = np.concatenate([[0], starts[starts > 0]])
+    out = {}
+    if 'open' in cols: out['open'] = cols['open'][starts]
+    if 'high' in cols: out['high'] = np.maximum.reduceat(cols['high'], starts)
+    if 'low' in cols: out['low'] = np.minimum.reduceat(cols['low'], starts)
+    if 'close' in cols: out['close'] = cols['close'][np.append(starts[1:], n) - 1]
+    if 'volume' in cols: out['volume'] = np.add.reduceat(cols['volume'], starts)
+    return stamps[starts], out
+
+
+def compact_asset(asset, max_points=120):
+    """
+    Session-state version of an analyzed asset: chart-resolution float32 series instead of the
+    full DataFrames, and trimmed news items. Everything the cards render is kept as is;
+    the full series stay on BusinessLogic (load_full_data).
+    """
+    compact = dict(asset)
+    compact['mtf_data'] = {tf: CompactFrame.from_frame(df, max_points) for tf, df in (asset.get('mtf_data') or {}).items()}
+    history = asset.get('history')
+    compact['history'] = compact['mtf_data'].get("1h") if "1h" in compact['mtf_data'] else CompactFrame.from_frame(history, max_points)
+    compact['news'] = [{k: n[k] for k in NEWS_FIELDS if k in n} for n in asset.get('news') or [] if isinstance(n, dict)]
+    compact['compact'] = True
+    return compact
+
+
+def payload_size(assets):
+    """Approximate bytes held by the series of a list of asset dicts (DataFrames or CompactFrames)."""
+    total = 0
+    for asset in assets or []:
+        frames = list((asset.get('mtf_data') or {}).values())
+        if asset.get('history') is not None and not asset.get('compact'):
+            frames.append(asset['history'])
+        for df in frames:
+            if isinstance(df, CompactFrame):
+                total += df.nbytes
+            elif isinstance(df, pd.DataFrame):
+                total += int(df.memory_usage(deep=True).sum())
+    return total
+
+
+if __name__ == "__main__":
+    ts = pd.date_range("2024-01-01", periods=1000, freq="15min")
+    rng = np.random.default_rng(2)
+    close = 100 + np.cumsum(rng.normal(0, 0.3, 1000))
+    base = pd.DataFrame({"timestamp": ts, "open": close, "high": close + 0.2, "low": close - 0.2, "close": close, "volume": rng.random(1000)})
+    for i in range(12): base[f"ind_{i}"] = close # Indicator columns the old payload carried
+    asset = {"symbol": "BTCUSDT", "history": base.tail(200), "mtf_data": {"15m": base.tail(100), "1h": base.tail(200), "4h": base.tail(62)}}
+
+    small = compact_asset(asset)
+    print(f"Full payload: {payload_size([asset]) / 1024:.1f} KiB | compact: {payload_size([small]) / 1024:.1f} KiB")
+    frame = small['mtf_data']['1h'].to_frame()
+    print(len(frame), "chart candles; last close preserved:", np.isclose(frame['close'].iloc[-1], close[-1], rtol=1e-6))
@@ -44,7 +44,6 @@ def run_dashboard():
     import plotly.graph_objects as go
     import textwrap
     from src.business_logic import BusinessLogic
-    from src.data_ingestion import BinanceDataIngestor
     from src.stats_persistence import load_stats, save_stats
     from streamlit_autorefresh import st_autorefresh
     # Config moved to main()
@@ -142,8 +141,8 @@ def run_dashboard():
     </style>
     """, unsafe_allow_html=True)
 
-    # Initialize Logic
-    # @st.cache_resource
+    # Initialize Logic (components are lazy; one shared instance survives reruns)
+    @st.cache_resource
     def get_logic(): return BusinessLogic()
     logic = get_logic()
 
@@ -164,6 +163,7 @@ def run_dashboard():
     if 'misses' not in st.session_state: st.session_state.misses = stats_data['misses']
     if 'total_input' not in st.session_state: st.session_state.total_input = stats_data['total_input']
     if 'total_output' not in st.session_state: st.session_state.total_output = stats_data['total_output']
+    if 'tokens_saved' not in st.session_state: st.session_state.tokens_saved = 0 # Prompt tokens saved by the compact encoding
 
     # UI State
     if 'market_overview' not in st.session_state: st.session_state.market_overview = None
@@ -308,21 +308,36 @@ def run_dashboard():
                 <span style="color:#888; font-size:0.8em;">Coste Est.</span>
                 <span style="color:var(--neon-green); font-weight:700;">${cost_usd:,.4f}</span>
             </div>
+            <div style="display:flex; justify-content:space-between; margin-top:5px;">
+                <span style="color:#888; font-size:0.8em;">Ahorro Prompt Compacto</span>
+                <span style="font-weight:700;">{st.session_state.tokens_saved:,} (${st.session_state.tokens_saved / 1_000_000 * 0.10:,.4f})</span>
+            </div>
         </div>
     """, unsafe_allow_html=True)
+    budget = logic.token_budget.remaining()
+    st.sidebar.caption(f"🎯 Presupuesto: {budget['hourly']:,} tokens/hora · {budget['daily']:,} hoy (compartido con el agente)")
+    ai_stats = logic.ai_stats()
+    if ai_stats:
+        quota_note = f" · ⛔ cuota agotada ({ai_stats['quota_exhausted_s']:.0f}s)" if ai_stats['quota_exhausted_s'] else ""
+        st.sidebar.caption(f"⏱️ IA p50 {ai_stats['latency_p50_s']:.1f}s · p95 {ai_stats['latency_p95_s']:.1f}s · "
+                           f"cola {ai_stats['queue_depth']} · reintentos {ai_stats['retries']}{quota_note}")
 
     # Report Section
     st.sidebar.markdown("---")
     st.sidebar.subheader("📄 Reportes")
     if st.session_state.market_overview:
-        excel_data = logic.generate_excel_report(st.session_state.market_overview)
-        if excel_data:
-            st.sidebar.download_button(
-                label="📥 Descargar Excel",
-                data=excel_data,
-                file_name=f"reporte_monstruo.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+        from src.report_exporter import REPORT_FORMATS
+        report_fmt = st.sidebar.selectbox("Formato", logic.reports.available_formats(), format_func=lambda f: {"xlsx": "Excel (multi-hoja)", "parquet": "Parquet (zip)", "csv": "CSV (zip)"}[f])
+        overview_snapshot = st.session_state.market_overview
+        ext, mime = REPORT_FORMATS[report_fmt]
+        # Deferred: the report is only built (and cached per overview version) when clicked
+        st.sidebar.download_button(
+            label="📥 Descargar Reporte",
+            data=lambda: logic.export_report(overview_snapshot, report_fmt) or b"",
+            file_name=f"reporte_monstruo_{report_fmt}.{ext}",
+            mime=mime,
+            on_click="ignore"
+        )
     else:
         st.sidebar.caption("Analiza activos para habilitar reportes.")
 
@@ -353,11 +368,14 @@ def run_dashboard():
     if st.session_state.market_overview:
         avg_corr = logic.get_market_correlation(st.session_state.market_overview)
         corr_color = "#00ff7f" if avg_corr > 0.7 else "#ffaa00" if avg_corr > 0.4 else "#ff4444"
+        btc_leaders = logic.get_correlation_leaders("BTCUSDT", 3)
+        leaders_html = " · ".join(f"{s.replace('USDT', '')} {c:.2f}" for s, c in btc_leaders)
         st.sidebar.markdown(f"""
             <div style="background:rgba(255,255,255,0.05); padding:15px; border-radius:10px; border-left: 5px solid {corr_color}; margin-top:10px;">
                 <div style="font-size:0.8em; color:#888;">RADAR DE CORRELACIÓN</div>
                 <div style="font-size:1.2em; font-weight:bold; color:{corr_color};">{avg_corr:.2f}</div>
                 <div style="font-size:0.7em; color:#666;">{'Mercado en Sincronía' if avg_corr > 0.7 else 'Movimiento Independiente'}</div>
+                {f'<div style="font-size:0.7em; color:#888; margin-top:5px;">Siguen a BTC: {leaders_html}</div>' if leaders_html else ''}
             </div>
         """, unsafe_allow_html=True)
     
@@ -545,8 +563,12 @@ def run_dashboard():
             )
             st.session_state[tf_key] = selected_tf
 
-            # Display selected timeframe chart
-            df = asset_data.get('mtf_data', {}).get(selected_tf, asset_data['history'])
+            # Display selected timeframe chart (session payload is chart resolution; full data on demand)
+            if st.checkbox("Resolución completa", value=False, key=f"full_{symbol}"):
+                df = logic.load_full_data(symbol, selected_tf)
+            else:
+                df = asset_data.get('mtf_data', {}).get(selected_tf, asset_data['history'])
+                if hasattr(df, 'to_frame'): df = df.to_frame()
             if not df.empty:
                 fig = go.Figure(data=[go.Candlestick(x=df['timestamp'], open=df['open'], high=df['high'], low=df['low'], close=df['close'])])
                 fig.update_layout(template="plotly_dark", height=300, margin=dict(l=0, r=0, t=0, b=0), xaxis_rangeslider_visible=False)
@@ -585,6 +607,7 @@ def run_dashboard():
                     if usage:
                         st.session_state.total_input += usage.get('prompt_tokens', 0)
                         st.session_state.total_output += usage.get('candidates_tokens', 0)
+                    st.session_state.tokens_saved += asset.get('prompt_tokens_saved', 0)
                 
                 # Update timestamp
                 from datetime import datetime
@@ -597,7 +620,8 @@ def run_dashboard():
                     for asset in new_data:
                         logic.trigger_automated_trade(asset)
 
-                return new_data
+                # Only chart-resolution float32 series go into session state
+                return logic.compact_assets(new_data)
         except Exception as e:
             st.error(f"Error: {e}")
             return []
@@ -606,7 +630,13 @@ def run_dashboard():
     available_options = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "TRXUSDT", "LINKUSDT", "DOTUSDT", "MATICUSDT", "SHIBUSDT", "LTCUSDT", "NEARUSDT"]
     default_assets = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT", "ADAUSDT", "DOGEUSDT", "TRXUSDT"]
 
-    selected_assets = st.sidebar.multiselect("Activos (Max 12)", available_options, default=default_assets[:8])
+    use_screener = st.sidebar.checkbox("🔭 Escáner de mercado (auto)", value=False, help="Pre-filtra todos los pares USDT y analiza solo los mejores candidatos")
+    if use_screener:
+        shortlist = logic.screen_market(limit=8)
+        selected_assets = list(shortlist['symbol']) if not shortlist.empty else default_assets[:8]
+        st.sidebar.caption("Candidatos: " + ", ".join(s.replace("USDT", "") for s in selected_assets))
+    else:
+        selected_assets = st.sidebar.multiselect("Activos (Max 12)", available_options, default=default_assets[:8])
     if len(selected_assets) > 12: selected_assets = selected_assets[:12]
 
     # Handle source change or asset change
@@ -679,17 +709,21 @@ def run_dashboard():
             </div>
         """, unsafe_allow_html=True)
         
-        col_b1, col_b2, col_b3 = st.columns(3)
+        col_b1, col_b2, col_b3, col_b4 = st.columns(4)
         with col_b1:
             bt_symbol = st.selectbox("Activo para Backtest", available_options, index=0)
         with col_b2:
             bt_days = st.slider("Días atrás", 1, 30, 7)
         with col_b3:
             bt_step = st.selectbox("Paso de Análisis (Velas)", [1, 2, 4, 8], index=2, help="Pasos más altos ahorran tokens.")
+        with col_b4:
+            bt_backend = st.selectbox("Motor de Análisis", ["Auto", "gemini", "rules", "replay"], index=0,
+                                      help="rules: reglas locales sin tokens. replay: veredictos grabados. Auto: Gemini si hay API key.")
 
         if st.button("🚀 Iniciar Simulación"):
             with st.spinner(f"Simulando {bt_symbol} por {bt_days} días..."):
-                results = logic.run_backtest(bt_symbol, days=bt_days, interval="1h")
+                results = logic.run_backtest(bt_symbol, days=bt_days, interval="1h", step=bt_step,
+                                             backend=None if bt_backend == "Auto" else bt_backend)
                 
                 if "error" in results:
                     st.error(results["error"])
@@ -702,6 +736,11 @@ def run_dashboard():
                     m2.metric("Profit Final", f"{results['profit_pct']:.2f}%")
                     m3.metric("Capital Final", f"${results['final_capital']:,.2f}")
                     m4.metric("Total Trades", results['total_trades'])
+                    bt_usage = results.get('usage', {})
+                    st.session_state.total_input += bt_usage.get('prompt_tokens', 0)
+                    st.session_state.total_output += bt_usage.get('candidates_tokens', 0)
+                    st.caption(f"🧠 Caché IA: {results.get('cached_steps', 0)}/{results.get('steps', 0)} pasos reutilizados · "
+                               f"{bt_usage.get('prompt_tokens', 0) + bt_usage.get('candidates_tokens', 0):,} tokens nuevos")
                     
                     # Equity Curve Chart
                     equity_df = pd.DataFrame(results['equity_curve'])
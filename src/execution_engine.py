@@ -1,6 +1,5 @@
 import os
 import logging
-from binance.client import Client
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,18 +13,22 @@ class ExecutionEngine:
         self.logger = logging.getLogger("ExecutionEngine")
         self.active_trades = {} # Track open positions for trailing stops/partials
         
-        try:
-            if self.api_key and self.api_secret:
-                self.client = Client(self.api_key, self.api_secret)
-                self.ready = True
-            else:
-                self.client = None
+        self._client = None
+        # Keys present -> real trading possible; the SDK client itself is built on first use
+        self.ready = bool(self.api_key and self.api_secret)
+        if not self.ready:
+            self.logger.warning("No API keys found. Execution limited to simulation.")
+
+    @property
+    def client(self):
+        if self._client is None and self.ready:
+            try:
+                from binance.client import Client
+                self._client = Client(self.api_key, self.api_secret)
+            except Exception as e:
+                self.logger.error(f"Failed to init Binance client: {e}")
                 self.ready = False
-                self.logger.warning("No API keys found. Execution limited to simulation.")
-        except Exception as e:
-            self.logger.error(f"Failed to init Binance client: {e}")
-            self.client = None
-            self.ready = False
+        return self._client
 
     def calculate_position_size(self, symbol, balance_usdt, risk_pct=0.01):
         """Calculates quantity based on a risk percentage of total balance."""
@@ -0,0 +1,156 @@
+import time
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+
+from src.kline_store import KlineStore, INTERVAL_MS
+
+KLINE_PAGE_LIMIT = 1000
+KLINE_WEIGHT = 2 # Request weight of /api/v3/klines
+
+
+class HistoryLoader:
+    """
+    Downloads deep kline history by splitting a date range into startTime/endTime pages.
+    Pages are fetched concurrently within a request-weight budget and committed to the
+    KlineStore strictly in order, so an interrupted download resumes after the last
+    contiguous page that was stored.
+    """
+    def __init__(self, base_url="https://api.binance.com", store=None, max_workers=4,
+                 weight_per_minute=1200, timeout=10, retries=3, session=None, limiter=None):
+        self.base_url = base_url.rstrip("/")
+        self.store = store or KlineStore()
+        self.max_workers = max_workers
+        self.weight_per_minute = weight_per_minute
+        self.timeout = timeout
+        self.retries = retries
+        self.session = session or requests.Session()
+        self.limiter = limiter # Shared WeightRateLimiter; replaces the local per-minute budget when set
+        self._budget_lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_weight = 0
+
+    def plan_pages(self, interval, start_ms, end_ms):
+        """Splits [start_ms, end_ms) into page windows of at most KLINE_PAGE_LIMIT candles."""
+        step = INTERVAL_MS[interval]
+        span = step * KLINE_PAGE_LIMIT
+        start = start_ms // step * step
+        pages = []
+        while start < end_ms:
+            page_end = min(start + span, end_ms)
+            pages.append((start, page_end - 1))
+            start = page_end
+        return pages
+
+    def _acquire(self, weight):
+        """Blocks until the request fits in the per-minute weight budget."""
+        if self.limiter:
+            if not self.limiter.acquire(weight):
+                raise RuntimeError("Rate limit budget exhausted")
+            return
+        while True:
+            with self._budget_lock:
+                now = time.monotonic()
+                if now - self._window_start >= 60:
+                    self._window_start = now
+                    self._window_weight = 0
+                if self._window_weight + weight <= self.weight_per_minute:
+                    self._window_weight += weight
+                    return
+                wait = 60 - (now - self._window_start)
+            time.sleep(min(wait, 1.0))
+
+    def _fetch_page(self, symbol, interval, start_ms, end_ms, base_url=None):
+        params = {"symbol": symbol, "interval": interval, "startTime": start_ms,
+                  "endTime": end_ms, "limit": KLINE_PAGE_LIMIT}
+        last_error = ""
+        for attempt in range(self.retries):
+            self._acquire(KLINE_WEIGHT)
+            try:
+                response = self.session.get(f"{base_url or self.base_url}/api/v3/klines", params=params, timeout=self.timeout)
+                if self.limiter:
+                    self.limiter.observe(response.headers)
+                if response.status_code == 200:
+                    return response.json()
+                last_error = f"HTTP {response.status_code}"
+                if response.status_code in (418, 429):
+                    if self.limiter:
+                        self.limiter.penalize(response.status_code, response.headers.get("Retry-After"))
+                    else:
+                        time.sleep(int(response.headers.get("Retry-After", 1)))
+                    continue
+            except Exception as e:
+                last_error = str(e)
+            time.sleep(0.2 * (2 ** attempt))
+        raise RuntimeError(f"Page {start_ms}-{end_ms} failed: {last_error}")
+
+    @staticmethod
+    def _to_frame(data):
+        df = pd.DataFrame([row[:6] for row in data], columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
+        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
+        return df
+
+    def download(self, symbol, interval, start_ms, end_ms=None, base_url=None):
+        """
+        Fills the store for [start_ms, end_ms) in one call: the missing head (before the first
+        stored candle) and the missing tail (from the last stored one, which may have been still
+        open) are planned together. Tail pages are committed strictly in order, so an interrupted
+        download resumes after the last contiguous page; head pages are merged in once, after all
+        of them arrived, so a failure never leaves a hole between the new head and the stored data.
+        `base_url` overrides the loader's host for this call only (the loader is shared across threads).
+        Returns the number of candles written; raises RuntimeError (after committing what arrived in
+        order) when a page could not be fetched.
+        """
+        if end_ms is None:
+            end_ms = int(time.time() * 1000)
+
+        first_ts = self.store.first_timestamp(symbol, interval)
+        last_ts = self.store.last_timestamp(symbol, interval)
+        if first_ts is None:
+            head, tail = [], self.plan_pages(interval, start_ms, end_ms)
+        else:
+            head = self.plan_pages(interval, start_ms, min(end_ms, first_ts)) if start_ms < first_ts else []
+            tail = self.plan_pages(interval, max(start_ms, last_ts), end_ms)
+        pages = tail + head
+        if not pages: return 0
+
+        written = 0
+        done = {}
+        head_frames = []
+        next_page = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._fetch_page, symbol, interval, s, e, base_url): i for i, (s, e) in enumerate(pages)}
+            try:
+                for future in as_completed(futures):
+                    done[futures[future]] = future.result()
+                    # Commit the contiguous prefix so a crash can resume from it
+                    while next_page in done:
+                        data = done.pop(next_page)
+                        if data and next_page < len(tail):
+                            written += self.store.append(symbol, interval, self._to_frame(data))
+                        elif data:
+                            head_frames.append(self._to_frame(data))
+                        next_page += 1
+                if head_frames:
+                    written += self.store.append(symbol, interval, pd.concat(head_frames, ignore_index=True))
+            except Exception as e:
+                for f in futures: f.cancel()
+                raise RuntimeError(f"History download for {symbol} {interval} stopped at page {next_page}/{len(pages)}: {e}") from e
+        return written
+
+
+if __name__ == "__main__":
+    import tempfile
+    from tests.fake_binance import FakeBinanceServer
+
+    with FakeBinanceServer(latency=0.05) as server:
+        loader = HistoryLoader(base_url=server.url, store=KlineStore(tempfile.mkdtemp()), max_workers=8)
+        end = int(time.time() * 1000)
+        start = end - 90 * 86_400_000
+        t0 = time.perf_counter()
+        n = loader.download("BTCUSDT", "15m", start, end)
+        print(f"Downloaded {n} candles in {time.perf_counter() - t0:.2f}s across {len(server.requests)} requests")
+        print(loader.store.read_range("BTCUSDT", "15m", start_ms=start).tail())
@@ -0,0 +1,133 @@
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.rate_limiter import endpoint_weight
+
+
+class HostHealth:
+    """Rolling latency / error statistics for one API host."""
+    def __init__(self, host):
+        self.host = host
+        self.latency = 0.3 # EWMA seconds (optimistic prior)
+        self.error_rate = 0.0 # EWMA of failures in [0, 1]
+        self.failures = 0 # Consecutive failures
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.last_status = None
+
+    def score(self):
+        """Lower is better: expected latency inflated by the recent error rate."""
+        return self.latency * (1 + 4 * self.error_rate)
+
+    def available(self, now=None):
+        return (now or time.monotonic()) >= self.cooldown_until
+
+    def as_dict(self):
+        return {
+            "host": self.host,
+            "latency_ms": round(self.latency * 1000, 1),
+            "error_rate": round(self.error_rate, 3),
+            "cooldown_s": max(0.0, round(self.cooldown_until - time.monotonic(), 1)),
+            "requests": self.requests,
+            "last_status": self.last_status
+        }
+
+
+class PooledTransport:
+    """
+    Keep-alive HTTP transport over a set of equivalent hosts (api, api1, api2, api3).
+    Requests go to the healthiest available host first; failing hosts are put on an
+    exponentially growing cooldown so they are skipped until they are worth retrying.
+    """
+    # Statuses that mark the host (not the request) as bad
+    HOST_ERRORS = {403, 451, 500, 502, 503, 504}
+
+    def __init__(self, hosts, timeout=5, pool_size=20, alpha=0.3, base_cooldown=5, max_cooldown=300, limiter=None):
+        self.hosts = {h: HostHealth(h) for h in hosts}
+        self.limiter = limiter # Optional WeightRateLimiter shared by all hosts (limits are per IP)
+        self.timeout = timeout
+        self.alpha = alpha
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self._local = threading.local() # last_error per calling thread
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(hosts), pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def last_error(self):
+        """Error of the last get() made by the calling thread ("" if it succeeded)."""
+        return getattr(self._local, "error", "")
+
+    @last_error.setter
+    def last_error(self, value):
+        self._local.error = value
+
+    def ranked_hosts(self):
+        """Available hosts by score, then cooled-down hosts by soonest expiry as a last resort."""
+        now = time.monotonic()
+        with self._lock:
+            stats = list(self.hosts.values())
+        ready = sorted([h for h in stats if h.available(now)], key=lambda h: h.score())
+        cooling = sorted([h for h in stats if not h.available(now)], key=lambda h: h.cooldown_until)
+        return [h.host for h in ready + cooling]
+
+    def record(self, host, ok, latency=None, status=None):
+        with self._lock:
+            h = self.hosts[host]
+            h.requests += 1
+            h.last_status = status
+            if latency is not None:
+                h.latency = (1 - self.alpha) * h.latency + self.alpha * latency
+            h.error_rate = (1 - self.alpha) * h.error_rate + self.alpha * (0.0 if ok else 1.0)
+            if ok:
+                h.failures = 0
+                h.cooldown_until = 0.0
+            else:
+                h.failures += 1
+                cooldown = min(self.base_cooldown * (2 ** (h.failures - 1)), self.max_cooldown)
+                h.cooldown_until = time.monotonic() + cooldown
+
+    def get(self, endpoint, params=None, timeout=None):
+        """GETs endpoint from the best host, falling through the ranking. Returns parsed JSON or None."""
+        self.last_error = ""
+        weight = endpoint_weight(endpoint, params)
+        for host in self.ranked_hosts():
+            if self.limiter and not self.limiter.acquire(weight):
+                self.last_error = "Local rate limit budget exhausted"
+                return None
+            start = time.monotonic()
+            try:
+                response = self.session.get(f"{host}{endpoint}", params=params, timeout=timeout or self.timeout)
+                elapsed = time.monotonic() - start
+                if self.limiter:
+                    self.limiter.observe(response.headers)
+                if response.status_code in (418, 429):
+                    # Weight limits are per IP: switching host would not help
+                    self.last_error = f"HTTP {response.status_code}"
+                    if self.limiter:
+                        self.limiter.penalize(response.status_code, response.headers.get("Retry-After"))
+                    return None
+                if response.status_code == 200:
+                    self.record(host, True, elapsed, 200)
+                    return response.json()
+                self.last_error = f"HTTP {response.status_code}"
+                if response.status_code in self.HOST_ERRORS:
+                    self.record(host, False, elapsed, response.status_code)
+                else:
+                    # Client error (bad symbol etc.): another host will answer the same
+                    self.record(host, True, elapsed, response.status_code)
+                    return None
+            except Exception as e:
+                self.last_error = str(e)
+                self.record(host, False, time.monotonic() - start, None)
+        return None
+
+    def health_report(self):
+        with self._lock:
+            return [h.as_dict() for h in self.hosts.values()]
@@ -0,0 +1,372 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from src.indicators import KPI_KEYS, build_matrix, compute_indicators, group_by_last
+
+
+def _clean(value):
+    return value if value is not None and math.isfinite(value) else None
+
+
+class EMA:
+    """Exponential moving average, same recursion as pandas ewm(adjust=False)."""
+    def __init__(self, span=None, alpha=None):
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        self.value = None
+
+    def update(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+    def snapshot(self):
+        return {"value": self.value}
+
+    def restore(self, state):
+        self.value = state["value"]
+
+
+class RSI:
+    """Wilder RSI (EWM with alpha=1/period over gains and losses)."""
+    def __init__(self, period=14):
+        self.prev = None
+        self.gain = EMA(alpha=1 / period)
+        self.loss = EMA(alpha=1 / period)
+
+    def update(self, x):
+        # pandas: the first diff is NaN and counts as 0 gain / 0 loss
+        delta = 0.0 if self.prev is None else x - self.prev
+        self.prev = x
+        self.gain.update(max(delta, 0.0))
+        self.loss.update(max(-delta, 0.0))
+        return self.value
+
+    @property
+    def value(self):
+        if self.gain.value is None: return None
+        if self.loss.value == 0:
+            return 100.0 if self.gain.value > 0 else None
+        return 100 - (100 / (1 + self.gain.value / self.loss.value))
+
+    def snapshot(self):
+        return {"prev": self.prev, "gain": self.gain.snapshot(), "loss": self.loss.snapshot()}
+
+    def restore(self, state):
+        self.prev = state["prev"]
+        self.gain.restore(state["gain"])
+        self.loss.restore(state["loss"])
+
+
+class MACD:
+    """MACD line (fast EMA - slow EMA) and its signal EMA."""
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(span=fast)
+        self.slow = EMA(span=slow)
+        self.signal = EMA(span=signal)
+
+    def update(self, x):
+        line = self.fast.update(x) - self.slow.update(x)
+        self.signal.update(line)
+        return line
+
+    @property
+    def value(self):
+        if self.fast.value is None: return None
+        return self.fast.value - self.slow.value
+
+    def snapshot(self):
+        return {"fast": self.fast.snapshot(), "slow": self.slow.snapshot(), "signal": self.signal.snapshot()}
+
+    def restore(self, state):
+        self.fast.restore(state["fast"])
+        self.slow.restore(state["slow"])
+        self.signal.restore(state["signal"])
+
+
+class RollingStats:
+    """
+    Rolling mean / sample variance over the last `window` values (sliding Welford update).
+    Like pandas rolling(window), values are None until the window is full.
+    """
+    def __init__(self, window=20):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, x):
+        if len(self.values) < self.window:
+            self.values.append(x)
+            delta = x - self._mean
+            self._mean += delta / len(self.values)
+            self._m2 += delta * (x - self._mean)
+        else:
+            old = self.values[0]
+            self.values.append(x) # maxlen drops `old`
+            new_mean = self._mean + (x - old) / self.window
+            self._m2 += (x - old) * (x - new_mean + old - self._mean)
+            self._mean = new_mean
+        self._m2 = max(self._m2, 0.0)
+        return self.mean
+
+    @property
+    def mean(self):
+        return self._mean if len(self.values) == self.window else None
+
+    @property
+    def var(self):
+        if len(self.values) < self.window or self.window < 2: return None
+        return self._m2 / (self.window - 1)
+
+    @property
+    def std(self):
+        var = self.var
+        return math.sqrt(var) if var is not None else None
+
+    def snapshot(self):
+        return {"values": list(self.values), "mean": self._mean, "m2": self._m2}
+
+    def restore(self, state):
+        self.values = deque(state["values"], maxlen=self.window)
+        self._mean = state["mean"]
+        self._m2 = state["m2"]
+
+
+class Bollinger:
+    """Bollinger bands: rolling mean +/- k rolling standard deviations."""
+    def __init__(self, window=20, k=2):
+        self.k = k
+        self.stats = RollingStats(window)
+
+    def update(self, x):
+        self.stats.update(x)
+        return self.value
+
+    @property
+    def value(self):
+        mean, std = self.stats.mean, self.stats.std
+        if mean is None or std is None: return (None, None)
+        return (mean + self.k * std, mean - self.k * std)
+
+    def snapshot(self):
+        return self.stats.snapshot()
+
+    def restore(self, state):
+        self.stats.restore(state)
+
+
+class IndicatorSet:
+    """
+    All dashboard KPIs for one symbol, updated in O(1) per candle.
+    update(close, timestamp) with the timestamp of the last candle revises it (the candle that
+    is still forming) instead of appending a new one.
+    Within float rounding (~1e-9 relative) the values equal the pandas ewm/rolling formulas
+    computed over the same candles.
+    """
+    def __init__(self):
+        self.rsi = RSI(14)
+        self.ema50 = EMA(span=50)
+        self.macd = MACD(12, 26, 9)
+        self.bollinger = Bollinger(20, 2)
+        self.count = 0
+        self.last_ts = None
+        self._prev = None # State before the last candle, to revise it
+
+    def _apply(self, close):
+        self.rsi.update(close)
+        self.ema50.update(close)
+        self.macd.update(close)
+        self.bollinger.update(close)
+        self.count += 1
+
+    def update(self, close, timestamp=None):
+        close = float(close)
+        if timestamp is not None and self.last_ts is not None:
+            if timestamp < self.last_ts:
+                return self.kpis() # Late message for an older candle
+            if timestamp == self.last_ts and self._prev is not None:
+                self._restore_state(self._prev)
+        if timestamp is None or timestamp != self.last_ts or self._prev is None:
+            self._prev = self._state()
+        self._apply(close)
+        self.last_ts = timestamp
+        return self.kpis()
+
+    def seed(self, closes, timestamps=None):
+        """Replays a history (oldest first)."""
+        if timestamps is None:
+            # No candle to revise later: apply directly (half the cost of update())
+            for close in closes:
+                self._apply(float(close))
+            self._prev = None
+            self.last_ts = None # As update(close) without a timestamp would leave it
+            return self
+        for close, timestamp in zip(closes, timestamps):
+            self.update(close, timestamp)
+        return self
+
+    @classmethod
+    def from_batch(cls, values, i, closes, count, last_ts=None):
+        """
+        Builds the state from row `i` of compute_indicators() output, without replaying the
+        history. `closes` are the non-NaN closes of that row (the rolling window is refilled from them).
+        """
+        st = cls()
+        st.ema50.value = float(values["EMA_50"][i])
+        st.macd.fast.value = float(values["EMA_12"][i])
+        st.macd.slow.value = float(values["EMA_26"][i])
+        st.macd.signal.value = float(values["MACD_Signal"][i])
+        st.rsi.prev = float(closes[-1])
+        st.rsi.gain.value = float(values["AVG_GAIN"][i])
+        st.rsi.loss.value = float(values["AVG_LOSS"][i])
+        for close in closes[-st.bollinger.stats.window:]:
+            st.bollinger.stats.update(float(close))
+        st.count = count
+        st.last_ts = last_ts
+        return st
+
+    def kpis(self):
+        upper, lower = self.bollinger.value
+        return {
+            "RSI": _clean(self.rsi.value),
+            "SMA_20": _clean(self.bollinger.stats.mean),
+            "EMA_50": _clean(self.ema50.value),
+            "MACD": _clean(self.macd.value),
+            "MACD_Signal": _clean(self.macd.signal.value),
+            "BB_Upper": _clean(upper),
+            "BB_Lower": _clean(lower)
+        }
+
+    def _state(self):
+        return {
+            "rsi": self.rsi.snapshot(),
+            "ema50": self.ema50.snapshot(),
+            "macd": self.macd.snapshot(),
+            "bollinger": self.bollinger.snapshot(),
+            "count": self.count,
+            "last_ts": self.last_ts
+        }
+
+    def _restore_state(self, state):
+        self.rsi.restore(state["rsi"])
+        self.ema50.restore(state["ema50"])
+        self.macd.restore(state["macd"])
+        self.bollinger.restore(state["bollinger"])
+        self.count = state["count"]
+        self.last_ts = state["last_ts"]
+
+    def snapshot(self):
+        """State plus the one before the last candle, so a restored set can still revise it."""
+        return dict(self._state(), prev=self._prev)
+
+    def restore(self, state):
+        self._restore_state(state)
+        self._prev = state.get("prev")
+        return self
+
+
+class KPITracker:
+    """
+    Keeps one IndicatorSet per symbol across cycles.
+    Known symbols only consume the candles that are new since the last call (plus the revised
+    forming candle); unknown or discontinuous ones are seeded together in one vectorized
+    pass (see indicators.compute_indicators).
+    """
+    def __init__(self, length=200, min_candles=51, max_catchup=50):
+        self.length = length
+        self.min_candles = min_candles
+        self.max_catchup = max_catchup # More new candles than this -> reseed
+        self.sets = {}
+
+    @staticmethod
+    def _stamps(df):
+        return df['timestamp'].to_numpy(dtype='datetime64[ms]').astype('int64')
+
+    def update(self, frames):
+        """{symbol: OHLCV frame} -> {symbol: KPI dict}; frames with `min_candles` or fewer candles get None values."""
+        result = {}
+        to_seed = {}
+        for symbol, df in frames.items():
+            if df is None or len(df) < self.min_candles:
+                self.sets.pop(symbol, None)
+                result[symbol] = {k: None for k in KPI_KEYS}
+                continue
+
+            stamps = self._stamps(df)
+            closes = df['close'].to_numpy(dtype=float)
+            st = self.sets.get(symbol)
+            if st is not None and st.last_ts is not None:
+                pos = int(np.searchsorted(stamps, st.last_ts))
+                if pos < len(stamps) and stamps[pos] == st.last_ts and len(stamps) - pos <= self.max_catchup:
+                    for j in range(pos, len(stamps)):
+                        st.update(closes[j], int(stamps[j]))
+                    result[symbol] = st.kpis()
+                    continue
+            to_seed[symbol] = (df, stamps, closes)
+
+        if to_seed:
+            # Seed on everything but the last candle, then apply it so it can be revised later
+            for group in group_by_last({s: v[0].iloc[:-1] for s, v in to_seed.items()}):
+                symbols, matrix = build_matrix(group, 'close', self.length)
+                values = compute_indicators(matrix)
+                for i, symbol in enumerate(symbols):
+                    df, stamps, closes = to_seed[symbol]
+                    row = matrix[i][~np.isnan(matrix[i])]
+                    st = IndicatorSet.from_batch(values, i, row, len(row), int(stamps[-2]))
+                    st.update(closes[-1], int(stamps[-1]))
+                    self.sets[symbol] = st
+                    result[symbol] = st.kpis()
+        return result
+
+    def snapshot(self):
+        return {symbol: st.snapshot() for symbol, st in self.sets.items()}
+
+    def restore(self, state):
+        self.sets = {symbol: IndicatorSet().restore(s) for symbol, s in state.items()}
+
+
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+
+    # Incremental values vs pandas over the same 1000 candles
+    rng = np.random.default_rng(11)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 1000)))
+    c = pd.Series(closes)
+    delta = c.diff()
+    gain = delta.where(delta > 0, 0).ewm(alpha=1/14, adjust=False).mean()
+    loss = (-delta.where(delta < 0, 0)).ewm(alpha=1/14, adjust=False).mean()
+    macd = c.ewm(span=12, adjust=False).mean() - c.ewm(span=26, adjust=False).mean()
+    ref = pd.DataFrame({
+        "RSI": 100 - 100 / (1 + gain / loss),
+        "SMA_20": c.rolling(20).mean(),
+        "EMA_50": c.ewm(span=50, adjust=False).mean(),
+        "MACD": macd,
+        "MACD_Signal": macd.ewm(span=9, adjust=False).mean(),
+        "BB_Upper": c.rolling(20).mean() + 2 * c.rolling(20).std(),
+        "BB_Lower": c.rolling(20).mean() - 2 * c.rolling(20).std()
+    })
+
+    st = IndicatorSet()
+    worst = 0.0
+    start = time.perf_counter()
+    for t, x in enumerate(closes):
+        kpis = st.update(x, t)
+        if t >= 20:
+            worst = max(worst, max(abs(kpis[k] - ref[k].iloc[t]) / abs(ref[k].iloc[t]) for k in KPI_KEYS))
+    print(f"{len(closes)} updates, max relative diff vs pandas: {worst:.2e}")
+
+    # Snapshot / restore and forming-candle revision
+    saved = st.snapshot()
+    before = st.kpis()
+    st.update(closes[-1] * 1.05, len(closes)) # new candle opens
+    st.update(closes[-1] * 0.95, len(closes)) # ... and is revised
+    revised = IndicatorSet().restore(saved).update(closes[-1] * 0.95, len(closes))
+    print("Revision == fresh apply:", revised == st.kpis(), "| restore:", IndicatorSet().restore(saved).kpis() == before)
+
+    n = 100000
+    start = time.perf_counter()
+    for t in range(n):
+        st.update(100 + (t % 7), len(closes) + 1 + t)
+    print(f"O(1) update: {(time.perf_counter() - start) / n * 1e6:.1f} us/candle")
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+KPI_KEYS = ["RSI", "SMA_20", "EMA_50", "MACD", "MACD_Signal", "BB_Upper", "BB_Lower"]
+
+
+def build_matrix(frames, column='close', length=200):
+    """
+    Aligns one column of many OHLCV frames on their timestamps.
+    Returns (symbols, matrix) with matrix shaped (n_symbols, length); a symbol with a shorter
+    history is NaN-padded on the left. Interior gaps are forward-filled; a symbol missing the
+    newest grid candles stays NaN there (no repeated last value posing as a real candle).
+    """
+    frames = {s: df for s, df in frames.items() if df is not None and not df.empty}
+    if not frames:
+        return [], np.empty((0, 0))
+    symbols = list(frames)
+    stamps = {s: frames[s]['timestamp'].to_numpy(dtype='datetime64[ns]').astype('int64') for s in symbols}
+    grid = np.unique(np.concatenate(list(stamps.values())))[-length:]
+
+    matrix = np.full((len(symbols), len(grid)), np.nan)
+    for i, s in enumerate(symbols):
+        values = frames[s][column].to_numpy(dtype=float)
+        pos = np.searchsorted(grid, stamps[s])
+        inside = (pos < len(grid)) & (grid[np.minimum(pos, len(grid) - 1)] == stamps[s])
+        matrix[i, pos[inside]] = values[inside]
+
+    # Forward-fill interior gaps only; leading (shorter history) and trailing (missing newest candles) NaNs stay
+    observed = ~np.isnan(matrix)
+    idx = np.where(observed, np.arange(matrix.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = matrix[np.arange(matrix.shape[0])[:, None], idx]
+    started = np.maximum.accumulate(observed, axis=1)
+    ended = np.maximum.accumulate(observed[:, ::-1], axis=1)[:, ::-1]
+    return symbols, np.where(started & ended, filled, np.nan)
+
+
+def group_by_last(frames):
+    """
+    Splits {symbol: frame} into groups sharing the same last timestamp, so every row of a
+    group's build_matrix ends on a real candle (latest-value indicators stay defined).
+    """
+    groups = {}
+    for s, df in frames.items():
+        groups.setdefault(df['timestamp'].iloc[-1], {})[s] = df
+    return list(groups.values())
+
+
+def ewm(matrix, alpha):
+    """Row-wise EWMA (pandas ewm(adjust=False)) starting at each row's first valid value."""
+    out = np.full_like(matrix, np.nan)
+    state = np.full(matrix.shape[0], np.nan)
+    for t in range(matrix.shape[1]):
+        x = matrix[:, t]
+        state = np.where(np.isnan(state), x, np.where(np.isnan(x), state, state + alpha * (x - state)))
+        out[:, t] = state
+    return out
+
+
+def last_window(matrix, window):
+    """The last `window` columns; rows with any NaN in that window are fully NaN (min_periods=window)."""
+    tail = matrix[:, -window:]
+    if tail.shape[1] < window:
+        return np.full((matrix.shape[0], window), np.nan)
+    return np.where(np.isnan(tail).any(axis=1, keepdims=True), np.nan, tail)
+
+
+def compute_indicators(close):
+    """
+    Computes the dashboard KPIs for every row of a (n_symbols, T) close matrix in a few
+    vectorized passes. Returns a dict of 1-D arrays (latest value per symbol).
+    Matches the per-symbol pandas formulas used before (Wilder RSI 14, MACD 12/26/9, BB 20/2).
+    """
+    # Trend
+    window20 = last_window(close, 20)
+    sma20 = window20.mean(axis=1)
+    std20 = window20.std(axis=1, ddof=1)
+    ema50 = ewm(close, 2 / 51)[:, -1]
+
+    # RSI (Wilder smoothing)
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    valid = ~np.isnan(close)
+    gain = np.where(valid, np.where(delta > 0, delta, 0.0), np.nan)
+    loss = np.where(valid, np.where(delta < 0, -delta, 0.0), np.nan)
+    avg_gain = ewm(gain, 1 / 14)[:, -1]
+    avg_loss = ewm(loss, 1 / 14)[:, -1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+    # MACD
+    ema12 = ewm(close, 2 / 13)
+    ema26 = ewm(close, 2 / 27)
+    macd_line = ema12 - ema26
+    macd_signal = ewm(macd_line, 2 / 10)[:, -1]
+
+    return {
+        "RSI": rsi,
+        "SMA_20": sma20,
+        "EMA_50": ema50,
+        "MACD": macd_line[:, -1],
+        "MACD_Signal": macd_signal,
+        "BB_Upper": sma20 + std20 * 2,
+        "BB_Lower": sma20 - std20 * 2,
+        # Smoothing state, used to seed the incremental indicators
+        "EMA_12": ema12[:, -1],
+        "EMA_26": ema26[:, -1],
+        "AVG_GAIN": avg_gain,
+        "AVG_LOSS": avg_loss
+    }
+
+
+def compute_kpis(frames, length=200, min_candles=51):
+    """
+    Per-symbol KPI dicts for a {symbol: OHLCV DataFrame} mapping, without touching the frames.
+    Symbols with `min_candles` or fewer candles get None values (as before).
+    """
+    empty = {k: None for k in KPI_KEYS}
+    result = {s: dict(empty) for s in frames}
+    eligible = {s: df for s, df in frames.items() if df is not None and len(df) >= min_candles}
+    if not eligible:
+        return result
+
+    for group in group_by_last(eligible):
+        symbols, close = build_matrix(group, 'close', length)
+        values = compute_indicators(close)
+        for i, symbol in enumerate(symbols):
+            result[symbol] = {k: (float(values[k][i]) if np.isfinite(values[k][i]) else None) for k in KPI_KEYS}
+    return result
+
+
+if __name__ == "__main__":
+    import time
+
+    # Parity + speed check against the per-symbol pandas formulas
+    rng = np.random.default_rng(7)
+    ts = pd.date_range("2024-01-01", periods=200, freq="1h")
+    frames = {f"SYM{i}USDT": pd.DataFrame({"timestamp": ts, "close": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 200)))}) for i in range(300)}
+
+    start = time.perf_counter()
+    kpis = compute_kpis(frames)
+    print(f"Vectorized: {len(frames)} symbols in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    worst = 0.0
+    for symbol, df in frames.items():
+        c = df['close']
+        delta = c.diff()
+        gain = delta.where(delta > 0, 0).ewm(alpha=1/14, adjust=False).mean()
+        loss = (-delta.where(delta < 0, 0)).ewm(alpha=1/14, adjust=False).mean()
+        macd = c.ewm(span=12, adjust=False).mean() - c.ewm(span=26, adjust=False).mean()
+        ref = {
+            "RSI": (100 - 100 / (1 + gain / loss)).iloc[-1],
+            "EMA_50": c.ewm(span=50, adjust=False).mean().iloc[-1],
+            "MACD": macd.iloc[-1],
+            "BB_Upper": c.rolling(20).mean().iloc[-1] + 2 * c.rolling(20).std().iloc[-1]
+        }
+        worst = max(worst, max(abs(kpis[symbol][k] - v) / abs(v) for k, v in ref.items()))
+    print(f"Pandas loop: {(time.perf_counter() - start) * 1000:.1f} ms | max relative diff {worst:.2e}")
@@ -0,0 +1,129 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Milliseconds per Binance kline interval
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000, "1w": 604_800_000
+}
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+class KlineStore:
+    """
+    Persistent columnar candle store.
+    Each (symbol, interval) is a flat binary file of float64 rows
+    [timestamp_ms, open, high, low, close, volume] that is appended in place
+    and read back through a memory map, so no CSV parsing is needed.
+    Reads copy their rows out under the same lock as writes, and rewrites go through a temp
+    file + os.replace, so a reader never maps a file that is being shrunk.
+    """
+    ROW_WIDTH = len(OHLCV_COLUMNS)
+    ROW_BYTES = ROW_WIDTH * 8
+
+    def __init__(self, root_dir="data/klines"):
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+
+    def _path(self, symbol, interval):
+        return os.path.join(self.root_dir, symbol.upper(), f"{interval}.bin")
+
+    def _load(self, symbol, interval):
+        """Returns a read-only (n, 6) memory-mapped view of the partition."""
+        path = self._path(symbol, interval)
+        if not os.path.exists(path) or os.path.getsize(path) < self.ROW_BYTES:
+            return np.empty((0, self.ROW_WIDTH))
+        rows = os.path.getsize(path) // self.ROW_BYTES
+        return np.memmap(path, dtype=np.float64, mode='r', shape=(rows, self.ROW_WIDTH))
+
+    def last_timestamp(self, symbol, interval):
+        """Open time (ms) of the newest stored candle, or None if the partition is empty."""
+        with self._lock:
+            data = self._load(symbol, interval)
+            return int(data[-1, 0]) if len(data) else None
+
+    def first_timestamp(self, symbol, interval):
+        with self._lock:
+            data = self._load(symbol, interval)
+            return int(data[0, 0]) if len(data) else None
+
+    def append(self, symbol, interval, df):
+        """
+        Appends candles newer than the last stored one.
+        The newest stored candle is overwritten if it appears again (it may have been still open).
+        Candles older than the last stored one (a backfill, or a page filling a hole) trigger a
+        merge and rewrite of the partition.
+        Returns the number of rows written.
+        """
+        if df is None or df.empty: return 0
+        rows = self._dedupe(self._to_rows(df))
+        if not len(rows): return 0
+
+        with self._lock:
+            path = self._path(symbol, interval)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            existing = self._load(symbol, interval)
+
+            last_ts = existing[-1, 0] if len(existing) else None
+            if last_ts is not None and rows[0, 0] < last_ts:
+                # Older rows: merge them in and rewrite the whole partition once
+                merged = self._dedupe(np.vstack([np.array(existing), rows]))
+                del existing
+                self._write(path, merged)
+                return len(rows)
+            del existing
+
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.seek(0, os.SEEK_END)
+                if last_ts is not None and rows[0, 0] == last_ts:
+                    # Overwrite the (possibly incomplete) last candle; the file never shrinks in place
+                    f.seek(-self.ROW_BYTES, os.SEEK_END)
+                f.write(np.ascontiguousarray(rows, dtype=np.float64).tobytes())
+            return len(rows)
+
+    def read_range(self, symbol, interval, start_ms=None, end_ms=None):
+        """Returns stored candles with start_ms <= open time < end_ms as an OHLCV DataFrame."""
+        with self._lock:
+            data = self._load(symbol, interval)
+            if not len(data): return pd.DataFrame(columns=OHLCV_COLUMNS)
+            ts = data[:, 0]
+            lo = np.searchsorted(ts, start_ms, side='left') if start_ms is not None else 0
+            hi = np.searchsorted(ts, end_ms, side='left') if end_ms is not None else len(ts)
+            chunk = np.array(data[lo:hi])
+            del data, ts
+
+        df = pd.DataFrame(chunk, columns=OHLCV_COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'].astype('int64'), unit='ms')
+        return df
+
+    def clear(self, symbol, interval):
+        with self._lock:
+            path = self._path(symbol, interval)
+            if os.path.exists(path): os.remove(path)
+
+    def _write(self, path, rows):
+        """Writes the partition to a temp file and swaps it in (readers keep the old inode)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(np.ascontiguousarray(rows, dtype=np.float64).tobytes())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _dedupe(rows):
+        """Sorts rows by open time, keeping the last copy of any duplicate."""
+        _, idx = np.unique(rows[::-1, 0], return_index=True)
+        return rows[::-1][idx]
+
+    @staticmethod
+    def _to_rows(df):
+        ts = df['timestamp']
+        if pd.api.types.is_datetime64_any_dtype(ts):
+            ts_ms = ts.astype('datetime64[ms]').astype('int64').to_numpy()
+        else:
+            ts_ms = pd.to_numeric(ts, errors='coerce').to_numpy()
+        rows = np.column_stack([ts_ms] + [pd.to_numeric(df[c], errors='coerce').to_numpy() for c in OHLCV_COLUMNS[1:]])
+        return rows[~np.isnan(rows[:, 0])].astype(np.float64)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+LIVE = "live"
+BACKTEST = "backtest"
+
+
+def prompt_key(model, prompt, image_bytes=None):
+    """Cache key of one model request: hash of the model name, the full prompt and the image bytes."""
+    h = hashlib.sha256()
+    h.update(model.encode())
+    h.update(b"\0")
+    h.update(prompt.encode())
+    h.update(b"\0")
+    h.update(image_bytes or b"")
+    return h.hexdigest()
+
+
+class LLMCache:
+    """
+    Disk-backed (SQLite) cache of parsed model responses, keyed by prompt_key.
+    Live entries expire after `ttl` seconds; backtest entries never expire (the same
+    historical window always gets the same answer). When the stored payload grows past
+    `max_bytes` the least recently used entries are evicted.
+    """
+    def __init__(self, path="data/llm_cache.sqlite", ttl=900, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        """SQLite connection, opened (and the table created) on first use."""
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    mode TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    payload TEXT NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        """Stored response for `key`, or None if missing or an expired live entry."""
+        now = time.time()
+        with self._lock:
+            try:
+                row = self.conn.execute("SELECT mode, created, payload FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and (row[0] == BACKTEST or now - row[1] < self.ttl):
+                    self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                    self.hits += 1
+                    return json.loads(row[2])
+            except Exception as e:
+                print(f"DEBUG: LLM cache read failed: {e}")
+            self.misses += 1
+            return None
+
+    def put(self, key, response, mode=LIVE):
+        """Stores a parsed response (error results, signal Gray, are not cached)."""
+        if not response or response.get("signal") == "Gray": return
+        payload = json.dumps(response, default=str)
+        now = time.time()
+        with self._lock:
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, mode, created, last_used, size, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, mode, now, now, len(payload), payload)
+                )
+                self._evict(now)
+            except Exception as e:
+                print(f"DEBUG: LLM cache write failed: {e}")
+
+    def _evict(self, now):
+        """Drops expired live entries, then least recently used ones until under max_bytes."""
+        self.conn.execute("DELETE FROM responses WHERE mode = ? AND created < ?", (LIVE, now - self.ttl))
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes: return
+        excess, doomed = total - self.max_bytes, []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0: break
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self, mode=None):
+        with self._lock:
+            if mode: self.conn.execute("DELETE FROM responses WHERE mode = ?", (mode,))
+            else: self.conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self._lock:
+            try:
+                entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            except Exception:
+                entries, size = 0, 0
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": (self.hits / total) if total else 0.0,
+                    "entries": entries, "bytes": size}
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    cache = LLMCache(os.path.join(tempfile.mkdtemp(), "llm.sqlite"), ttl=1, max_bytes=20_000)
+    verdict = {"signal": "Green", "confidence": 8, "reasoning": "demo " * 20, "levels": "N/A",
+               "usage": {"prompt_tokens": 900, "candidates_tokens": 80, "total_tokens": 980}}
+    for i in range(200):
+        cache.put(prompt_key("gemini-flash-latest", f"prompt {i}"), verdict, mode=BACKTEST)
+    print("After 200 puts (capped):", cache.stats())
+    key = prompt_key("gemini-flash-latest", "prompt 199")
+    start = time.perf_counter()
+    for _ in range(1000): cache.get(key)
+    print(f"Hit latency: {(time.perf_counter() - start):.3f} ms avg, usage kept: {cache.get(key)['usage']}")
+    cache.put("live-key", verdict)
+    time.sleep(1.1)
+    print("Live entry after TTL:", cache.get("live-key"))
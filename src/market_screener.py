@@ -0,0 +1,187 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.indicators import build_matrix, compute_indicators, ewm
+from src.rate_limiter import BINANCE_LIMITER
+
+# Leveraged tokens and stablecoin pairs carry no signal worth an AI call
+EXCLUDED_SUFFIXES = ("UPUSDT", "DOWNUSDT", "BULLUSDT", "BEARUSDT")
+STABLE_BASES = {"USDC", "FDUSD", "TUSD", "BUSD", "DAI", "USDP", "USDD", "EUR", "AEUR", "GBP", "PAXG"}
+
+
+def _robust_z(values):
+    """(x - median) / (1.4826 * MAD), 0 where undefined."""
+    values = np.asarray(values, dtype=float)
+    median = np.nanmedian(values)
+    mad = np.nanmedian(np.abs(values - median)) * 1.4826
+    if not np.isfinite(mad) or mad == 0: return np.zeros_like(values)
+    return np.nan_to_num((values - median) / mad)
+
+
+class MarketScreener:
+    """
+    Two-stage scanner over every USDT pair:
+    1. Ticker screen: one cached /ticker/24hr call ranks the whole exchange (volume, 24h range, change).
+    2. Kline screen: the best candidates (as many as half the free request-weight budget allows)
+       get one batched klines fetch; volume z-score, range expansion, RSI extremes and
+       MTF alignment are computed for all of them at once on NumPy matrices.
+    The ranked shortlist is what goes to the expensive per-symbol AI analysis.
+    """
+    WEIGHTS = {"vol_z": 0.35, "range_exp": 0.25, "rsi_extreme": 0.2, "mtf_align": 0.2}
+
+    def __init__(self, ingestor, async_ingestor, limiter=None, interval="1h", kline_limit=100,
+                 max_candidates=80, min_quote_volume=2e6, budget_share=0.5, cache_ttl=300):
+        self.ingestor = ingestor
+        self.async_ingestor = async_ingestor
+        self.limiter = limiter or BINANCE_LIMITER
+        self.interval = interval
+        self.kline_limit = kline_limit
+        self.max_candidates = max_candidates
+        self.min_quote_volume = min_quote_volume
+        self.budget_share = budget_share # Fraction of the available weight the kline stage may spend
+        self.cache_ttl = cache_ttl
+        self.last_stats = {}
+        self._cached = (0.0, pd.DataFrame())
+        self._lock = threading.Lock()
+
+    def universe(self, tickers):
+        """Tradeable, liquid USDT pairs from the 24hr ticker frame."""
+        if tickers is None or tickers.empty: return pd.DataFrame()
+        df = tickers[tickers['symbol'].str.endswith('USDT')]
+        df = df[~df['symbol'].str.endswith(EXCLUDED_SUFFIXES)]
+        df = df[~df['symbol'].str[:-4].isin(STABLE_BASES)]
+        if 'count' in df.columns:
+            df = df[df['count'] > 0]
+        return df[df['quoteVolume'] >= self.min_quote_volume].copy()
+
+    def ticker_screen(self, universe):
+        """Stage 1: cheap cross-sectional score for every pair (no extra requests)."""
+        df = universe.copy()
+        mid = df['lastPrice']
+        if 'weightedAvgPrice' in df.columns:
+            mid = df['weightedAvgPrice'].where(df['weightedAvgPrice'] > 0, mid)
+        df['range_24h'] = (df['highPrice'] - df['lowPrice']) / mid
+        df['prelim'] = (
+            _robust_z(np.log(df['quoteVolume'].clip(lower=1)))
+            + _robust_z(df['range_24h'])
+            + _robust_z(df['priceChangePercent'].abs())
+        )
+        return df.sort_values('prelim', ascending=False)
+
+    def candidate_count(self):
+        """How many kline requests the current rate-limit budget allows for stage 2."""
+        affordable = self.limiter.affordable("/api/v3/klines", {"limit": self.kline_limit})
+        return max(0, min(self.max_candidates, int(affordable * self.budget_share)))
+
+    def kline_screen(self, frames, change_24h=None):
+        """
+        Stage 2 on {symbol: OHLCV frame}. Returns one row per symbol with the raw features and
+        the 0-1 composite score. The last (forming) candle is only used for RSI / trend.
+        """
+        symbols, close = build_matrix(frames, 'close', self.kline_limit)
+        if not symbols: return pd.DataFrame()
+        _, volume = build_matrix(frames, 'volume', self.kline_limit)
+        _, high = build_matrix(frames, 'high', self.kline_limit)
+        _, low = build_matrix(frames, 'low', self.kline_limit)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Volume z-score: last closed candle vs the 48 before it (log scale)
+            log_vol = np.log1p(volume)
+            ref = log_vol[:, -50:-2]
+            vol_z = (log_vol[:, -2] - np.nanmean(ref, axis=1)) / np.nanstd(ref, axis=1)
+
+            # Range expansion: last closed candle's range vs the average of the previous 24
+            ranges = (high - low) / close
+            range_exp = ranges[:, -2] / np.nanmean(ranges[:, -26:-2], axis=1)
+
+            rsi = compute_indicators(close)["RSI"]
+
+            # MTF alignment: 1h trend (close vs EMA20), 4h trend (EMA80 on 1h ~ EMA20 on 4h), 24h change
+            last = close[:, -1]
+            trend_1h = np.sign(last - ewm(close, 2 / 21)[:, -1])
+            trend_4h = np.sign(last - ewm(close, 2 / 81)[:, -1])
+        change = np.array([(change_24h or {}).get(s, 0.0) for s in symbols], dtype=float)
+        votes = np.nan_to_num(trend_1h) + np.nan_to_num(trend_4h) + np.sign(np.nan_to_num(change))
+        mtf_align = np.abs(votes) / 3
+
+        features = {
+            "vol_z": np.clip(np.nan_to_num(vol_z) / 3, 0, 1),
+            "range_exp": np.clip((np.nan_to_num(range_exp, nan=1.0) - 1) / 2, 0, 1),
+            "rsi_extreme": np.clip((np.abs(np.nan_to_num(rsi, nan=50.0) - 50) - 20) / 30, 0, 1),
+            "mtf_align": np.where(mtf_align == 1, 1.0, 0.0)
+        }
+        score = sum(self.WEIGHTS[k] * v for k, v in features.items())
+
+        return pd.DataFrame({
+            "symbol": symbols,
+            "score": np.round(score, 4),
+            "vol_z": np.round(vol_z, 2),
+            "range_exp": np.round(range_exp, 2),
+            "rsi": np.round(rsi, 1),
+            "mtf_align": np.round(mtf_align, 2),
+            "direction": np.where(votes > 0, "up", np.where(votes < 0, "down", "mixed"))
+        })
+
+    def scan(self, force=False):
+        """Full ranked table (cached for cache_ttl seconds)."""
+        with self._lock:
+            stamp, cached = self._cached
+            if not force and time.time() - stamp < self.cache_ttl and not cached.empty:
+                return cached
+
+        start = time.time()
+        tickers = self.ingestor.get_ticker_24hr()
+        universe = self.universe(tickers)
+        if universe.empty: return pd.DataFrame()
+
+        ranked = self.ticker_screen(universe)
+        n = self.candidate_count()
+        candidates = list(ranked['symbol'].head(n))
+        frames = {}
+        if candidates:
+            try:
+                snapshot = self.async_ingestor.fetch_all(candidates, [self.interval], {self.interval: self.kline_limit}, depth=False)
+                frames = {s: v["mtf"].get(self.interval) for s, v in snapshot.items()}
+                frames = {s: df for s, df in frames.items() if df is not None and len(df) >= 52}
+            except Exception as e:
+                print(f"DEBUG: Screener kline stage failed: {e}")
+
+        scored = self.kline_screen(frames, dict(zip(ranked['symbol'], ranked['priceChangePercent'])))
+        cols = ['symbol', 'priceChangePercent', 'quoteVolume', 'lastPrice', 'range_24h', 'prelim']
+        if scored.empty:
+            # No kline budget: rank by the ticker screen alone
+            result = ranked[cols].head(self.max_candidates).assign(score=np.nan)
+        else:
+            result = scored.merge(ranked[cols], on='symbol', how='left').sort_values(['score', 'prelim'], ascending=False)
+        result = result.reset_index(drop=True)
+
+        self.last_stats = {
+            "universe": len(universe),
+            "kline_candidates": len(candidates),
+            "scored": len(scored),
+            "seconds": round(time.time() - start, 2),
+            "budget": self.limiter.budget()
+        }
+        print(f"DEBUG: Screener ranked {len(universe)} pairs, klines for {len(frames)} in {self.last_stats['seconds']}s")
+        with self._lock:
+            self._cached = (time.time(), result)
+        return result
+
+    def shortlist(self, limit=8):
+        """Top `limit` symbols for the AI, with the ticker columns get_market_overview expects."""
+        return self.scan().head(limit).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.business_logic import BusinessLogic
+
+    logic = BusinessLogic()
+    table = logic.screener.scan()
+    print(logic.screener.last_stats)
+    print(table.head(15).to_string())
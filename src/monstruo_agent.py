@@ -9,6 +9,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.business_logic import BusinessLogic
+from src.startup_profiler import STARTUP
 
 # Load environment variables
 load_dotenv()
@@ -37,10 +38,15 @@ def run_agent():
     except Exception as e:
         logger.error(f"Failed to initialize BusinessLogic: {e}")
         return
+    logic.budget_source = "agent" # Same token ledger as the dashboard
 
     # Configuration
     symbols_env = os.getenv("AGENT_SYMBOLS")
-    if symbols_env:
+    # AGENT_SYMBOLS=auto -> each cycle analyzes the pre-screener's shortlist of the whole exchange
+    auto_screen = (symbols_env or "").strip().lower() == "auto"
+    if auto_screen:
+        symbols = []
+    elif symbols_env:
         symbols = [s.strip() for s in symbols_env.split(",")]
     else:
         # Default top assets
@@ -50,11 +56,25 @@ def run_agent():
     
     logger.info(f"Configuration: Symbols={symbols}, Interval={scan_interval}s")
 
+    # Live candle buffers via WebSocket (REST remains the fallback while cold)
+    if os.getenv("AGENT_STREAMING", "1") == "1" and not auto_screen:
+        logic.ingestor.start_stream(symbols, list(logic.fetch_limits()), capacity=logic.base_limit)
+        logger.info("Market stream started.")
+        # Live volume anomalies on every streamed candle, between scan cycles
+        logic.attach_whale_stream(lambda e: logger.info(
+            f"🐋 Whale activity {e['symbol']} {e['timeframe']}: {e['ratio']:.1f}x median volume (z={e['z_volume']:.1f})"))
+
+    first_cycle = True
     while True:
         try:
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             logger.info(f"--- Starting Analysis Cycle at {current_time} ---")
             
+            if auto_screen:
+                shortlist = logic.screen_market(limit=int(os.getenv("AGENT_SHORTLIST", 8)))
+                symbols = list(shortlist['symbol']) if not shortlist.empty else ["BTCUSDT", "ETHUSDT"]
+                logger.info(f"Screener shortlist: {symbols} ({logic.screener.last_stats.get('universe', 0)} pairs screened)")
+
             # get_market_overview internally handles technical analysis, AI generation, and Telegram notification
             assets = logic.get_market_overview(specific_symbols=symbols)
             
@@ -65,6 +85,12 @@ def run_agent():
                 summary.append(f"{symbol}: {sig}")
             
             logger.info(f"Cycle Complete. Signals: {', '.join(summary)}")
+            budget = logic.token_budget.stats()
+            logger.info(f"Token budget: plan {budget['last_plan']}, {budget['hourly']:,} left this hour, {budget['daily']:,} today")
+            if first_cycle:
+                # Cold start breakdown (imports + lazy component init)
+                logger.info("Startup timing:\n" + STARTUP.format_report())
+                first_cycle = False
             logger.info(f"Sleeping for {scan_interval} seconds...")
             
         except Exception as e:
@@ -1,11 +1,13 @@
 import requests
 import os
-import streamlit as st
+import sys
 
 class TelegramNotifier:
     def __init__(self):
         # Load credentials from secrets or env
         try:
+            # Only consult st.secrets when running inside Streamlit (avoids importing it in the agent)
+            st = sys.modules["streamlit"]
             self.bot_token = st.secrets.get("TELEGRAM_BOT_TOKEN", os.getenv("TELEGRAM_BOT_TOKEN"))
             self.chat_id = st.secrets.get("TELEGRAM_CHAT_ID", os.getenv("TELEGRAM_CHAT_ID"))
         except:
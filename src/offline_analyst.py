@@ -0,0 +1,197 @@
+import hashlib
+import json
+import math
+import os
+import threading
+
+from src.incremental_indicators import IndicatorSet
+
+ANALYST_BACKENDS = ("gemini", "rules", "replay")
+ZERO_USAGE = {"prompt_tokens": 0, "candidates_tokens": 0, "total_tokens": 0}
+
+
+def make_analyst(backend="gemini", **kwargs):
+    """
+    Analyst for a backend name. Every backend exposes analyze_asset / analyze_batch and returns
+    the same verdict dict (signal, confidence, reasoning, levels, usage):
+    - gemini: AIAnalyst (model calls)
+    - rules: RuleBasedAnalyst (local, deterministic)
+    - replay: ReplayAnalyst (recorded verdicts, rules for the rest)
+    """
+    if backend == "gemini":
+        from src.ai_analyst import AIAnalyst
+        return AIAnalyst(**kwargs)
+    if backend == "rules":
+        return RuleBasedAnalyst(**kwargs)
+    if backend == "replay":
+        return ReplayAnalyst(**kwargs)
+    raise ValueError(f"Unknown analyst backend: {backend} (expected one of {ANALYST_BACKENDS})")
+
+
+class RuleBasedAnalyst:
+    """
+    Deterministic local analyst following the same rule the model is given: GREEN/RED only when
+    at least `min_votes` indicators converge (RSI extremes, MACD vs signal, price vs SMA20 and
+    EMA50, Bollinger breaks), YELLOW otherwise. Works on the candles alone, costs no tokens and
+    answers in ~0.2 ms, so backtests, strategy sweeps and load tests run offline.
+    """
+    name = "rules"
+    compact = False # No prompt to encode
+
+    def __init__(self, min_votes=3, lookback=100):
+        self.min_votes = min_votes
+        self.lookback = lookback # Candles replayed per call (enough for EMA50 / MACD to settle)
+
+    @staticmethod
+    def _valid(value):
+        return value is not None and math.isfinite(value)
+
+    def votes(self, closes):
+        """(score, reasons, kpis) for a close series (oldest first)."""
+        kpis = IndicatorSet().seed(closes[-self.lookback:]).kpis()
+        price = float(closes[-1])
+        score, reasons = 0, []
+        rsi = kpis["RSI"]
+        if self._valid(rsi):
+            if rsi < 30: score, reasons = score + 1, reasons + [f"RSI {rsi:.1f} sobreventa"]
+            elif rsi > 70: score, reasons = score - 1, reasons + [f"RSI {rsi:.1f} sobrecompra"]
+        if self._valid(kpis["MACD"]) and self._valid(kpis["MACD_Signal"]):
+            up = kpis["MACD"] > kpis["MACD_Signal"]
+            score += 1 if up else -1
+            reasons.append("MACD > señal" if up else "MACD < señal")
+        for key, label in (("SMA_20", "SMA20"), ("EMA_50", "EMA50")):
+            if self._valid(kpis[key]):
+                up = price > kpis[key]
+                score += 1 if up else -1
+                reasons.append(f"precio {'>' if up else '<'} {label}")
+        if self._valid(kpis["BB_Lower"]) and price < kpis["BB_Lower"]:
+            score, reasons = score + 1, reasons + ["bajo banda inferior"]
+        elif self._valid(kpis["BB_Upper"]) and price > kpis["BB_Upper"]:
+            score, reasons = score - 1, reasons + ["sobre banda superior"]
+        return score, reasons, kpis
+
+    def analyze_asset(self, symbol, price_data, context="Neutral", image_bytes=None, feedback="", cache_mode=None):
+        closes = price_data['close'].to_numpy(dtype=float) if price_data is not None and len(price_data) else []
+        if len(closes) < 26:
+            return {"signal": "Yellow", "confidence": 3, "reasoning": "Reglas: datos insuficientes.",
+                    "levels": "N/A", "usage": dict(ZERO_USAGE)}
+        score, reasons, kpis = self.votes(closes)
+        signal = "Green" if score >= self.min_votes else "Red" if score <= -self.min_votes else "Yellow"
+        levels = "N/A"
+        if self._valid(kpis["BB_Lower"]) and self._valid(kpis["BB_Upper"]):
+            levels = f"Soporte {kpis['BB_Lower']:.6g} / Resistencia {kpis['BB_Upper']:.6g}"
+        return {
+            "signal": signal,
+            "confidence": min(10, 5 + abs(score)),
+            "reasoning": f"Reglas ({score:+d}): " + ", ".join(reasons) + ".",
+            "levels": levels,
+            "usage": dict(ZERO_USAGE)
+        }
+
+    def analyze_batch(self, items, feedback="", image_bytes=None, cache_mode=None):
+        return {item['symbol']: self.analyze_asset(item['symbol'], item['price_data'], item.get('context', 'Neutral'))
+                for item in items}
+
+
+def window_key(symbol, price_data):
+    """Replay key of an analysis window: symbol + open time of its last candle (or a hash of its closes)."""
+    if 'timestamp' in price_data.columns and len(price_data):
+        return f"{symbol}@{str(price_data['timestamp'].iloc[-1])}"
+    closes = price_data['close'].to_numpy(dtype=float)[-50:]
+    return f"{symbol}#{hashlib.sha1(closes.tobytes()).hexdigest()[:16]}"
+
+
+class ReplayAnalyst:
+    """
+    Replays recorded verdicts (JSON lines keyed by window_key). A window that was never recorded
+    is answered by `record_from` when given (e.g. AIAnalyst; the verdict is then stored for the
+    next run) or else by `fallback` (rule-based by default). Replayed verdicts cost no tokens.
+    """
+    name = "replay"
+    compact = False
+
+    def __init__(self, path="data/replay_verdicts.jsonl", fallback=None, record_from=None):
+        self.path = path
+        self.fallback = fallback or RuleBasedAnalyst()
+        self.record_from = record_from
+        self.replayed = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._verdicts = self._load()
+
+    def _load(self):
+        verdicts = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        verdicts[entry.pop("key")] = entry
+        return verdicts
+
+    def record(self, key, verdict):
+        entry = {k: verdict.get(k) for k in ("signal", "confidence", "reasoning", "levels")}
+        with self._lock:
+            self._verdicts[key] = entry
+            self.recorded += 1
+            try:
+                if os.path.dirname(self.path):
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps({"key": key, **entry}) + "\n")
+            except Exception as e:
+                print(f"DEBUG: Replay verdict not stored: {e}")
+
+    def analyze_asset(self, symbol, price_data, context="Neutral", image_bytes=None, feedback="", cache_mode=None):
+        key = window_key(symbol, price_data)
+        entry = self._verdicts.get(key)
+        if entry is not None:
+            self.replayed += 1
+            return dict(entry, usage=dict(ZERO_USAGE))
+        if self.record_from is not None:
+            verdict = self.record_from.analyze_asset(symbol, price_data, context, image_bytes=image_bytes,
+                                                     feedback=feedback, cache_mode="backtest")
+            if verdict.get("signal") != "Gray":
+                self.record(key, verdict)
+            return verdict
+        return self.fallback.analyze_asset(symbol, price_data, context)
+
+    def analyze_batch(self, items, feedback="", image_bytes=None, cache_mode=None):
+        return {item['symbol']: self.analyze_asset(item['symbol'], item['price_data'], item.get('context', 'Neutral'),
+                                                   image_bytes=image_bytes, feedback=feedback)
+                for item in items}
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+    import types
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import numpy as np
+    import pandas as pd
+    from src.backtester import Backtester
+
+    rng = np.random.default_rng(11)
+    n = 24 * 365
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.006, n)))
+    df = pd.DataFrame({"timestamp": pd.date_range("2023-01-01", periods=n, freq="1h"), "open": close, "high": close * 1.003,
+                       "low": close * 0.997, "close": close, "volume": rng.lognormal(8, 0.3, n)})
+
+    rules = RuleBasedAnalyst()
+    window = df.iloc[-100:]
+    start = time.perf_counter()
+    for _ in range(2000): rules.analyze_asset("BTCUSDT", window)
+    print(f"Rules backend: {2000 / (time.perf_counter() - start):,.0f} calls/s ->", rules.analyze_asset("BTCUSDT", window))
+
+    ingestor = types.SimpleNamespace(get_long_history=lambda symbol, interval, days: df)
+    start = time.perf_counter()
+    result = Backtester(rules, ingestor).run_simulation("BTCUSDT", days=365, step=1)
+    print(f"1-year 1h backtest, {len(result['equity_curve'])} steps: {time.perf_counter() - start:.2f}s | "
+          f"profit {result['profit_pct']:.2f}% | trades {result['total_trades']} | tokens {result['usage']}")
+
+    # Replay: the first run records (here from the rules backend), the second one only replays
+    replay = ReplayAnalyst(os.path.join(tempfile.mkdtemp(), "replay.jsonl"), record_from=rules)
+    first = Backtester(replay, ingestor).run_simulation("BTCUSDT", days=365, step=24)
+    second = Backtester(ReplayAnalyst(replay.path), ingestor).run_simulation("BTCUSDT", days=365, step=24)
+    print(f"Replay: recorded {replay.recorded}, identical rerun: {first['profit_pct'] == second['profit_pct']}")
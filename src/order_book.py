@@ -0,0 +1,251 @@
+import threading
+import numpy as np
+
+
+class LocalOrderBook:
+    """
+    Order book for one symbol kept in sorted NumPy arrays (ascending price on both sides).
+    Best bid is the last bid level and best ask the first ask level, so top-of-book is O(1)
+    and level updates are located by binary search.
+    Both sides and the version are published as one immutable tuple: updates build new arrays
+    and swap the tuple, so readers on other threads always see a consistent book.
+    """
+    def __init__(self, symbol, depth=100):
+        self.symbol = symbol
+        self.depth = depth # Levels considered for wall detection (matches the REST snapshot size)
+        self.last_update_id = 0
+        self.synced = False
+        self._sides = (np.empty(0), np.empty(0), np.empty(0), np.empty(0), 0) # bid_px, bid_qty, ask_px, ask_qty, version
+        self._walls_cache = (None, None)
+
+    @property
+    def bid_px(self): return self._sides[0]
+
+    @property
+    def bid_qty(self): return self._sides[1]
+
+    @property
+    def ask_px(self): return self._sides[2]
+
+    @property
+    def ask_qty(self): return self._sides[3]
+
+    @property
+    def version(self): return self._sides[4]
+
+    def _publish(self, bid_px, bid_qty, ask_px, ask_qty):
+        self._sides = (bid_px, bid_qty, ask_px, ask_qty, self._sides[4] + 1)
+
+    def load_snapshot(self, snapshot):
+        bids = np.array(snapshot.get('bids', []), dtype=float).reshape(-1, 2)
+        asks = np.array(snapshot.get('asks', []), dtype=float).reshape(-1, 2)
+        bids = bids[bids[:, 1] > 0]
+        asks = asks[asks[:, 1] > 0]
+        b_order = np.argsort(bids[:, 0])
+        a_order = np.argsort(asks[:, 0])
+        self._publish(bids[b_order, 0], bids[b_order, 1], asks[a_order, 0], asks[a_order, 1])
+        self.last_update_id = int(snapshot['lastUpdateId'])
+
+    @staticmethod
+    def _apply_side(px, qty, updates):
+        """Returns updated copies; the published arrays are never modified."""
+        px, qty = px.copy(), qty.copy()
+        for price, amount in updates:
+            p, q = float(price), float(amount)
+            i = np.searchsorted(px, p)
+            exists = i < len(px) and px[i] == p
+            if q == 0:
+                if exists:
+                    px = np.delete(px, i)
+                    qty = np.delete(qty, i)
+            elif exists:
+                qty[i] = q
+            else:
+                px = np.insert(px, i, p)
+                qty = np.insert(qty, i, q)
+        return px, qty
+
+    def apply_diff(self, event):
+        """Applies a depthUpdate event. Assumes the caller validated the sequence."""
+        bid_px, bid_qty, ask_px, ask_qty, _ = self._sides
+        bid_px, bid_qty = self._apply_side(bid_px, bid_qty, event.get('b', []))
+        ask_px, ask_qty = self._apply_side(ask_px, ask_qty, event.get('a', []))
+        self._publish(bid_px, bid_qty, ask_px, ask_qty)
+        self.last_update_id = int(event['u'])
+
+    def best_bid(self):
+        return float(self.bid_px[-1]) if len(self.bid_px) else None
+
+    def best_ask(self):
+        return float(self.ask_px[0]) if len(self.ask_px) else None
+
+    @staticmethod
+    def _mid(bid_px, ask_px):
+        return (float(bid_px[-1]) + float(ask_px[0])) / 2 if len(bid_px) and len(ask_px) else None
+
+    def mid(self):
+        bid_px, _, ask_px, _, _ = self._sides
+        return self._mid(bid_px, ask_px)
+
+    def walls(self, multiplier=5):
+        """
+        First level (from the touch outwards) whose quantity exceeds `multiplier` x the mean
+        of the top `depth` levels. Cached until the book changes.
+        """
+        bid_px, bid_qty, ask_px, ask_qty, version = self._sides
+        cached_version, cached = self._walls_cache
+        if cached_version == version:
+            return cached
+
+        bids_q = bid_qty[::-1][:self.depth]
+        asks_q = ask_qty[:self.depth]
+        result = {"buy_wall": None, "sell_wall": None}
+        if len(bids_q):
+            hits = np.flatnonzero(bids_q > bids_q.mean() * multiplier)
+            if len(hits): result["buy_wall"] = float(bid_px[::-1][hits[0]])
+        if len(asks_q):
+            hits = np.flatnonzero(asks_q > asks_q.mean() * multiplier)
+            if len(hits): result["sell_wall"] = float(ask_px[hits[0]])
+
+        self._walls_cache = (version, result)
+        return result
+
+    def liquidity(self, pct=0.01):
+        """Base quantity resting within `pct` of the mid price on each side."""
+        bid_px, bid_qty, ask_px, ask_qty, _ = self._sides
+        mid = self._mid(bid_px, ask_px)
+        if mid is None: return {"bid": 0.0, "ask": 0.0}
+        lo = np.searchsorted(bid_px, mid * (1 - pct), side='left')
+        hi = np.searchsorted(ask_px, mid * (1 + pct), side='right')
+        return {"bid": float(bid_qty[lo:].sum()), "ask": float(ask_qty[:hi].sum())}
+
+
+class OrderBookManager:
+    """
+    Keeps LocalOrderBooks in sync with the Binance diff depth stream.
+    Follows the documented procedure: buffer events, load a REST snapshot, drop events
+    with u <= lastUpdateId, then require each event's U to follow the previous u.
+    Any sequence gap marks the book unsynced and triggers a background resync.
+    A resync fetches one snapshot and replays the buffer on it as events arrive; a new
+    snapshot (limit 1000 = request weight 50) is only fetched once the stream has moved past it.
+    """
+    def __init__(self, symbols, snapshot_fn, depth=100, snapshot_limit=1000):
+        self.symbols = [s.upper() for s in symbols]
+        self.snapshot_fn = snapshot_fn # (symbol, limit) -> REST depth payload
+        self.snapshot_limit = snapshot_limit
+        self.books = {s: LocalOrderBook(s, depth) for s in self.symbols}
+        self.pending = {s: [] for s in self.symbols}
+        self.resyncs = {s: 0 for s in self.symbols}
+        self.snapshot_requests = {s: 0 for s in self.symbols}
+        self._snapshots = {} # Symbol -> snapshot of the resync in progress
+        self._resyncing = set()
+        self._lock = threading.Lock()
+
+    def streams(self):
+        return [f"{s.lower()}@depth@100ms" for s in self.symbols]
+
+    def get(self, symbol):
+        return self.books.get(symbol.upper())
+
+    def is_synced(self, symbol):
+        book = self.get(symbol)
+        return bool(book and book.synced)
+
+    def invalidate(self):
+        """Marks every book stale (e.g. after a disconnect); they resync on the next event."""
+        with self._lock:
+            for s, book in self.books.items():
+                book.synced = False
+                self.pending[s] = []
+            self._snapshots.clear()
+
+    def handle(self, event):
+        symbol = event.get('s')
+        book = self.books.get(symbol)
+        if book is None: return
+
+        with self._lock:
+            if book.synced:
+                if event['u'] <= book.last_update_id:
+                    return
+                if event['U'] == book.last_update_id + 1:
+                    book.apply_diff(event)
+                    return
+                print(f"DEBUG: Depth gap for {symbol} ({book.last_update_id} -> {event['U']}). Resyncing...")
+                book.synced = False
+                self.pending[symbol] = []
+            self.pending[symbol].append(event)
+            if symbol in self._snapshots:
+                self._replay(symbol) # Reuses the snapshot already fetched: no request
+            start_resync = not book.synced and symbol not in self._snapshots and symbol not in self._resyncing
+            if start_resync: self._resyncing.add(symbol)
+
+        if start_resync:
+            threading.Thread(target=self.resync, args=(symbol,), daemon=True).start()
+
+    def _replay(self, symbol):
+        """
+        Loads the cached snapshot and replays the buffered events on it (lock held).
+        The snapshot is dropped once the buffer starts after it (stale) or has a hole.
+        """
+        book = self.books[symbol]
+        book.load_snapshot(self._snapshots[symbol])
+        events = [e for e in self.pending[symbol] if e['u'] > book.last_update_id]
+        self.pending[symbol] = events
+        if not events:
+            return # Stream not past the snapshot yet: wait for the next event
+        if events[0]['U'] > book.last_update_id + 1:
+            del self._snapshots[symbol] # Snapshot older than the buffered stream
+            return
+        for i, e in enumerate(events):
+            if i and e['U'] != book.last_update_id + 1:
+                del self._snapshots[symbol]
+                self.pending[symbol] = events[i:]
+                return
+            book.apply_diff(e)
+        del self._snapshots[symbol]
+        self.pending[symbol] = []
+        book.synced = True
+        self.resyncs[symbol] += 1
+
+    def resync(self, symbol):
+        """Fetches a snapshot and replays buffered events on top of it."""
+        try:
+            snapshot = self.snapshot_fn(symbol, self.snapshot_limit)
+            self.snapshot_requests[symbol] += 1
+            if not snapshot: return
+            with self._lock:
+                self._snapshots[symbol] = snapshot
+                self._replay(symbol)
+        except Exception as e:
+            print(f"DEBUG: Order book resync failed for {symbol}: {e}")
+        finally:
+            with self._lock:
+                self._resyncing.discard(symbol)
+
+
+if __name__ == "__main__":
+    import time
+    from tests.fake_binance import FakeBinanceServer
+
+    rest = FakeBinanceServer()
+    manager = OrderBookManager(["BTCUSDT"], snapshot_fn=lambda s, limit: rest.depth(s, limit))
+    book = manager.get("BTCUSDT")
+    mid = float(rest.depth("BTCUSDT", 1)["bids"][0][0]) + 0.01
+
+    # Replay: diff events continuing the snapshot (lastUpdateId=1), including a large bid wall
+    frames = [{"e": "depthUpdate", "s": "BTCUSDT", "U": i, "u": i,
+               "b": [[f"{mid - 0.05:.2f}", "500"]] if i == 3 else [[f"{mid - 0.07:.2f}", "3"]], "a": [[f"{mid + 0.03:.2f}", "0"]]}
+              for i in range(1, 6)]
+    for f in frames: manager.handle(f)
+    time.sleep(0.2)
+    for f in frames[2:]: manager.handle(f)
+    print(f"synced={manager.is_synced('BTCUSDT')} last_id={book.last_update_id} walls={book.walls()}")
+
+    # Inject a gap -> resync
+    manager.handle({"e": "depthUpdate", "s": "BTCUSDT", "U": 10, "u": 10, "b": [], "a": []})
+    print(f"after gap synced={manager.is_synced('BTCUSDT')}")
+
+    t0 = time.perf_counter()
+    for _ in range(10_000): book.walls()
+    print(f"walls() cached: {(time.perf_counter() - t0) / 10_000 * 1e6:.2f}us/query, liquidity 1%: {book.liquidity(0.01)}")
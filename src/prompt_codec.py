@@ -0,0 +1,235 @@
+import json
+import os
+
+import numpy as np
+
+CHARS_PER_TOKEN = 4 # Rough prompt size estimate (Gemini averages ~4 chars per token on this mix)
+MAX_NEWS = 3 # Headlines kept in the compact encoding
+MAX_HEADLINE = 90
+
+
+def estimate_tokens(text):
+    return len(text or "") // CHARS_PER_TOKEN
+
+
+def _pct(value, ref):
+    """Signed % distance from ref with fixed precision, e.g. '+0.42'."""
+    return f"{(float(value) / ref - 1) * 100:+.2f}"
+
+
+def encode_candles(df, n=10):
+    """
+    Last n OHLCV candles as one short line each: open/high/low/close as % vs the last close
+    and volume as a multiple of the median volume. The header carries the reference price.
+    """
+    if df is None or len(df) == 0: return "candles: none"
+    tail = df.tail(n)
+    ref = float(tail['close'].iloc[-1]) or 1.0
+    vols = df['volume'].tail(50).to_numpy(dtype=float)
+    med = float(np.median(vols)) if len(vols) else 0.0
+    med = med or 1.0
+    stamp = f" @{str(tail['timestamp'].iloc[-1])[:16]}" if 'timestamp' in tail.columns else ""
+    lines = [f"candles oldest->newest ref={ref:.6g}{stamp} (o,h,l,c %vs ref; v x median)"]
+    for o, h, l, c, v in zip(tail['open'], tail['high'] if 'high' in tail else tail['close'],
+                             tail['low'] if 'low' in tail else tail['close'], tail['close'], tail['volume']):
+        lines.append(f"{_pct(o, ref)},{_pct(h, ref)},{_pct(l, ref)},{_pct(c, ref)},{float(v) / med:.1f}")
+    return "\n".join(lines)
+
+
+def encode_mtf(mtf_summary):
+    """['15m: +0.12%', '1h: -0.30%'] -> 'mtf 15m+0.12% 1h-0.30%'."""
+    return "mtf " + " ".join(s.replace(": ", "") for s in mtf_summary) if mtf_summary else "mtf n/a"
+
+
+def encode_kpis(kpis, price):
+    """RSI and MACD as values; Bollinger bands and averages as % vs price."""
+    if not kpis or kpis.get('RSI') is None: return ""
+    parts = [f"rsi {kpis['RSI']:.1f}"]
+    if kpis.get('MACD') is not None:
+        parts.append(f"macd {kpis['MACD']:.3g}/{kpis.get('MACD_Signal') or 0:.3g}")
+    if price:
+        if kpis.get('BB_Lower') is not None and kpis.get('BB_Upper') is not None:
+            parts.append(f"bb {_pct(kpis['BB_Lower'], price)}/{_pct(kpis['BB_Upper'], price)}%")
+        for key, label in (("SMA_20", "sma20"), ("EMA_50", "ema50")):
+            if kpis.get(key) is not None:
+                parts.append(f"{label} {_pct(kpis[key], price)}%")
+    return " ".join(parts)
+
+
+def encode_whale(whale):
+    if not whale or not whale.get("whale_alert"): return ""
+    return f"WHALE vol {whale.get('vol_anomaly', 0):.1f}x median {whale.get('timeframe')} z{whale.get('z') or 0:.1f}"
+
+
+def encode_walls(walls, price):
+    if not walls or not price: return ""
+    parts = []
+    if walls.get('buy_wall'): parts.append(f"buy {_pct(walls['buy_wall'], price)}%")
+    if walls.get('sell_wall'): parts.append(f"sell {_pct(walls['sell_wall'], price)}%")
+    return "walls " + " ".join(parts) if parts else ""
+
+
+def encode_news(news_items, max_news=MAX_NEWS):
+    if not news_items: return "news none"
+    titles = [n['title'][:MAX_HEADLINE] for n in news_items[:max_news] if n.get('title')]
+    return f"news {len(news_items)}: " + " ; ".join(titles)
+
+
+def encode_context(mtf_summary, kpis, price, whale=None, walls=None, news_items=None, include_news=True):
+    """Compact AI context: {section: text}. Join the values with ' | ' for the prompt."""
+    sections = {
+        "mtf": encode_mtf(mtf_summary),
+        "kpis": encode_kpis(kpis, price),
+        "whale": encode_whale(whale),
+        "walls": encode_walls(walls, price)
+    }
+    if include_news:
+        sections["news"] = encode_news(news_items)
+    return {k: v for k, v in sections.items() if v}
+
+
+def join_context(sections):
+    return " | ".join(sections.values())
+
+
+def prompt_report(sections):
+    """
+    Estimated tokens per prompt section: {section: text} -> {section: tokens, ..., "total": tokens}.
+    """
+    report = {name: estimate_tokens(text) for name, text in sections.items()}
+    report["total"] = sum(report.values())
+    return report
+
+
+def format_report(verbose, compact):
+    """Side by side verbose / compact token counts per section."""
+    lines = [f"{'section':<14}{'verbose':>9}{'compact':>9}"]
+    for name in [k for k in verbose if k != "total"] + [k for k in compact if k not in verbose and k != "total"]:
+        lines.append(f"{name:<14}{verbose.get(name, 0):>9}{compact.get(name, 0):>9}")
+    saved = verbose.get("total", 0) - compact.get("total", 0)
+    lines.append(f"{'total':<14}{verbose.get('total', 0):>9}{compact.get('total', 0):>9}  (-{saved}, {saved / max(verbose.get('total', 1), 1):.0%})")
+    return "\n".join(lines)
+
+
+class PromptEvalSet:
+    """
+    Stored evaluation cases (JSON lines): the inputs of an analysis plus the verdict the model
+    gave with the verbose encoding. evaluate() re-runs them with the current encoding to check
+    that the verdicts hold while prompt tokens drop.
+    """
+    def __init__(self, path="data/prompt_eval.jsonl"):
+        self.path = path
+
+    @staticmethod
+    def _pack(df):
+        """JSON-safe copy of a frame: index and every column (datetimes as epoch ms), so prompts render as recorded."""
+        dates = [c for c in df.columns if str(df[c].dtype).startswith("datetime64")]
+        index = df.index.tolist() if df.index.dtype.kind in "iu" else list(range(len(df)))
+        columns = {c: df[c].astype('datetime64[ms]').astype('int64').tolist() if c in dates else df[c].tolist() for c in df.columns}
+        return {"index": index, "dates": dates, "columns": columns}
+
+    @staticmethod
+    def _unpack(case):
+        import pandas as pd
+        if "price_data" not in case: # Cases recorded before timestamps were kept
+            return pd.DataFrame(case["candles"], columns=['open', 'high', 'low', 'close', 'volume'])
+        packed = case["price_data"]
+        df = pd.DataFrame(packed["columns"], index=packed["index"])
+        for c in packed["dates"]:
+            df[c] = pd.to_datetime(df[c], unit='ms')
+        return df
+
+    def record(self, symbol, candles, verbose_context, compact_context, verdict):
+        if not verdict or verdict.get("signal") == "Gray": return
+        case = {
+            "symbol": symbol,
+            "price_data": self._pack(candles.tail(50)),
+            "verbose_context": verbose_context,
+            "compact_context": compact_context,
+            "signal": verdict.get("signal"),
+            "confidence": verdict.get("confidence")
+        }
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(case) + "\n")
+        except Exception as e:
+            print(f"DEBUG: Eval case not stored: {e}")
+
+    def load(self):
+        if not os.path.exists(self.path): return []
+        with open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def evaluate(self, analyst, limit=None):
+        """
+        Runs every stored case through analyst.analyze_asset with the compact encoding.
+        Returns signal agreement with the stored verdicts (Gray answers, i.e. failed calls, are
+        counted as errors, not as disagreements) and the prompt tokens of both encodings.
+        """
+        cases = self.load()[:limit]
+        same, errors, verbose_tokens, compact_tokens, rows = 0, 0, 0, 0, []
+        compact = analyst.compact
+        analyst.compact = True
+        try:
+            for case in cases:
+                candles = self._unpack(case)
+                verbose_tokens += estimate_tokens(analyst.build_prompt(case["symbol"], candles, case["verbose_context"], compact=False))
+                compact_tokens += estimate_tokens(analyst.build_prompt(case["symbol"], candles, case["compact_context"], compact=True))
+                verdict = analyst.analyze_asset(case["symbol"], candles, case["compact_context"])
+                errors += verdict.get("signal") == "Gray"
+                same += verdict.get("signal") == case["signal"]
+                rows.append((case["symbol"], case["signal"], verdict.get("signal")))
+        finally:
+            analyst.compact = compact
+        return {
+            "cases": len(cases),
+            "errors": errors,
+            "agreement": same / (len(cases) - errors) if len(cases) > errors else None,
+            "verbose_tokens": verbose_tokens,
+            "compact_tokens": compact_tokens,
+            "reduction": 1 - compact_tokens / verbose_tokens if verbose_tokens else None,
+            "rows": rows
+        }
+
+
+if __name__ == "__main__":
+    import sys
+    import pandas as pd
+
+    if sys.argv[1:2] == ["evaluate"]:
+        # Re-runs the recorded cases (PROMPT_EVAL_RECORD=1) against the live model: python -m src.prompt_codec evaluate
+        from src.ai_analyst import AIAnalyst
+        result = PromptEvalSet().evaluate(AIAnalyst())
+        for symbol, stored, now in result["rows"]:
+            print(f"{symbol:<12}{stored:<8}{now:<8}{'' if stored == now else 'CHANGED'}")
+        print({k: v for k, v in result.items() if k != "rows"})
+        sys.exit(0)
+
+    rng = np.random.default_rng(7)
+    close = 64000 + np.cumsum(rng.normal(0, 120, 60))
+    df = pd.DataFrame({"timestamp": pd.date_range("2024-05-01", periods=60, freq="1h"), "open": close - 30,
+                       "high": close + 90, "low": close - 110, "close": close, "volume": rng.lognormal(6, 0.4, 60)})
+    kpis = {"RSI": 61.37, "SMA_20": close[-20:].mean(), "EMA_50": close.mean(), "MACD": 42.18, "MACD_Signal": 35.02,
+            "BB_Upper": close[-1] * 1.012, "BB_Lower": close[-1] * 0.985}
+    news = [{"title": "Bitcoin ETF inflows hit a three-week high as institutional demand returns to spot markets"},
+            {"title": "Analysts expect volatility ahead of the FOMC minutes release"},
+            {"title": "Miners move coins to exchanges"}, {"title": "On-chain data shows long-term holders accumulating"}]
+    mtf = ["15m: +0.12%", "1h: -0.34%", "4h: +1.05%"]
+    walls = {"buy_wall": close[-1] * 0.992, "sell_wall": close[-1] * 1.008}
+    whale = {"whale_alert": True, "vol_anomaly": 4.2, "timeframe": "15m", "z": 5.6}
+
+    verbose = prompt_report({
+        "context": f"MTF Trends ({', '.join(mtf)}) | Latest {len(news)} news headlines: " + "; ".join(n['title'] for n in news)
+                   + f" | WHALE ALERT: Volume spike 4.2x median on 15m (robust z 5.6)! | BUY WALL found at {walls['buy_wall']} | SELL WALL found at {walls['sell_wall']}",
+        "kpis": f" | RSI: {kpis['RSI']:.1f} | MACD: {kpis['MACD']:.4f} | BB: [{kpis['BB_Lower']:.2f} - {kpis['BB_Upper']:.2f}]",
+        "candles": df.tail(10).to_string()
+    })
+    sections = encode_context(mtf, kpis, close[-1], whale, walls, news)
+    compact = prompt_report({"context": join_context({k: v for k, v in sections.items() if k != "kpis"}),
+                             "kpis": sections["kpis"], "candles": encode_candles(df)})
+    print(format_report(verbose, compact))
+    print()
+    print(join_context(sections))
+    print(encode_candles(df, n=3))
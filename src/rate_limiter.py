@@ -0,0 +1,117 @@
+import time
+import threading
+
+
+def endpoint_weight(endpoint, params=None):
+    """Binance spot REQUEST_WEIGHT for the endpoints this project calls."""
+    params = params or {}
+    has_symbol = bool(params.get("symbol") or params.get("symbols"))
+    if endpoint == "/api/v3/klines":
+        return 2
+    if endpoint == "/api/v3/depth":
+        limit = int(params.get("limit", 100))
+        if limit <= 100: return 5
+        if limit <= 500: return 25
+        if limit <= 1000: return 50
+        return 250
+    if endpoint == "/api/v3/ticker/24hr":
+        return 2 if has_symbol else 80
+    if endpoint == "/api/v3/ticker/price":
+        return 2 if has_symbol else 4
+    if endpoint in ("/api/v3/order", "/api/v3/account"):
+        return 20 if endpoint == "/api/v3/account" else 1
+    return 1
+
+
+class WeightRateLimiter:
+    """
+    Token bucket over Binance's per-minute request weight.
+    Tokens refill continuously; callers acquire an endpoint's weight before sending.
+    The bucket is re-synced from the X-MBX-USED-WEIGHT-1M header and frozen on 418/429
+    until the server's Retry-After has passed.
+    """
+    def __init__(self, weight_per_minute=6000, safety=0.8, max_wait=30):
+        self.capacity = weight_per_minute * safety
+        self.refill_rate = self.capacity / 60.0
+        self.max_wait = max_wait
+        self.tokens = self.capacity
+        self.banned_until = 0.0
+        self.server_used = 0
+        self.throttled = 0 # Requests that had to wait
+        self.rejected = 0 # Requests dropped after max_wait
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+    def acquire(self, weight, block=True):
+        """Reserves `weight` tokens. Returns False if they are not available within max_wait."""
+        deadline = time.monotonic() + self.max_wait
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.banned_until and self.tokens >= weight:
+                    self.tokens -= weight
+                    if waited: self.throttled += 1
+                    return True
+                if now < self.banned_until:
+                    wait = self.banned_until - now
+                else:
+                    wait = (weight - self.tokens) / self.refill_rate
+            if not block or now + wait > deadline:
+                with self._lock: self.rejected += 1
+                return False
+            waited = True
+            time.sleep(min(wait, 1.0))
+
+    def observe(self, headers):
+        """Aligns the bucket with the weight the server reports as used this minute."""
+        if not headers: return
+        used = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("x-mbx-used-weight-1m")
+        if used is None: return
+        try:
+            used = int(used)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self.server_used = used
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, max(self.capacity - used, 0))
+
+    def penalize(self, status, retry_after=None):
+        """Freezes all requests after a 429 (rate limited) or 418 (IP banned)."""
+        try:
+            seconds = float(retry_after) if retry_after is not None else (60 if status == 429 else 120)
+        except (TypeError, ValueError):
+            seconds = 60
+        with self._lock:
+            self.banned_until = max(self.banned_until, time.monotonic() + seconds)
+            self.tokens = 0
+        print(f"DEBUG: Binance rate limit hit (HTTP {status}). Pausing requests for {seconds:.0f}s.")
+
+    def budget(self):
+        """Current state, e.g. for the scanner to size its batches."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "available": int(self.tokens),
+                "capacity": int(self.capacity),
+                "refill_per_s": round(self.refill_rate, 1),
+                "server_used_1m": self.server_used,
+                "banned_for_s": max(0.0, round(self.banned_until - now, 1)),
+                "throttled": self.throttled,
+                "rejected": self.rejected
+            }
+
+    def affordable(self, endpoint, params=None):
+        """How many calls to `endpoint` fit in the currently available budget."""
+        return int(self.budget()["available"] // endpoint_weight(endpoint, params))
+
+
+# Single budget for every Binance REST call made by this process
+BINANCE_LIMITER = WeightRateLimiter()
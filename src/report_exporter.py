@@ -0,0 +1,155 @@
+import hashlib
+import importlib.util
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+
+import pandas as pd
+
+from src.indicators import KPI_KEYS
+
+# format -> (file extension, MIME type)
+REPORT_FORMATS = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("zip", "application/zip"), # One .parquet per sheet
+    "csv": ("zip", "application/zip") # One .csv per sheet
+}
+SHEETS = {"signals": "Señales Monstruo", "kpis": "KPIs", "walls": "Muros", "journal": "Bitácora"}
+
+
+def report_version(assets, journal_logs=None):
+    """
+    Version stamp of what a report would contain: the overview cycle of every asset
+    (or its price/signal when it has none) plus the journal length.
+    """
+    parts = []
+    for a in assets or []:
+        if a.get('overview_version') is not None:
+            parts.append(f"{a.get('symbol')}@{a['overview_version']}")
+        else:
+            parts.append(f"{a.get('symbol')}:{a.get('price')}:{a.get('signal')}:{a.get('reasoning')}")
+    parts.append(f"journal={len(journal_logs or [])}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def build_tables(assets, journal_logs=None):
+    """The report's sheets as DataFrames: signals, KPIs, order book walls and the trade journal."""
+    signals, kpis, walls = [], [], []
+    for asset in assets or []:
+        symbol = asset.get('symbol', 'N/A')
+        signals.append({
+            "Activo": symbol,
+            "Precio Actual": asset.get('price', 0),
+            "Cambio 24h (%)": asset.get('change_24h', 0),
+            "Señal AI": asset.get('signal', 'N/A'),
+            "Confianza": asset.get('confidence'),
+            "Razonamiento": asset.get('reasoning', 'N/A'),
+            "Soportes/Resistencias": asset.get('levels', 'N/A'),
+            "Whale Alert": "🚨 SÍ" if asset.get('whale_alert') else "No",
+            "MTF Summary": ", ".join(asset.get('mtf_summary', []))
+        })
+        kpis.append({"Activo": symbol, **{k: (asset.get('kpis') or {}).get(k) for k in KPI_KEYS}})
+        w = asset.get('walls') or {}
+        walls.append({"Activo": symbol, "Buy Wall": w.get('buy_wall'), "Sell Wall": w.get('sell_wall')})
+    return {
+        "signals": pd.DataFrame(signals),
+        "kpis": pd.DataFrame(kpis),
+        "walls": pd.DataFrame(walls),
+        "journal": pd.DataFrame(journal_logs or [])
+    }
+
+
+def to_excel(tables):
+    """Multi-sheet workbook written in openpyxl's streaming (write-only) mode."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    wb = Workbook(write_only=True)
+    bold = Font(bold=True)
+    for key, df in tables.items():
+        ws = wb.create_sheet(SHEETS.get(key, key)[:31])
+        header = []
+        for col in df.columns:
+            cell = WriteOnlyCell(ws, value=str(col))
+            cell.font = bold
+            header.append(cell)
+        ws.append(header)
+        for row in df.itertuples(index=False, name=None):
+            ws.append([None if (isinstance(v, float) and pd.isna(v)) else v for v in row])
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def to_zip(tables, fmt):
+    """One file per sheet in a zip archive (csv or parquet)."""
+    output = io.BytesIO()
+    compression = zipfile.ZIP_STORED if fmt == "parquet" else zipfile.ZIP_DEFLATED # Parquet is already compressed
+    with zipfile.ZipFile(output, "w", compression) as zf:
+        for key, df in tables.items():
+            if fmt == "parquet":
+                # Mixed-type object columns (e.g. journal reasons) are written as strings
+                obj = [c for c in df.columns if df[c].dtype == object]
+                data = df.astype({c: str for c in obj}).to_parquet(index=False)
+            else:
+                data = df.to_csv(index=False).encode("utf-8")
+            zf.writestr(f"{key}.{fmt}", data)
+    return output.getvalue()
+
+
+class ReportExporter:
+    """
+    Builds reports only when asked and caches the bytes per (format, version stamp),
+    so reruns with an unchanged overview never re-serialize anything.
+    """
+    def __init__(self, max_entries=6):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available_formats():
+        formats = ["xlsx", "csv"]
+        if importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet"):
+            formats.insert(1, "parquet")
+        return formats
+
+    def export(self, assets, fmt="xlsx", journal_logs=None):
+        """Report bytes in `fmt` ('xlsx', 'parquet' or 'csv'); None if there is nothing to export."""
+        if not assets: return None
+        key = (fmt, report_version(assets, journal_logs))
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self.misses += 1
+
+        tables = build_tables(assets, journal_logs)
+        data = to_excel(tables) if fmt == "xlsx" else to_zip(tables, fmt)
+        with self._lock:
+            self._cache[key] = data
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return data
+
+
+if __name__ == "__main__":
+    import time
+
+    assets = [{"symbol": f"SYM{i}USDT", "price": 100 + i, "change_24h": 1.2, "signal": "Green", "confidence": 8,
+               "reasoning": "demo", "levels": "N/A", "mtf_summary": ["1h: +0.5%"], "overview_version": 1,
+               "kpis": {k: 50.0 for k in KPI_KEYS}, "walls": {"buy_wall": 99.0, "sell_wall": None}} for i in range(12)]
+    journal = [{"timestamp": "2024-01-01 10:00:00", "symbol": "BTCUSDT", "side": "BUY", "pnl_pct": 1.5, "reason": "demo"}] * 500
+    exporter = ReportExporter()
+    for fmt in exporter.available_formats():
+        start = time.perf_counter()
+        data = exporter.export(assets, fmt, journal)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        exporter.export(assets, fmt, journal)
+        print(f"{fmt}: {len(data) / 1024:.1f} KiB, built in {first * 1000:.1f} ms, cached rerun {(time.perf_counter() - start) * 1000:.2f} ms")
@@ -0,0 +1,61 @@
+import threading
+import pandas as pd
+
+from src.kline_store import INTERVAL_MS
+
+
+class TimeframeResampler:
+    """
+    Builds higher timeframes from a single base-interval OHLCV series.
+    Buckets are aligned to the Unix epoch (like Binance's UTC candles). Closed derived candles
+    are cached per (symbol, timeframe) until the next base candle opens; only the bucket that
+    is still forming is recomputed on each call.
+    """
+    def __init__(self, base_interval="15m"):
+        self.base_interval = base_interval
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resample(df, target, drop_partial_head=True):
+        """Aggregates an OHLCV frame into `target` candles (open=first, high=max, low=min, close=last, volume=sum)."""
+        if df is None or df.empty: return pd.DataFrame(columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        rule = pd.Timedelta(milliseconds=INTERVAL_MS[target])
+        grouped = df.set_index('timestamp').resample(rule, origin='epoch', label='left', closed='left')
+        out = grouped.agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+        counts = grouped['close'].count()
+        out = out[counts > 0]
+
+        if drop_partial_head and len(out) and len(df) > 1:
+            # The first bucket is usually cut by the download window; drop it if incomplete
+            base_step = df['timestamp'].iloc[1] - df['timestamp'].iloc[0]
+            expected = max(int(rule / base_step), 1) if base_step > pd.Timedelta(0) else 1
+            if counts[counts > 0].iloc[0] < expected:
+                out = out.iloc[1:]
+        return out.reset_index()
+
+    def derive(self, symbol, base_df, target, limit=200):
+        """Returns `limit` candles of `target` built from `base_df` (the base-interval series)."""
+        if base_df is None or base_df.empty: return pd.DataFrame()
+        if target == self.base_interval:
+            return base_df.tail(limit).reset_index(drop=True)
+
+        last_ts = base_df['timestamp'].iloc[-1]
+        bucket_start = last_ts.floor(pd.Timedelta(milliseconds=INTERVAL_MS[target]))
+        key = (symbol, target)
+
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and cached[0] == last_ts:
+            closed = cached[1]
+        else:
+            closed = self.resample(base_df[base_df['timestamp'] < bucket_start], target)
+            with self._lock:
+                self._cache[key] = (last_ts, closed)
+
+        forming = self.resample(base_df[base_df['timestamp'] >= bucket_start], target, drop_partial_head=False)
+        return pd.concat([closed, forming], ignore_index=True).tail(limit).reset_index(drop=True)
+
+    def derive_all(self, symbol, base_df, timeframes, limits=None):
+        limits = limits or {}
+        return {tf: self.derive(symbol, base_df, tf, limits.get(tf, 200)) for tf in timeframes}
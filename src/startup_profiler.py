@@ -0,0 +1,71 @@
+import time
+import threading
+import importlib
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """Collects import and initialization timings of lazily created components."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.records = [] # (name, seconds, depth)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timed(self, name):
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.depth = depth
+            with self._lock:
+                self.records.append((name, elapsed, depth))
+
+    def import_module(self, module_name):
+        """Imports a module and records how long it took (near zero if already loaded)."""
+        with self.timed(f"import {module_name}"):
+            return importlib.import_module(module_name)
+
+    def report(self):
+        """Returns the timings as rows ordered by completion, nested entries indented."""
+        with self._lock:
+            records = list(self.records)
+        return [{"component": ("  " * d) + name, "ms": round(sec * 1000, 1)} for name, sec, d in records]
+
+    def format_report(self):
+        rows = self.report()
+        if not rows: return "No components initialized yet."
+        width = max(len(r["component"]) for r in rows)
+        lines = [f"{'Component'.ljust(width)}  {'ms':>9}"]
+        lines += [f"{r['component'].ljust(width)}  {r['ms']:>9.1f}" for r in rows]
+        lines.append(f"{'Since process start'.ljust(width)}  {(time.perf_counter() - self.started) * 1000:>9.1f}")
+        return "\n".join(lines)
+
+
+# Process-wide timer used by the lazy properties
+STARTUP = StartupTimer()
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    # Use the module instance (not this __main__ copy) so the lazy properties report into it
+    from src.startup_profiler import STARTUP as timer
+
+    with timer.timed("import src.business_logic"):
+        from src.business_logic import BusinessLogic
+    with timer.timed("BusinessLogic()"):
+        logic = BusinessLogic()
+
+    # Touch every component to measure the cost of first use
+    for name in ["ingestor", "ai", "news", "notifier", "execution", "journal", "strategy", "intelligence", "backtester"]:
+        getattr(logic, name)
+    with timer.timed("ingestor.sdk_ready (ping)"):
+        logic.ingestor.sdk_ready
+    print(timer.format_report())
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from src.kline_store import INTERVAL_MS, OHLCV_COLUMNS
+
+
+class CandleRingBuffer:
+    """Fixed-size ring of [timestamp_ms, open, high, low, close, volume] rows for one (symbol, interval)."""
+    def __init__(self, interval, capacity=500):
+        self.interval = interval
+        self.step_ms = INTERVAL_MS[interval]
+        self.capacity = capacity
+        self.data = np.zeros((capacity, 6))
+        self.size = 0
+        self.head = 0 # Next write position
+        self.gap = False # True when the stream skipped candles and a reseed is required
+        self.updated_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def last_timestamp(self):
+        return int(self.data[(self.head - 1) % self.capacity, 0]) if self.size else None
+
+    def upsert(self, row):
+        """Updates the open candle in place or appends a new one. Older candles are ignored."""
+        with self._lock:
+            last_ts = self.last_timestamp
+            if last_ts is not None:
+                if row[0] == last_ts:
+                    self.data[(self.head - 1) % self.capacity] = row
+                    self.updated_at = time.time()
+                    return
+                if row[0] < last_ts: return
+                if row[0] > last_ts + self.step_ms: self.gap = True
+            self.data[self.head] = row
+            self.head = (self.head + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+            self.updated_at = time.time()
+
+    def seed(self, df):
+        """
+        Replaces the buffer content with a REST snapshot (built aside, swapped in one locked step).
+        Holes inside the snapshot itself (halted pair, sparse fallback data) do not raise `gap`:
+        only candles skipped by the stream do, since only those a reseed can fix.
+        """
+        data = np.zeros((self.capacity, 6))
+        n = 0
+        if df is not None and not df.empty:
+            ts = df['timestamp'].astype('datetime64[ms]').astype('int64').to_numpy()
+            rows = np.column_stack([ts] + [df[c].to_numpy(dtype=float) for c in OHLCV_COLUMNS[1:]])
+            _, idx = np.unique(rows[::-1, 0], return_index=True) # Sorted, last copy of a duplicate wins
+            rows = rows[::-1][idx][-self.capacity:]
+            n = len(rows)
+            data[:n] = rows
+        with self._lock:
+            self.data = data
+            self.size = n
+            self.head = n % self.capacity
+            self.gap = False
+            self.updated_at = time.time()
+
+    def to_array(self, limit=None):
+        with self._lock:
+            n = self.size if limit is None else min(limit, self.size)
+            idx = (np.arange(self.head - n, self.head)) % self.capacity
+            return self.data[idx].copy()
+
+    def to_frame(self, limit=None):
+        df = pd.DataFrame(self.to_array(limit), columns=OHLCV_COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'].astype('int64'), unit='ms')
+        return df
+
+
+class MarketStream:
+    """
+    Background WebSocket client for Binance kline and miniTicker streams.
+    Keeps a CandleRingBuffer per (symbol, interval) and the latest mini ticker per symbol.
+    """
+    def __init__(self, symbols, intervals, base_url="wss://stream.binance.com:9443", seed_fn=None,
+                 capacity=500, reconnect_delay=5, order_books=None, reseed_interval=30):
+        self.symbols = [s.upper() for s in symbols]
+        self.intervals = list(intervals)
+        self.base_url = base_url.rstrip("/")
+        self.seed_fn = seed_fn # (symbol, interval, limit) -> OHLCV DataFrame
+        self.capacity = capacity
+        self.reconnect_delay = reconnect_delay
+        self.reseed_interval = reseed_interval # Min seconds between gap reseeds of one buffer within a connection
+        self._seeded_at = {}
+        self.order_books = order_books # Optional OrderBookManager fed by the depth diff stream
+        self.buffers = {(s, i): CandleRingBuffer(i, capacity) for s in self.symbols for i in self.intervals}
+        self.tickers = {}
+        self.kline_listeners = [] # fn(symbol, interval, open_ms, volume, quote_volume, closed) per kline message
+        self.connected = False
+        self.messages = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._loop = None
+
+    @property
+    def url(self):
+        streams = []
+        for s in self.symbols:
+            streams += [f"{s.lower()}@kline_{i}" for i in self.intervals]
+            streams.append(f"{s.lower()}@miniTicker")
+        if self.order_books:
+            streams += self.order_books.streams()
+        return f"{self.base_url}/stream?streams={'/'.join(streams)}"
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), daemon=True, name="MarketStream")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout=5)
+
+    def reseed_due(self):
+        """Buffers with a stream gap whose last reseed is older than reseed_interval."""
+        now = time.monotonic()
+        return [key for key, buf in self.buffers.items()
+                if buf.gap and now - self._seeded_at.get(key, float("-inf")) >= self.reseed_interval]
+
+    def seed(self, keys=None):
+        """Loads REST history into empty or gapped buffers (on every (re)connect), or into `keys` only."""
+        if not self.seed_fn: return
+        for key in keys if keys is not None else list(self.buffers):
+            (symbol, interval), buf = key, self.buffers[key]
+            if buf.size and not buf.gap: continue
+            if keys is not None: self._seeded_at[key] = time.monotonic()
+            try:
+                buf.seed(self.seed_fn(symbol, interval, self.capacity))
+            except Exception as e:
+                print(f"DEBUG: Stream seed failed for {symbol} {interval}: {e}")
+
+    def is_warm(self, symbol, interval, limit=1):
+        buf = self.buffers.get((symbol.upper(), interval))
+        return bool(self.connected and buf and not buf.gap and buf.size >= limit)
+
+    def get_frame(self, symbol, interval, limit=200):
+        return self.buffers[(symbol.upper(), interval)].to_frame(limit)
+
+    def get_ticker(self, symbol):
+        return self.tickers.get(symbol.upper())
+
+    def handle_message(self, raw):
+        msg = json.loads(raw)
+        data = msg.get("data", msg)
+        event = data.get("e")
+        if event == "kline":
+            k = data["k"]
+            buf = self.buffers.get((k["s"], k["i"]))
+            if buf is not None:
+                buf.upsert(np.array([k["t"], float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"])]))
+            for listener in self.kline_listeners:
+                try:
+                    listener(k["s"], k["i"], k["t"], float(k["v"]), float(k.get("q", 0) or 0), bool(k.get("x")))
+                except Exception as e:
+                    print(f"DEBUG: Kline listener failed: {e}")
+        elif event == "24hrMiniTicker":
+            open_p, last = float(data["o"]), float(data["c"])
+            self.tickers[data["s"]] = {
+                "symbol": data["s"],
+                "lastPrice": last,
+                "priceChangePercent": ((last - open_p) / open_p) * 100 if open_p else 0.0,
+                "quoteVolume": float(data["q"]),
+                "event_time": data["E"]
+            }
+        elif event == "depthUpdate" and self.order_books:
+            self.order_books.handle(data)
+        self.messages += 1
+
+    async def _run(self):
+        import websockets
+        while not self._stop.is_set():
+            try:
+                await asyncio.to_thread(self.seed)
+                async with websockets.connect(self.url, ping_interval=20, max_size=2 ** 22) as ws:
+                    self.connected = True
+                    while not self._stop.is_set():
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        self.handle_message(raw)
+                        due = self.reseed_due()
+                        if due:
+                            # A stale REST source would re-open the gap on the next message: bounded by reseed_interval
+                            await asyncio.to_thread(self.seed, due)
+            except Exception as e:
+                print(f"DEBUG: Market stream disconnected: {e}")
+            finally:
+                self.connected = False
+                if self.order_books: self.order_books.invalidate()
+            if not self._stop.is_set():
+                await asyncio.sleep(self.reconnect_delay)
+
+
+if __name__ == "__main__":
+    from tests.fake_binance import FakeBinanceServer, FakeBinanceStream
+
+    rest = FakeBinanceServer()
+    seed = lambda s, i, limit: pd.DataFrame(
+        [r[:6] for r in rest.klines(s, i, limit=limit)], columns=OHLCV_COLUMNS
+    ).astype({c: float for c in OHLCV_COLUMNS[1:]}).assign(timestamp=lambda d: pd.to_datetime(d['timestamp'], unit='ms'))
+
+    with FakeBinanceStream(FakeBinanceStream.synthetic_frames(rest, ["BTCUSDT"], ["1m"], 5)) as ws_server:
+        stream = MarketStream(["BTCUSDT"], ["1m"], base_url=ws_server.url, seed_fn=seed).start()
+        time.sleep(1.0)
+        t0 = time.perf_counter()
+        frame = stream.get_frame("BTCUSDT", "1m", 200)
+        print(f"warm={stream.is_warm('BTCUSDT', '1m', 200)} msgs={stream.messages} read={1e6 * (time.perf_counter() - t0):.0f}us")
+        print(frame.tail(3))
+        print(stream.get_ticker("BTCUSDT"))
+        stream.stop()
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import threading
+import time
+
+FULL = "full" # Complete prompt: candles, news, walls, KPIs
+CHEAP = "cheap" # Short prompt: MTF trends, KPIs, whale/walls and 3 candles, no news
+REUSE = "reuse" # No request: last verdict of the symbol
+
+
+class TokenBudget:
+    """
+    Token governor shared by every process (dashboard, agent) through a SQLite spend ledger.
+    Each cycle gets min(cycle budget, what is left of the hourly and daily budgets); symbols are
+    ranked by priority and, within that allowance, get a full analysis (at most `max_full`),
+    a cheap one, or reuse their last verdict. Spend per cycle therefore stays flat no matter
+    how long the watchlist is.
+    """
+    def __init__(self, path="data/token_ledger.sqlite", cycle_tokens=15000, hourly_tokens=150000,
+                 daily_tokens=1_500_000, max_full=4):
+        self.path = path
+        self.cycle_tokens = cycle_tokens
+        self.hourly_tokens = hourly_tokens
+        self.daily_tokens = daily_tokens
+        self.max_full = max_full
+        self.estimates = {FULL: 1500.0, CHEAP: 500.0} # Tokens per symbol, refined from recorded usage
+        self.last_plan = {}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS spend (
+                    ts REAL NOT NULL,
+                    source TEXT,
+                    symbol TEXT,
+                    tier TEXT,
+                    prompt_tokens INTEGER NOT NULL,
+                    output_tokens INTEGER NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_spend_ts ON spend (ts)")
+            self._conn = conn
+        return self._conn
+
+    def spent(self, seconds):
+        """Tokens spent by all processes in the last `seconds`."""
+        with self._lock:
+            try:
+                row = self.conn.execute("SELECT COALESCE(SUM(prompt_tokens + output_tokens), 0) FROM spend WHERE ts >= ?",
+                                        (time.time() - seconds,)).fetchone()
+                return int(row[0])
+            except Exception as e:
+                print(f"DEBUG: Token ledger read failed: {e}")
+                return 0
+
+    def remaining(self):
+        hourly = self.hourly_tokens - self.spent(3600)
+        daily = self.daily_tokens - self.spent(86400)
+        return {"cycle": self.cycle_tokens, "hourly": max(0, hourly), "daily": max(0, daily),
+                "available": max(0, min(self.cycle_tokens, hourly, daily))}
+
+    def record(self, symbol, usage, tier=FULL, source="dashboard"):
+        """Adds one analysis' token usage to the shared ledger and refines the tier estimate."""
+        prompt = int((usage or {}).get("prompt_tokens") or 0)
+        output = int((usage or {}).get("candidates_tokens") or 0)
+        if not prompt and not output: return
+        with self._lock:
+            if tier in self.estimates:
+                self.estimates[tier] = 0.8 * self.estimates[tier] + 0.2 * (prompt + output)
+            try:
+                self.conn.execute("INSERT INTO spend VALUES (?, ?, ?, ?, ?, ?)", (time.time(), source, symbol, tier, prompt, output))
+                self.conn.execute("DELETE FROM spend WHERE ts < ?", (time.time() - 2 * 86400,))
+            except Exception as e:
+                print(f"DEBUG: Token ledger write failed: {e}")
+
+    @staticmethod
+    def priority(in_position=False, whale_alert=False, vol_anomaly=0.0, change_24h=0.0, volatility=0.0):
+        """
+        Higher is more urgent: open position first, then whale activity, then how much the
+        symbol is moving (24h change and Bollinger width relative to price).
+        """
+        score = 3.0 if in_position else 0.0
+        if whale_alert:
+            score += 1.5 + min(float(vol_anomaly or 0) / 10, 1.0)
+        score += min(abs(float(change_24h or 0)) / 10, 1.0)
+        score += min(float(volatility or 0) / 0.05, 1.0)
+        return round(score, 3)
+
+    def plan(self, candidates):
+        """
+        candidates: {symbol: priority}. Returns {symbol: FULL | CHEAP | REUSE}, spending the
+        available allowance on the highest priorities first.
+        """
+        allowance = self.remaining()["available"]
+        tiers, full = {}, 0
+        for symbol in sorted(candidates, key=candidates.get, reverse=True):
+            if full < self.max_full and allowance >= self.estimates[FULL]:
+                tiers[symbol] = FULL
+                full += 1
+                allowance -= self.estimates[FULL]
+            elif allowance >= self.estimates[CHEAP]:
+                tiers[symbol] = CHEAP
+                allowance -= self.estimates[CHEAP]
+            else:
+                tiers[symbol] = REUSE
+        self.last_plan = tiers
+        return tiers
+
+    def stats(self):
+        counts = {t: list(self.last_plan.values()).count(t) for t in (FULL, CHEAP, REUSE)}
+        return {**self.remaining(), "estimates": {k: round(v) for k, v in self.estimates.items()}, "last_plan": counts}
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    budget = TokenBudget(os.path.join(tempfile.mkdtemp(), "ledger.sqlite"), cycle_tokens=8000)
+    for n in (4, 20, 100):
+        candidates = {f"SYM{i}USDT": budget.priority(in_position=(i == n - 1), whale_alert=(i % 7 == 0), change_24h=i % 12)
+                      for i in range(n)}
+        tiers = budget.plan(candidates)
+        cost = sum(budget.estimates[t] for t in tiers.values() if t != REUSE)
+        print(f"{n:>3} symbols -> {budget.stats()['last_plan']}, ~{cost:.0f} tokens | open position: {tiers[f'SYM{n - 1}USDT']}")
@@ -0,0 +1,175 @@
+import threading
+import warnings
+from collections import deque
+
+import numpy as np
+
+from src.indicators import build_matrix
+
+MAD_SCALE = 1.4826 # MAD -> standard deviation for normal data
+
+
+def robust_z(matrix, window):
+    """
+    Robust z-score of the last column of every row against the `window` columns before it:
+    (x - median) / (1.4826 * MAD). Returns (z, ratio to the median) as 1-D arrays.
+    """
+    ref = matrix[:, -window - 1:-1]
+    x = matrix[:, -1]
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning) # All-NaN rows (short histories)
+        median = np.nanmedian(ref, axis=1)
+        mad = np.nanmedian(np.abs(ref - median[:, None]), axis=1) * MAD_SCALE
+        z = (x - median) / mad
+    return np.where(mad > 0, z, np.nan), np.exp(x - median) # Log volumes: ratio is exp(diff)
+
+
+class WhaleDetector:
+    """
+    Volume anomaly ("whale") detector for the whole universe on every timeframe.
+    Batch mode scores the last closed and the forming candle of all symbols per timeframe
+    in one vectorized pass over log volume and log quote volume (volume x close).
+    Streaming mode (on_kline) keeps a rolling window per (symbol, timeframe) and emits an
+    event as soon as a candle's volume is anomalous.
+    """
+    def __init__(self, window=48, threshold=3.5, min_ratio=2.0, history=200):
+        self.window = window
+        self.threshold = threshold # Robust z needed for an event
+        self.min_ratio = min_ratio # ... and at least this multiple of the median volume
+        self.events = deque(maxlen=history)
+        self.listeners = [] # Callables receiving every new event dict
+        self._windows = {} # (symbol, tf) -> deque of closed-candle log volumes
+        self._forming = {} # (symbol, tf) -> [timestamp, volume, quote_volume] of the open candle
+        self._emitted = set() # (symbol, tf, timestamp) already reported
+        self._emitted_order = deque()
+        self._lock = threading.Lock()
+
+    def _emit(self, event):
+        key = (event["symbol"], event["timeframe"], event["timestamp"])
+        with self._lock:
+            if key in self._emitted: return False
+            self._emitted.add(key)
+            self._emitted_order.append(key)
+            if len(self._emitted_order) > 10000:
+                self._emitted.discard(self._emitted_order.popleft())
+            self.events.append(event)
+        for listener in list(self.listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"DEBUG: Whale listener failed: {e}")
+        return True
+
+    def _is_anomaly(self, z, ratio):
+        return np.isfinite(z) and z >= self.threshold and ratio >= self.min_ratio
+
+    def scan(self, mtf_by_symbol):
+        """
+        {symbol: {tf: OHLCV frame}} -> {symbol: {"whale_alert", "vol_anomaly", "timeframe", "z", "events"}}.
+        vol_anomaly is the strongest volume / median-volume ratio among anomalous candles.
+        """
+        by_tf = {}
+        for symbol, mtf in mtf_by_symbol.items():
+            for tf, df in (mtf or {}).items():
+                if df is not None and len(df) > self.window // 2:
+                    by_tf.setdefault(tf, {})[symbol] = df
+
+        result = {s: {"whale_alert": False, "vol_anomaly": 0, "timeframe": None, "z": None, "events": []} for s in mtf_by_symbol}
+        for tf, frames in by_tf.items():
+            symbols, volume = build_matrix(frames, 'volume', self.window + 2)
+            _, close = build_matrix(frames, 'close', self.window + 2)
+            stamps = {s: frames[s]['timestamp'].iloc[-2:].to_numpy(dtype='datetime64[ms]').astype('int64') for s in symbols}
+            log_vol = np.log1p(volume)
+            log_quote = np.log1p(volume * close)
+
+            # Last closed candle (column -2) and forming candle (-1), each vs the window before it
+            z_closed, ratio_closed = robust_z(log_vol[:, :-1], self.window)
+            zq_closed, _ = robust_z(log_quote[:, :-1], self.window)
+            z_forming, ratio_forming = robust_z(log_vol, self.window)
+
+            for i, symbol in enumerate(symbols):
+                for z, zq, ratio, idx, state in ((z_closed[i], zq_closed[i], ratio_closed[i], 0, "closed"),
+                                                 (z_forming[i], np.nan, ratio_forming[i], 1, "forming")):
+                    if not self._is_anomaly(z, ratio): continue
+                    ts = stamps[symbol][idx] if len(stamps[symbol]) > idx else stamps[symbol][-1]
+                    event = {
+                        "symbol": symbol, "timeframe": tf, "timestamp": int(ts), "candle": state,
+                        "z_volume": round(float(z), 2),
+                        "z_quote": round(float(zq), 2) if np.isfinite(zq) else None,
+                        "ratio": round(float(ratio), 2),
+                        "volume": float(volume[i, -2 + idx])
+                    }
+                    self._emit(event)
+                    info = result[symbol]
+                    info["events"].append(event)
+                    if ratio > info["vol_anomaly"]:
+                        info.update(whale_alert=True, vol_anomaly=float(ratio), timeframe=tf, z=float(z))
+            self._seed_windows(tf, symbols, log_vol)
+        return result
+
+    def _seed_windows(self, tf, symbols, log_vol):
+        """Keeps the streaming windows in line with the last batch scan."""
+        with self._lock:
+            for i, symbol in enumerate(symbols):
+                row = log_vol[i, :-1]
+                self._windows[(symbol, tf)] = deque(row[np.isfinite(row)][-self.window:], maxlen=self.window)
+
+    def on_kline(self, symbol, timeframe, timestamp, volume, quote_volume=None, closed=None):
+        """
+        Streaming update for one kline message. A new timestamp closes the previous candle
+        (pushed into the window). Returns the event if this update made the candle anomalous.
+        """
+        key = (symbol, timeframe)
+        with self._lock:
+            window = self._windows.setdefault(key, deque(maxlen=self.window))
+            forming = self._forming.get(key)
+            if forming and timestamp > forming[0]:
+                window.append(np.log1p(forming[1]))
+            if forming and timestamp < forming[0]:
+                return None # Late message
+            self._forming[key] = [timestamp, volume, quote_volume]
+            window_ref = np.array(window) # This candle is not in its own reference window
+            if len(window_ref) < self.window // 2:
+                return None
+        median = np.median(window_ref)
+        mad = np.median(np.abs(window_ref - median)) * MAD_SCALE
+        if mad <= 0: return None
+        x = np.log1p(volume)
+        z, ratio = (x - median) / mad, float(np.exp(x - median))
+        if not self._is_anomaly(z, ratio): return None
+        event = {
+            "symbol": symbol, "timeframe": timeframe, "timestamp": int(timestamp), "candle": "closed" if closed else "forming",
+            "z_volume": round(float(z), 2), "z_quote": None, "ratio": round(ratio, 2), "volume": float(volume),
+            "quote_volume": quote_volume
+        }
+        return event if self._emit(event) else None
+
+    def recent_events(self, limit=20):
+        with self._lock:
+            return list(self.events)[-limit:][::-1]
+
+
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+
+    # 300 symbols x 3 timeframes, one 15m spike planted
+    rng = np.random.default_rng(4)
+    ts = {"15m": pd.date_range("2024-01-01", periods=100, freq="15min"), "1h": pd.date_range("2024-01-01", periods=200, freq="1h"),
+          "4h": pd.date_range("2024-01-01", periods=62, freq="4h")}
+    universe = {}
+    for i in range(300):
+        universe[f"SYM{i}USDT"] = {tf: pd.DataFrame({"timestamp": t, "close": 100.0, "volume": rng.lognormal(5, 0.3, len(t))}) for tf, t in ts.items()}
+    universe["SYM7USDT"]["15m"].loc[98, "volume"] *= 12
+
+    detector = WhaleDetector()
+    start = time.perf_counter()
+    result = detector.scan(universe)
+    print(f"Batch scan 300 symbols x 3 timeframes: {(time.perf_counter() - start) * 1000:.1f} ms")
+    print("Alerts:", {s: (r["timeframe"], round(r["vol_anomaly"], 1)) for s, r in result.items() if r["whale_alert"]})
+
+    # Streaming: the next 15m candle builds up volume tick by tick
+    next_ts = int(ts["15m"][-1].value // 1_000_000) + 900_000
+    for v in [100, 400, 900, 2500]:
+        event = detector.on_kline("SYM3USDT", "15m", next_ts, v)
+        if event: print("Streaming event:", event); break
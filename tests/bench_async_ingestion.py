@@ -0,0 +1,42 @@
+"""
+Fetch-phase benchmark: serial REST calls vs AsyncBinanceIngestor over the fake server.
+Run from the repo root: python -m tests.bench_async_ingestion [latency_s]
+"""
+import sys
+import time
+
+from src.async_ingestion import AsyncBinanceIngestor
+from src.http_transport import PooledTransport
+from tests.fake_binance import FakeBinanceServer
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT", "ADAUSDT",
+           "DOGEUSDT", "TRXUSDT", "LINKUSDT", "DOTUSDT", "LTCUSDT", "NEARUSDT"]
+TIMEFRAMES = ["15m", "1h", "4h"]
+
+
+def bench(latency=0.1, concurrency=(4, 8, 16, 32), rounds=3):
+    n = len(SYMBOLS) * (len(TIMEFRAMES) + 1)
+    with FakeBinanceServer(latency=latency) as server:
+        transport = PooledTransport([server.url], timeout=5)
+        t0 = time.perf_counter()
+        for s in SYMBOLS:
+            for tf in TIMEFRAMES:
+                transport.get("/api/v3/klines", params={"symbol": s, "interval": tf, "limit": 200})
+            transport.get("/api/v3/depth", params={"symbol": s, "limit": 100})
+        serial = time.perf_counter() - t0
+        print(f"{n} requests @{latency * 1000:.0f}ms: serial {serial:.2f}s")
+
+        for workers in concurrency:
+            ingestor = AsyncBinanceIngestor(transport=transport, max_concurrency=workers)
+            times = []
+            for _ in range(rounds):
+                t0 = time.perf_counter()
+                ingestor.fetch_all(SYMBOLS, TIMEFRAMES)
+                times.append(time.perf_counter() - t0)
+            ingestor.close()
+            best = min(times)
+            print(f"  concurrency {workers:>2}: {best:.2f}s ({serial / best:.1f}x, ideal {n / workers * latency:.2f}s)")
+
+
+if __name__ == "__main__":
+    bench(float(sys.argv[1]) if len(sys.argv) > 1 else 0.1)
@@ -0,0 +1,214 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from src.kline_store import INTERVAL_MS
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 128 # The default backlog of 5 drops concurrent connects (1 s SYN retry)
+
+
+class FakeBinanceServer:
+    """
+    Local stand-in for the Binance REST API (klines, depth, tickers).
+    Candles are synthetic and deterministic so pagination and stitching can be checked offline.
+    Usage:
+        with FakeBinanceServer(latency=0.05) as server:
+            ingestor_url = server.url
+    """
+    def __init__(self, latency=0.0, fail_every=0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.fail_every = fail_every # Return HTTP 500 on every Nth request (0 = never)
+        self.requests = []
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._httpd = _Server((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self): return self.start()
+    def __exit__(self, *exc): self.stop()
+
+    # --- Synthetic market data ---
+    @staticmethod
+    def kline(symbol, open_ms, interval):
+        """Deterministic candle derived from the symbol and open time."""
+        base = 100 + (sum(map(ord, symbol)) % 50)
+        step = open_ms // INTERVAL_MS[interval]
+        close = base + (step % 97) * 0.1
+        return [open_ms, f"{close - 0.05:.2f}", f"{close + 0.2:.2f}", f"{close - 0.2:.2f}", f"{close:.2f}",
+                f"{10 + step % 13}", open_ms + INTERVAL_MS[interval] - 1, "0", 10, "0", "0", "0"]
+
+    def klines(self, symbol, interval, start_ms=None, end_ms=None, limit=500):
+        step = INTERVAL_MS[interval]
+        now = int(time.time() * 1000) // step * step
+        end = min(end_ms if end_ms is not None else now, now)
+        if start_ms is None:
+            start = end - (limit - 1) * step
+        else:
+            start = -(-start_ms // step) * step
+        rows = []
+        t = start
+        while t <= end and len(rows) < limit:
+            rows.append(self.kline(symbol, t, interval))
+            t += step
+        return rows
+
+    def depth(self, symbol, limit=100):
+        mid = float(self.kline(symbol, 0, "1m")[4])
+        bids = [[f"{mid - 0.01 * (i + 1):.2f}", f"{1 + (i % 7):.3f}"] for i in range(limit)]
+        asks = [[f"{mid + 0.01 * (i + 1):.2f}", f"{1 + (i % 5):.3f}"] for i in range(limit)]
+        return {"lastUpdateId": 1, "bids": bids, "asks": asks}
+
+    def ticker_24hr(self):
+        out = []
+        for s in ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT"]:
+            last = self.klines(s, "1h", limit=1)[0]
+            out.append({"symbol": s, "lastPrice": last[4], "priceChangePercent": "1.5",
+                        "quoteVolume": "1000000", "volume": "1000", "highPrice": last[2], "lowPrice": last[3]})
+        return out
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args): pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                q = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                with server._lock:
+                    server._counter += 1
+                    n = server._counter
+                    server.requests.append((parsed.path, q))
+                if server.latency: time.sleep(server.latency)
+                if server.fail_every and n % server.fail_every == 0:
+                    return self._send(500, {"code": -1000, "msg": "Injected failure"})
+
+                if parsed.path == "/api/v3/klines":
+                    body = server.klines(q["symbol"], q.get("interval", "1h"),
+                                         int(q["startTime"]) if "startTime" in q else None,
+                                         int(q["endTime"]) if "endTime" in q else None,
+                                         int(q.get("limit", 500)))
+                elif parsed.path == "/api/v3/depth":
+                    body = server.depth(q["symbol"], int(q.get("limit", 100)))
+                elif parsed.path == "/api/v3/ticker/24hr":
+                    body = server.ticker_24hr()
+                elif parsed.path == "/api/v3/ticker/price":
+                    body = [{"symbol": t["symbol"], "price": t["lastPrice"]} for t in server.ticker_24hr()]
+                elif parsed.path == "/api/v3/ping":
+                    body = {}
+                else:
+                    return self._send(404, {"code": -1, "msg": "Unknown endpoint"})
+                self._send(200, body)
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+class FakeBinanceStream:
+    """
+    Local WebSocket stand-in that replays recorded (or synthetic) combined-stream frames
+    to every client that connects, then keeps the connection open (or closes it with
+    close_after=True, to exercise reconnects).
+    """
+    def __init__(self, frames, delay=0.0, close_after=False, host="127.0.0.1", port=0):
+        self.frames = [f if isinstance(f, str) else json.dumps(f) for f in frames]
+        self.delay = delay
+        self.close_after = close_after
+        self.connections = 0
+        self.host = host
+        self.port = port
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Loads frames recorded one JSON message per line."""
+        with open(path) as f:
+            return cls([line.strip() for line in f if line.strip()], **kwargs)
+
+    @staticmethod
+    def synthetic_frames(rest, symbols, intervals, updates=3):
+        """Builds kline + miniTicker frames continuing the candles served by a FakeBinanceServer."""
+        frames = []
+        for s in symbols:
+            for i in intervals:
+                last = rest.klines(s, i, limit=1)[0]
+                for n in range(updates):
+                    close = float(last[4]) + 0.01 * (n + 1)
+                    frames.append({"stream": f"{s.lower()}@kline_{i}", "data": {
+                        "e": "kline", "E": int(time.time() * 1000), "s": s,
+                        "k": {"t": last[0], "T": last[6], "s": s, "i": i, "o": last[1], "h": str(max(float(last[2]), close)),
+                              "l": last[3], "c": f"{close:.2f}", "v": str(float(last[5]) + n), "x": n == updates - 1}}})
+            frames.append({"stream": f"{s.lower()}@miniTicker", "data": {
+                "e": "24hrMiniTicker", "E": int(time.time() * 1000), "s": s,
+                "c": last[4], "o": last[1], "h": last[2], "l": last[3], "v": "1000", "q": "1000000"}})
+        return frames
+
+    async def _handler(self, ws, *args):
+        import asyncio
+        self.connections += 1
+        for frame in self.frames:
+            await ws.send(frame)
+            if self.delay: await asyncio.sleep(self.delay)
+        if self.close_after:
+            await ws.close()
+        await ws.wait_closed()
+
+    def start(self):
+        import asyncio
+        import websockets
+
+        async def main():
+            self._server = await websockets.serve(self._handler, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._server.wait_closed()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(main())
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+        if self._thread: self._thread.join(timeout=5)
+
+    def __enter__(self): return self.start()
+    def __exit__(self, *exc): self.stop()
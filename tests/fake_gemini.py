@@ -0,0 +1,114 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGeminiServer:
+    """
+    Local stand-in for the Gemini generateContent REST endpoint, for offline tests of the AI path.
+    Point the SDK at it with AIAnalyst(base_url=server.url, api_key="fake").
+    - script: HTTP statuses returned by the first requests, in order (e.g. [503, 429]), then 200s
+    - quota_after: after this many successful requests every call gets a per-day 429
+    - signal: verdict returned for every asset (GREEN/YELLOW/RED)
+    Usage:
+        with FakeGeminiServer(latency=0.1, script=[429]) as server:
+            analyst = AIAnalyst(base_url=server.url, api_key="fake")
+    """
+    def __init__(self, latency=0.0, script=None, quota_after=None, signal="YELLOW", host="127.0.0.1", port=0):
+        self.latency = latency
+        self.script = list(script or [])
+        self.quota_after = quota_after
+        self.signal = signal
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._served = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self): return self.start()
+    def __exit__(self, *exc): self.stop()
+
+    @staticmethod
+    def error(status, per_day=False):
+        if status == 429:
+            quota_id = "GenerateRequestsPerDayPerProjectPerModel-FreeTier" if per_day else "GenerateRequestsPerMinutePerProjectPerModel-FreeTier"
+            return {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "You exceeded your current quota.",
+                              "details": [{"@type": "type.googleapis.com/google.rpc.QuotaFailure", "violations": [{"quotaId": quota_id}]},
+                                          {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "0s" if not per_day else "3600s"}]}}
+        return {"error": {"code": status, "status": "UNAVAILABLE" if status == 503 else "INTERNAL", "message": "Injected failure"}}
+
+    def answer(self, body):
+        """Model reply: JSON verdicts for batch requests (### SYMBOL sections), text format otherwise."""
+        prompt = " ".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+        config = body.get("generationConfig") or {}
+        if config.get("responseMimeType") == "application/json":
+            symbols = re.findall(r"^### (\S+)", prompt, re.M)
+            text = json.dumps({"verdicts": [{"symbol": s, "signal": self.signal, "confidence": 5,
+                                             "reasoning": "Fake verdict.", "levels": "N/A"} for s in symbols]})
+        else:
+            text = f"Signal: {self.signal}\nConfidence: 5\nReasoning: Fake verdict.\nLevels: N/A"
+        prompt_tokens = len(prompt) // 4
+        return {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": len(text) // 4,
+                              "totalTokenCount": prompt_tokens + len(text) // 4}
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args): pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests.append(self.path)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    status = server.script.pop(0) if server.script else 200
+                    if status == 200 and server.quota_after is not None and server._served >= server.quota_after:
+                        status = 429
+                        per_day = True
+                    else:
+                        per_day = False
+                        if status == 200: server._served += 1
+                try:
+                    if server.latency: time.sleep(server.latency)
+                    if ":generateContent" not in self.path:
+                        return self._send(404, {"error": {"code": 404, "status": "NOT_FOUND", "message": "Unknown endpoint"}})
+                    if status != 200:
+                        return self._send(status, server.error(status, per_day))
+                    self._send(200, server.answer(body))
+                finally:
+                    with server._lock: server.in_flight -= 1
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from src.ai_analyst import AIAnalyst
+from src.ai_scheduler import AIScheduler, QuotaExhausted, classify_error
+from src.llm_cache import LLMCache
+from tests.fake_gemini import FakeGeminiServer
+
+CANDLES = pd.DataFrame({"open": [1.0] * 10, "close": [1.0] * 10, "volume": [1.0] * 10})
+SYMBOLS = [f"SYM{i}USDT" for i in range(12)]
+
+
+def _analyst(server, **scheduler):
+    return AIAnalyst(cache=LLMCache(":memory:"), base_url=server.url, api_key="fake",
+                     scheduler=AIScheduler(**scheduler))
+
+
+def test_classify_error_reads_kind_and_retry_hint():
+    per_day = Exception(str(FakeGeminiServer.error(429, per_day=True)))
+    assert classify_error(per_day) == ("quota", 3600.0, True)
+    assert classify_error(Exception(str(FakeGeminiServer.error(503)))) == ("server", None, False)
+    assert classify_error(ValueError("bad request")) == (None, None, False)
+
+
+def test_transient_errors_are_retried_with_backoff():
+    with FakeGeminiServer(script=[503, 429], signal="GREEN") as server:
+        analyst = _analyst(server, base_delay=0.05)
+        result = analyst.analyze_asset("BTCUSDT", CANDLES)
+        stats = analyst.scheduler.stats()
+    assert result["signal"] == "Green"
+    assert len(server.requests) == 3
+    assert stats["retries"] == 2 and stats["completed"] == 1 and stats["failed"] == 0
+
+
+def test_in_flight_requests_never_exceed_the_cap():
+    with FakeGeminiServer(latency=0.2) as server:
+        analyst = _analyst(server, max_concurrency=3)
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda s: analyst.analyze_asset(s, CANDLES), SYMBOLS))
+    assert {r["signal"] for r in results} == {"Yellow"}
+    assert server.max_in_flight == 3
+    assert analyst.scheduler.stats()["in_flight"] == 0
+
+
+def test_daily_quota_fails_fast_for_the_hinted_period():
+    with FakeGeminiServer(quota_after=3) as server:
+        analyst = _analyst(server, max_concurrency=2)
+        results = [analyst.analyze_asset(s, CANDLES) for s in SYMBOLS]
+        stats = analyst.scheduler.stats()
+    assert [r["signal"] for r in results].count("Gray") == 9
+    assert len(server.requests) == 4 # 3 served + the 429; the rest never left the process
+    assert stats["skipped"] == 8
+    assert stats["quota_exhausted_s"] > 3000 # retryDelay 3600s, not the 300s default
+
+
+def test_exhausted_scheduler_raises_without_calling():
+    scheduler = AIScheduler()
+    scheduler.exhaust(60)
+    calls = []
+    with pytest.raises(QuotaExhausted):
+        scheduler.call(lambda: calls.append(1))
+    assert not calls and scheduler.stats()["skipped"] == 1
@@ -0,0 +1,63 @@
+import time
+
+import pandas as pd
+
+from src.async_ingestion import AsyncBinanceIngestor
+from src.data_ingestion import BinanceDataIngestor
+from src.http_transport import PooledTransport
+from tests.fake_binance import FakeBinanceServer
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT", "ADAUSDT"]
+TIMEFRAMES = ["4h", "1d"]
+
+
+def _serial_ingestor(url):
+    """The serial path without SDK (no network): REST over the same fake host."""
+    ingestor = BinanceDataIngestor()
+    ingestor.transport = PooledTransport([url], timeout=5, limiter=ingestor.limiter)
+    ingestor._sdk_ready = False
+    return ingestor
+
+
+def test_concurrent_fetch_matches_serial_path():
+    with FakeBinanceServer() as server:
+        serial = _serial_ingestor(server.url)
+        expected = {s: {tf: serial.get_historical_data(s, tf, 150) for tf in TIMEFRAMES} for s in SYMBOLS}
+        depth = {s: serial.get_order_book(s, 100) for s in SYMBOLS}
+
+        ingestor = AsyncBinanceIngestor(serial, max_concurrency=8)
+        snapshot = ingestor.fetch_all(SYMBOLS, TIMEFRAMES, {tf: 150 for tf in TIMEFRAMES})
+        ingestor.close()
+
+    for s in SYMBOLS:
+        assert snapshot[s]["depth"] == depth[s]
+        for tf in TIMEFRAMES:
+            assert len(snapshot[s]["mtf"][tf]) == 150
+            pd.testing.assert_frame_equal(snapshot[s]["mtf"][tf], expected[s][tf])
+
+
+def test_failed_requests_come_back_empty():
+    with FakeBinanceServer(fail_every=3) as server:
+        ingestor = AsyncBinanceIngestor(transport=PooledTransport([server.url], timeout=5, base_cooldown=0), max_concurrency=4)
+        snapshot = ingestor.fetch_all(SYMBOLS, TIMEFRAMES, depth=False)
+        ingestor.close()
+    frames = [snapshot[s]["mtf"][tf] for s in SYMBOLS for tf in TIMEFRAMES]
+    assert all(isinstance(df, pd.DataFrame) for df in frames)
+    assert any(df.empty for df in frames) and any(not df.empty for df in frames)
+
+
+def test_concurrent_fetch_is_faster_than_serial():
+    with FakeBinanceServer(latency=0.05) as server:
+        transport = PooledTransport([server.url], timeout=5)
+        t0 = time.perf_counter()
+        for s in SYMBOLS:
+            for tf in TIMEFRAMES:
+                transport.get("/api/v3/klines", params={"symbol": s, "interval": tf, "limit": 100})
+        serial = time.perf_counter() - t0
+
+        ingestor = AsyncBinanceIngestor(transport=transport, max_concurrency=16)
+        t0 = time.perf_counter()
+        ingestor.fetch_all(SYMBOLS, TIMEFRAMES, depth=False)
+        concurrent = time.perf_counter() - t0
+        ingestor.close()
+    assert concurrent * 3 < serial
@@ -0,0 +1,32 @@
+import types
+
+from src.business_logic import BusinessLogic
+from src.data_ingestion import BinanceDataIngestor
+from tests.fake_binance import FakeBinanceServer
+
+
+def _logic():
+    server, calls = FakeBinanceServer(), []
+
+    def get_historical_data(symbol, interval="1h", limit=200):
+        calls.append((interval, limit))
+        return BinanceDataIngestor.klines_to_frame(server.klines(symbol, interval, limit=limit))
+
+    logic = BusinessLogic()
+    logic._components["ingestor"] = types.SimpleNamespace(get_historical_data=get_historical_data)
+    return logic, calls
+
+
+def test_timeframes_beyond_the_base_window_are_fetched_natively():
+    logic, calls = _logic()
+    # 1000 x 15m covers 200 x 1h but only 62 x 4h
+    assert logic.native_timeframes() == ["4h"]
+    assert logic.fetch_limits() == {"15m": 1000, "4h": 200}
+
+    frames = logic._load_frames("BTCUSDT", {}, logic.fetch_limits(), [])
+    assert calls == [("15m", 1000), ("4h", 200)]
+    assert len(frames["4h"]) == 200
+
+    assert len(logic.load_full_data("ETHUSDT", "4h")) == 200
+    assert len(logic.load_full_data("ETHUSDT", "1h")) == 200 # Resampled from the 15m base
+    assert calls[-2:] == [("4h", 200), ("15m", 1000)]
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from src.correlation_engine import CorrelationEngine
+
+WINDOW = 50
+TS = pd.date_range("2024-01-01", periods=400, freq="1h")
+
+
+def _closes(n_symbols, T=400, seed=3):
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0, 0.01, (T, 1))
+    returns = factor * rng.uniform(0.2, 1.5, n_symbols) + rng.normal(0, 0.006, (T, n_symbols))
+    return 100 * np.exp(np.cumsum(returns, axis=0))
+
+
+def _frame(closes, keep=None):
+    df = pd.DataFrame({"timestamp": TS[:len(closes)], "close": closes})
+    return df[keep] if keep is not None else df
+
+
+def _reference(frames, window, min_periods):
+    """pandas: returns vs each symbol's previous real candle, last `window` rows, pairwise corr(min_periods)."""
+    closes = pd.DataFrame({s: pd.Series(df['close'].to_numpy()[:-1], index=df['timestamp'].to_numpy()[:-1])
+                           for s, df in frames.items()}) # Last (forming) candle excluded
+    returns = pd.DataFrame({s: np.log(c.dropna()).diff().reindex(closes.index) for s, c in closes.items()})
+    rows = returns.iloc[-window:]
+    rows = rows.loc[:, rows.notna().any()]
+    corr = rows.corr(min_periods=min_periods)
+    for s in corr.index: corr.loc[s, s] = 1.0
+    return corr
+
+
+def _assert_matches(engine, frames):
+    ref = _reference(frames, engine.window, engine.min_periods)
+    corr = engine.correlation_matrix()
+    assert sorted(corr.index) == sorted(ref.index)
+    np.testing.assert_allclose(corr.loc[ref.index, ref.columns].to_numpy(), ref.to_numpy(), rtol=0, atol=1e-9)
+
+
+def test_missing_candles_match_pandas_pairwise_corr():
+    closes = _closes(5)
+    rng = np.random.default_rng(8)
+    frames = {"BTCUSDT": _frame(closes[:300, 0])}
+    for i, rate in zip(range(1, 5), [0.05, 0.1, 0.3, 0.7]): # The last one has too few shared rows
+        keep = rng.random(300) > rate
+        keep[-2:] = True
+        frames[f"S{i}USDT"] = _frame(closes[:300, i], keep)
+    engine = CorrelationEngine(window=WINDOW)
+    engine.update(frames)
+    _assert_matches(engine, frames)
+    assert engine.correlation_matrix().isna().to_numpy().any() # Pairs below min_periods stay NaN
+
+
+def test_incremental_updates_and_symbol_added_mid_window():
+    closes = _closes(4)
+    engine = CorrelationEngine(window=WINDOW)
+    for end in range(120, 200):
+        engine.update({s: _frame(closes[:end, i]) for i, s in enumerate(["BTCUSDT", "ETHUSDT"])})
+    # SOL joins with full history, XRP was listed 20 candles ago
+    frames = {"BTCUSDT": _frame(closes[:200, 0]), "ETHUSDT": _frame(closes[:200, 1]), "SOLUSDT": _frame(closes[:200, 2]),
+              "XRPUSDT": _frame(closes[:200, 3], np.arange(200) >= 180)}
+    engine.update(frames)
+    _assert_matches(engine, frames)
+    for end in range(201, 231):
+        frames = {s: _frame(closes[:end, i], np.arange(end) >= 180 if s == "XRPUSDT" else None)
+                  for i, s in enumerate(frames)}
+        engine.update(frames)
+    _assert_matches(engine, frames)
+
+
+def test_symbols_without_candles_in_the_window_are_pruned():
+    closes = _closes(3)
+    engine = CorrelationEngine(window=WINDOW)
+    delisted = _frame(closes[:150, 2])
+    for end in range(150, 150 + WINDOW + 5):
+        frames = {"BTCUSDT": _frame(closes[:end, 0]), "ETHUSDT": _frame(closes[:end, 1])}
+        engine.update(dict(frames, OLDUSDT=delisted))
+    assert "OLDUSDT" not in engine.symbols
+    _assert_matches(engine, frames)
+    version = engine.version
+    engine.update(dict(frames, OLDUSDT=delisted)) # Nothing new: the stale symbol is not re-added
+    assert engine.version == version and "OLDUSDT" not in engine.symbols
+
+
+def test_streaming_sums_are_reset_to_exact_values():
+    closes = _closes(6, T=20 * WINDOW + 1, seed=4) * 1e4
+    names = [f"S{i}USDT" for i in range(6)]
+    engine = CorrelationEngine(window=WINDOW)
+    engine.update({s: pd.DataFrame({"timestamp": [0, 1], "close": closes[:2, i]}) for i, s in enumerate(names)})
+    for t in range(2, len(closes)):
+        engine.add_candle(t, dict(zip(names, closes[t])))
+        if engine._rows % WINDOW == 0:
+            # _refresh() replaced the running sums by an exact recomputation
+            o = engine._obs.astype(float)
+            assert (engine._p == engine._buf.T @ engine._buf).all() and (engine._n == o.T @ o).all()
+    ref = pd.DataFrame(np.log(closes[-WINDOW - 1:]), columns=names).diff().iloc[1:].corr()
+    np.testing.assert_allclose(engine.correlation_matrix().to_numpy(), ref.to_numpy(), rtol=0, atol=1e-9)
@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from tests.fake_binance import FakeBinanceServer
+from src.history_loader import HistoryLoader
+from src.kline_store import KlineStore, INTERVAL_MS
+
+DAY_MS = 86_400_000
+STEP = INTERVAL_MS["15m"]
+
+
+def _frame(server, symbol, start_ms, end_ms):
+    return HistoryLoader._to_frame(server.klines(symbol, "15m", start_ms, end_ms - 1, limit=100_000))
+
+
+def _assert_contiguous(store, symbol, start_ms, end_ms):
+    stored = store.read_range(symbol, "15m", start_ms, end_ms)
+    ts = stored['timestamp'].astype('datetime64[ms]').astype('int64').to_numpy()
+    expected = (end_ms - 1) // STEP - (-(-start_ms // STEP)) + 1
+    assert len(stored) == expected
+    assert (np.diff(ts) == STEP).all()
+
+
+def test_append_merges_rows_inside_stored_range(tmp_path):
+    server = FakeBinanceServer()
+    store = KlineStore(str(tmp_path))
+    end = 30 * DAY_MS
+    store.append("BTCUSDT", "15m", _frame(server, "BTCUSDT", 0, 2 * DAY_MS))
+    store.append("BTCUSDT", "15m", _frame(server, "BTCUSDT", 20 * DAY_MS, end))
+    # Fills the hole between the stored head and tail
+    store.append("BTCUSDT", "15m", _frame(server, "BTCUSDT", 2 * DAY_MS, 20 * DAY_MS))
+    _assert_contiguous(store, "BTCUSDT", 0, end)
+
+
+def test_download_fills_head_and_tail_without_gaps(tmp_path):
+    with FakeBinanceServer() as server:
+        loader = HistoryLoader(base_url=server.url, store=KlineStore(str(tmp_path)), max_workers=4)
+        end = int(time.time() * 1000) // STEP * STEP
+        start = end - 30 * DAY_MS
+        # Partial history in the middle of the range: both head and tail are missing
+        loader.store.append("BTCUSDT", "15m", _frame(server, "BTCUSDT", end - 12 * DAY_MS, end - 10 * DAY_MS))
+
+        loader.download("BTCUSDT", "15m", start, end)
+        _assert_contiguous(loader.store, "BTCUSDT", start, end)
+
+        # A second call finds nothing missing but the (re-fetched) last candle
+        before = len(loader.store.read_range("BTCUSDT", "15m"))
+        loader.download("BTCUSDT", "15m", start, end)
+        assert len(loader.store.read_range("BTCUSDT", "15m")) == before
+
+
+def test_long_history_retries_the_head_on_the_next_host(tmp_path):
+    from src.data_ingestion import BinanceDataIngestor
+    from src.http_transport import PooledTransport
+
+    with FakeBinanceServer(fail_every=1) as bad, FakeBinanceServer() as good:
+        ingestor = BinanceDataIngestor()
+        ingestor.store = KlineStore(str(tmp_path))
+        ingestor.transport = PooledTransport([bad.url, good.url])
+        ingestor.history_loader = HistoryLoader(base_url="http://unused.invalid", store=ingestor.store, retries=1)
+        end = int(time.time() * 1000) // STEP * STEP
+        # The tail is already stored and fresh: only the head is missing
+        ingestor.store.append("BTCUSDT", "15m", _frame(good, "BTCUSDT", end - 2 * DAY_MS, end + STEP))
+
+        df = ingestor.get_long_history("BTCUSDT", "15m", days=10)
+        start = end + STEP - 10 * DAY_MS
+        assert df['timestamp'].iloc[0] <= pd.Timestamp(start + STEP, unit='ms')
+        assert bad.requests and good.requests
+        assert ingestor.history_loader.base_url == "http://unused.invalid"
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from src.incremental_indicators import IndicatorSet, KPITracker
+from src.indicators import KPI_KEYS
+
+TOL = 1e-9
+
+
+def _closes(n=600, seed=11):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+
+
+def _pandas_kpis(closes):
+    c = pd.Series(closes)
+    delta = c.diff()
+    gain = delta.where(delta > 0, 0).ewm(alpha=1/14, adjust=False).mean()
+    loss = (-delta.where(delta < 0, 0)).ewm(alpha=1/14, adjust=False).mean()
+    macd = c.ewm(span=12, adjust=False).mean() - c.ewm(span=26, adjust=False).mean()
+    return pd.DataFrame({
+        "RSI": 100 - 100 / (1 + gain / loss),
+        "SMA_20": c.rolling(20).mean(),
+        "EMA_50": c.ewm(span=50, adjust=False).mean(),
+        "MACD": macd,
+        "MACD_Signal": macd.ewm(span=9, adjust=False).mean(),
+        "BB_Upper": c.rolling(20).mean() + 2 * c.rolling(20).std(),
+        "BB_Lower": c.rolling(20).mean() - 2 * c.rolling(20).std()
+    })
+
+
+def _assert_close(kpis, expected):
+    for key in KPI_KEYS:
+        assert abs(kpis[key] - expected[key]) <= TOL * abs(expected[key]), key
+
+
+def _frame(closes):
+    return pd.DataFrame({"timestamp": pd.date_range("2024-01-01", periods=len(closes), freq="1h"), "close": closes})
+
+
+def test_updates_match_pandas_ewm_and_rolling():
+    closes = _closes()
+    ref = _pandas_kpis(closes)
+    st = IndicatorSet()
+    for t, x in enumerate(closes):
+        kpis = st.update(x, t)
+        if t >= 19: # Every window (BB / SMA 20) is full
+            _assert_close(kpis, ref.iloc[t])
+
+
+def test_seed_fast_path_equals_update_loop():
+    closes = _closes()
+    fast = IndicatorSet().seed(closes)
+    stamped = IndicatorSet().seed(closes, range(len(closes)))
+    assert fast.count == stamped.count == len(closes)
+    assert fast.last_ts is None and stamped.last_ts == len(closes) - 1
+    _assert_close(fast.kpis(), stamped.kpis())
+    _assert_close(fast.kpis(), _pandas_kpis(closes).iloc[-1])
+
+
+def test_forming_candle_revision_and_snapshot_restore():
+    closes = _closes()
+    st = IndicatorSet().seed(closes[:-1], range(len(closes) - 1))
+    saved = st.snapshot()
+    st.update(closes[-1] * 1.05, len(closes) - 1) # New candle opens...
+    st.update(closes[-1], len(closes) - 1) # ... and is revised
+    _assert_close(st.kpis(), _pandas_kpis(closes).iloc[-1])
+    assert st.update(1.0, 0) == st.kpis() # Late message for an older candle is ignored
+
+    restored = IndicatorSet().restore(saved)
+    assert restored.kpis() == IndicatorSet().seed(closes[:-1], range(len(closes) - 1)).kpis()
+    assert restored.update(closes[-1], len(closes) - 1) == st.kpis()
+
+
+def test_tracker_catches_up_on_new_candles_only():
+    closes = _closes(180)
+    tracker = KPITracker(length=200, max_catchup=50)
+    tracker.update({"BTC": _frame(closes[:120])})
+    st = tracker.sets["BTC"]
+
+    # 40 new candles plus a revised forming one: consumed incrementally by the same set
+    grown = closes[:160].copy()
+    result = tracker.update({"BTC": _frame(grown)})["BTC"]
+    assert tracker.sets["BTC"] is st and st.count == 160
+    _assert_close(result, _pandas_kpis(grown).iloc[-1])
+
+    grown[-1] *= 1.01
+    result = tracker.update({"BTC": _frame(grown)})["BTC"]
+    assert st.count == 160
+    _assert_close(result, _pandas_kpis(grown).iloc[-1])
+
+    # State survives a snapshot/restore round trip
+    restored = KPITracker()
+    restored.restore(tracker.snapshot())
+    assert restored.update({"BTC": _frame(closes)})["BTC"] == tracker.update({"BTC": _frame(closes)})["BTC"]
+
+
+def test_tracker_reseeds_after_too_many_missed_candles():
+    closes = _closes(180)
+    tracker = KPITracker(length=200, max_catchup=10)
+    tracker.update({"BTC": _frame(closes[:100])})
+    st = tracker.sets["BTC"]
+    result = tracker.update({"BTC": _frame(closes)})["BTC"]
+    assert tracker.sets["BTC"] is not st
+    _assert_close(result, _pandas_kpis(closes).iloc[-1])
+    assert tracker.update({"BTC": _frame(closes[:30])})["BTC"] == {k: None for k in KPI_KEYS}
+    assert "BTC" not in tracker.sets
@@ -0,0 +1,47 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.kline_store import KlineStore, INTERVAL_MS
+
+STEP = INTERVAL_MS["1m"]
+
+
+def _frame(start, n, close=1.0):
+    ts = pd.to_datetime(np.arange(start, start + n) * STEP, unit='ms')
+    return pd.DataFrame({"timestamp": ts, "open": close, "high": close, "low": close,
+                         "close": close + np.arange(n), "volume": 1.0})
+
+
+def test_last_candle_is_replaced_not_duplicated(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", _frame(0, 10))
+    store.append("BTCUSDT", "1m", _frame(9, 3, close=50.0))
+    stored = store.read_range("BTCUSDT", "1m")
+    assert len(stored) == 12
+    assert stored['close'].iloc[9] == 50.0
+    assert stored['timestamp'].is_monotonic_increasing
+
+
+def test_reads_during_merges_see_whole_rows(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", _frame(5000, 10))
+    errors, stop = [], threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                df = store.read_range("BTCUSDT", "1m")
+                assert df['timestamp'].is_monotonic_increasing and not df['close'].isna().any()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for t in threads: t.start()
+    for i in range(200):
+        # Alternating backfills (rewrite) and tail updates (in place)
+        store.append("BTCUSDT", "1m", _frame(5000 - 10 * (i + 1), 10) if i % 2 else _frame(5009 + i, 2))
+    stop.set()
+    for t in threads: t.join()
+    assert not errors
@@ -0,0 +1,85 @@
+import time
+
+from src.order_book import OrderBookManager
+
+
+def _snapshot(last_id):
+    return {"lastUpdateId": last_id, "bids": [["99.0", "1"], ["98.0", "2"]], "asks": [["101.0", "1"], ["102.0", "2"]]}
+
+
+def _event(first, last, bids=(), asks=()):
+    return {"e": "depthUpdate", "s": "BTCUSDT", "U": first, "u": last, "b": list(bids), "a": list(asks)}
+
+
+def _manager(snapshot_ids):
+    """Manager whose n-th snapshot request returns lastUpdateId snapshot_ids[n] (the last one repeats)."""
+    calls = []
+
+    def snapshot_fn(symbol, limit):
+        calls.append(limit)
+        return _snapshot(snapshot_ids[min(len(calls), len(snapshot_ids)) - 1])
+    return OrderBookManager(["BTCUSDT"], snapshot_fn=snapshot_fn), calls
+
+
+def _settle(manager, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while manager._resyncing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not manager._resyncing
+
+
+def _feed(manager, events):
+    for e in events:
+        manager.handle(e)
+        _settle(manager)
+
+
+def test_snapshot_plus_buffered_diffs():
+    manager, calls = _manager([100])
+    _feed(manager, [_event(95, 99, bids=[["97.0", "5"]]), _event(99, 102, bids=[["99.0", "7"]]),
+                    _event(103, 103, asks=[["101.0", "0"]])])
+    book = manager.get("BTCUSDT")
+    assert manager.is_synced("BTCUSDT") and book.last_update_id == 103
+    assert calls == [1000] and manager.resyncs["BTCUSDT"] == 1
+    assert list(book.bid_px) == [98.0, 99.0] and book.bid_qty[-1] == 7.0 # Event 95-99 predates the snapshot
+    assert book.best_ask() == 102.0
+
+
+def test_sequence_gap_triggers_resync():
+    manager, calls = _manager([100, 120])
+    _feed(manager, [_event(100, 101), _event(102, 105)])
+    assert manager.is_synced("BTCUSDT")
+    _feed(manager, [_event(110, 115)]) # 106-109 never arrived
+    assert not manager.is_synced("BTCUSDT") and len(calls) == 2
+    _feed(manager, [_event(116, 121, bids=[["99.5", "3"]]), _event(122, 122)])
+    book = manager.get("BTCUSDT")
+    assert manager.is_synced("BTCUSDT") and book.last_update_id == 122 and book.best_bid() == 99.5
+    assert manager.resyncs["BTCUSDT"] == 2
+
+
+def test_snapshot_ahead_of_stream_is_reused():
+    manager, calls = _manager([110])
+    # Every event before the snapshot is dropped while waiting: no new request per event
+    _feed(manager, [_event(100 + i, 100 + i) for i in range(10)])
+    assert not manager.is_synced("BTCUSDT") and len(calls) == 1
+    _feed(manager, [_event(110, 111), _event(112, 112)])
+    assert manager.is_synced("BTCUSDT") and manager.get("BTCUSDT").last_update_id == 112
+    assert len(calls) == 1
+
+
+def test_stale_snapshot_is_fetched_again_once_per_attempt():
+    manager, calls = _manager([50, 50, 130])
+    _feed(manager, [_event(60, 60)]) # Snapshot 50 is older than the buffered stream
+    assert not manager.is_synced("BTCUSDT") and len(calls) == 1
+    _feed(manager, [_event(61, 61)])
+    assert len(calls) == 2
+    _feed(manager, [_event(62, 131)])
+    assert manager.is_synced("BTCUSDT") and len(calls) == 3
+
+
+def test_invalidate_drops_the_book_and_cached_snapshot():
+    manager, calls = _manager([110, 200])
+    _feed(manager, [_event(100, 100)])
+    manager.invalidate()
+    _feed(manager, [_event(200, 201)])
+    assert manager.is_synced("BTCUSDT") and len(calls) == 2
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from src.prompt_codec import PromptEvalSet, encode_candles, estimate_tokens
+
+
+class _Analyst:
+    """Offline stand-in with the AIAnalyst prompt interface (verbose = last candles via to_string)."""
+    compact = False
+
+    def build_prompt(self, symbol, price_data, context="Neutral", compact=None):
+        return f"{symbol} {context}\n" + (encode_candles(price_data) if compact else price_data.tail(10).to_string())
+
+    def analyze_asset(self, symbol, price_data, context="Neutral"):
+        return {"signal": "Green"}
+
+
+def test_eval_cases_render_the_recorded_prompt(tmp_path):
+    close = 64000 + np.cumsum(np.random.default_rng(1).normal(0, 120, 200))
+    df = pd.DataFrame({"timestamp": pd.date_range("2024-05-01", periods=200, freq="1h"), "open": close - 30,
+                       "high": close + 90, "low": close - 110, "close": close, "volume": np.arange(200) * 1.5})
+    evals = PromptEvalSet(str(tmp_path / "prompt_eval.jsonl"))
+    evals.record("BTCUSDT", df, "verbose ctx", "compact ctx", {"signal": "Green", "confidence": 7})
+    evals.record("BTCUSDT", df, "verbose ctx", "compact ctx", {"signal": "Gray"}) # Failed calls are not cases
+
+    result = evals.evaluate(_Analyst())
+    analyst = _Analyst()
+    assert result["cases"] == 1 and result["agreement"] == 1.0
+    # Same token counts as the live prompts, timestamps and index included
+    assert result["verbose_tokens"] == estimate_tokens(analyst.build_prompt("BTCUSDT", df, "verbose ctx", compact=False))
+    assert result["compact_tokens"] == estimate_tokens(analyst.build_prompt("BTCUSDT", df, "compact ctx", compact=True))
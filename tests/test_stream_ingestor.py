@@ -0,0 +1,117 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.kline_store import INTERVAL_MS, OHLCV_COLUMNS
+from src.stream_ingestor import CandleRingBuffer, MarketStream
+from tests.fake_binance import FakeBinanceStream
+
+STEP = INTERVAL_MS["1m"]
+T0 = 1_700_000_040_000 # Minute-aligned open time
+
+
+def _candles(stamps):
+    stamps = np.asarray(stamps, dtype='int64')
+    close = 100 + (stamps - T0) / STEP
+    return pd.DataFrame({"timestamp": pd.to_datetime(stamps, unit='ms'), "open": close, "high": close + 1,
+                         "low": close - 1, "close": close, "volume": 10.0})
+
+
+def _row(ts, close):
+    return np.array([ts, close, close, close, close, 1.0])
+
+
+def _kline_frame(ts, close, closed=False):
+    return {"stream": "btcusdt@kline_1m", "data": {"e": "kline", "E": ts, "s": "BTCUSDT", "k": {
+        "t": ts, "T": ts + STEP - 1, "s": "BTCUSDT", "i": "1m", "o": str(close), "h": str(close),
+        "l": str(close), "c": str(close), "v": "5", "q": "500", "x": closed}}}
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_ring_keeps_the_newest_candles_in_order():
+    buf = CandleRingBuffer("1m", capacity=5)
+    buf.seed(_candles(T0 + STEP * np.arange(3)))
+    for k in range(3, 7):
+        buf.upsert(_row(T0 + k * STEP, 200 + k))
+    rows = buf.to_array()
+    assert buf.size == 5
+    assert (rows[:, 0] == T0 + STEP * np.arange(2, 7)).all()
+    assert list(rows[-2:, 4]) == [205, 206]
+    assert buf.to_frame(2)['timestamp'].iloc[-1] == pd.Timestamp(T0 + 6 * STEP, unit='ms')
+
+
+def test_open_candle_is_replaced_and_late_messages_ignored():
+    buf = CandleRingBuffer("1m", capacity=10)
+    buf.seed(_candles(T0 + STEP * np.arange(4)))
+    last = T0 + 3 * STEP
+    buf.upsert(_row(last, 999.0)) # Final (closed) update of the open candle
+    buf.upsert(_row(last - STEP, 1.0)) # Late message for an older candle
+    rows = buf.to_array()
+    assert buf.size == 4 and not buf.gap
+    assert rows[-1, 4] == 999.0 and rows[-2, 4] != 1.0
+
+
+def test_gap_only_flagged_for_candles_the_stream_skipped():
+    buf = CandleRingBuffer("1m", capacity=10)
+    buf.seed(_candles([T0, T0 + STEP, T0 + 4 * STEP])) # Hole inside the REST data
+    assert not buf.gap
+    buf.upsert(_row(T0 + 5 * STEP, 1.0))
+    assert not buf.gap
+    buf.upsert(_row(T0 + 7 * STEP, 1.0)) # Skipped T0 + 6 * STEP
+    assert buf.gap
+    buf.seed(_candles(T0 + STEP * np.arange(8)))
+    assert not buf.gap and buf.last_timestamp == T0 + 7 * STEP
+
+
+def test_stream_reseeds_once_after_a_gap_and_reconnects():
+    calls = []
+
+    def seed_fn(symbol, interval, limit):
+        # REST has caught up with the stream by the time of the reseed
+        end = T0 + (12 if calls else 9) * STEP
+        calls.append(end)
+        return _candles(np.arange(end - (limit - 1) * STEP, end + 1, STEP))
+
+    frames = [_kline_frame(T0 + 9 * STEP, 150.0, closed=True), _kline_frame(T0 + 10 * STEP, 151.0),
+              _kline_frame(T0 + 12 * STEP, 152.0)] # Candle T0 + 11 * STEP never arrives
+    with FakeBinanceStream(frames, close_after=True) as server:
+        stream = MarketStream(["BTCUSDT"], ["1m"], base_url=server.url, seed_fn=seed_fn, capacity=20, reconnect_delay=0.05)
+        stream.start()
+        try:
+            assert _wait(lambda: server.connections >= 3)
+        finally:
+            stream.stop()
+    buf = stream.buffers[("BTCUSDT", "1m")]
+    rows = buf.to_array()
+    # Initial seed + one reseed for the gap; reconnects find a complete buffer and do not reseed
+    assert len(calls) == 2
+    assert not buf.gap and rows[-1, 0] == T0 + 12 * STEP
+    assert (np.diff(rows[:, 0]) == STEP).all()
+
+
+def test_stale_rest_source_is_not_hammered():
+    calls = []
+
+    def seed_fn(symbol, interval, limit):
+        calls.append(1)
+        return _candles(T0 + STEP * np.arange(10)) # Never catches up with the stream
+
+    frames = [_kline_frame(T0 + 12 * STEP + k * STEP, 150.0 + k) for k in range(20)]
+    with FakeBinanceStream(frames, close_after=True) as server:
+        stream = MarketStream(["BTCUSDT"], ["1m"], base_url=server.url, seed_fn=seed_fn, capacity=50, reconnect_delay=0.05)
+        stream.start()
+        try:
+            assert _wait(lambda: server.connections >= 3)
+        finally:
+            stream.stop()
+        connections = server.connections
+    # One seed per connection plus one gap reseed, not one per message
+    assert stream.messages >= 40
+    assert len(calls) <= connections + 1